@@ -0,0 +1,487 @@
+"""
+Snapshot colunar em memória para consultas analíticas.
+
+Funcionários e folhas de pagamento (partição quente e meses arquivados) são
+carregados em arrays NumPy por coluna; textos como `position` ficam
+codificados em dicionário (códigos int32, -1 para nulo) e o mês de
+referência vira AAAAMM inteiro. Cada folha também carrega o cargo e o
+departamento do funcionário, para agrupar sem junções.
+
+O snapshot guarda o último `seq` do feed de alterações (`ChangeLog`). Antes
+de cada consulta as alterações posteriores de employee/payroll são aplicadas
+no lugar; se forem muitas (ou houver muitas linhas removidas) ele é
+reconstruído do zero.
+
+NumPy é opcional: sem ele as rotas de `/analytics` respondem 503.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional; sem ele o snapshot fica indisponível
+    np = None
+
+from sqlalchemy import func, union_all
+from sqlmodel import Session, select
+
+from app.core.changes import DELETE
+from app.core.payroll_archive import MONTH_PATTERN, archive_table, archived_years, int_to_month, month_to_int
+from app.core.tenancy import session_tenant
+from app.logs.logger import logger
+from app.models.ChangeLog import ChangeLog
+from app.models.Employee import Employee
+from app.models.Payroll import Payroll
+
+# Teto de linhas do snapshot (limita a memória usada pelo processo)
+ANALYTICS_MAX_ROWS = int(os.getenv("ANALYTICS_MAX_ROWS", "5000000"))
+# Acima desta quantidade de alterações pendentes o snapshot é reconstruído
+ANALYTICS_INCREMENTAL_LIMIT = int(os.getenv("ANALYTICS_INCREMENTAL_LIMIT", "10000"))
+# Snapshots mantidos em memória, um por tenant (os menos usados são descartados)
+ANALYTICS_MAX_SNAPSHOTS = int(os.getenv("ANALYTICS_MAX_SNAPSHOTS", "8"))
+
+INT, FLOAT, CATEGORY, MONTH = "int", "float", "category", "month"
+
+EMPLOYEE_SCHEMA = [
+    ("id", INT),
+    ("department_id", INT),
+    ("position", CATEGORY),
+    ("admission_date", CATEGORY),
+]
+PAYROLL_SCHEMA = [
+    ("id", INT),
+    ("employee_id", INT),
+    ("reference_month", MONTH),
+    ("gross_salary", FLOAT),
+    ("deductions", FLOAT),
+    ("net_salary", FLOAT),
+    # Atributos do funcionário, copiados para agrupar sem junção
+    ("position", CATEGORY),
+    ("department_id", INT),
+]
+EMPLOYEE_ATTRIBUTES = ["position", "department_id"]
+
+# Inteiros nulos são representados por -1
+NULL_INT = -1
+INITIAL_CAPACITY = 1024
+# Fração de linhas removidas que dispara a reconstrução
+MAX_DEAD_FRACTION = 0.25
+
+
+class AnalyticsUnavailable(Exception):
+    pass
+
+
+class AnalyticsQueryError(ValueError):
+    pass
+
+
+class _ColumnTable:
+    """
+    Colunas NumPy com capacidade crescente, máscara de linhas vivas e
+    índice id → posição para aplicar alterações no lugar.
+    """
+
+    def __init__(self, schema: Sequence[Tuple[str, str]], capacity: int = INITIAL_CAPACITY):
+        self.schema = dict(schema)
+        self.size = 0
+        self.dead = 0
+        self.capacity = max(capacity, 1)
+        self.columns = {name: self._empty(kind, self.capacity) for name, kind in schema}
+        self.live = np.zeros(self.capacity, dtype=bool)
+        self.categories: Dict[str, List[str]] = {name: [] for name, kind in schema if kind == CATEGORY}
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name in self.categories}
+        self.index: Dict[int, int] = {}
+
+    @staticmethod
+    def _empty(kind: str, capacity: int):
+        if kind == FLOAT:
+            return np.full(capacity, np.nan, dtype=np.float64)
+        if kind in (CATEGORY, MONTH):
+            return np.full(capacity, NULL_INT, dtype=np.int32)
+        return np.full(capacity, NULL_INT, dtype=np.int64)
+
+    def _grow(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for name, kind in self.schema.items():
+            grown = self._empty(kind, capacity)
+            grown[:self.size] = self.columns[name][:self.size]
+            self.columns[name] = grown
+        live = np.zeros(capacity, dtype=bool)
+        live[:self.size] = self.live[:self.size]
+        self.live = live
+        self.capacity = capacity
+
+    def encode(self, name: str, value):
+        kind = self.schema[name]
+        if value is None:
+            return np.nan if kind == FLOAT else NULL_INT
+        if kind == CATEGORY:
+            codes = self._codes[name]
+            if value not in codes:
+                codes[value] = len(self.categories[name])
+                self.categories[name].append(value)
+            return codes[value]
+        if kind == MONTH:
+            # Meses fora do formato AAAA-MM são tratados como nulos
+            return month_to_int(value) if MONTH_PATTERN.match(value) else NULL_INT
+        return value
+
+    def code_of(self, name: str, value) -> Optional[int]:
+        return self._codes[name].get(value)
+
+    def decode(self, name: str, value):
+        kind = self.schema[name]
+        if kind == FLOAT:
+            return None if np.isnan(value) else float(value)
+        if value == NULL_INT:
+            return None
+        if kind == CATEGORY:
+            return self.categories[name][int(value)]
+        if kind == MONTH:
+            return int_to_month(int(value))
+        return int(value)
+
+    def load(self, rows: List[Dict]):
+        self._grow(self.size + len(rows))
+        start = self.size
+        for name in self.schema:
+            self.columns[name][start:start + len(rows)] = [self.encode(name, row.get(name)) for row in rows]
+        self.live[start:start + len(rows)] = True
+        for offset, row in enumerate(rows):
+            self.index[row["id"]] = start + offset
+        self.size += len(rows)
+
+    def upsert(self, row: Dict):
+        position = self.index.get(row["id"])
+        if position is None:
+            self.load([row])
+            return
+        for name in self.schema:
+            if name in row:
+                self.columns[name][position] = self.encode(name, row[name])
+
+    def delete(self, row_id: int):
+        position = self.index.pop(row_id, None)
+        if position is not None and self.live[position]:
+            self.live[position] = False
+            self.dead += 1
+
+    def view(self, name: str):
+        return self.columns[name][:self.size]
+
+    def memory_bytes(self) -> int:
+        arrays = sum(column.nbytes for column in self.columns.values()) + self.live.nbytes
+        strings = sum(len(value) for values in self.categories.values() for value in values)
+        return arrays + strings
+
+
+class ColumnarSnapshot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables: Dict[str, _ColumnTable] = {}
+        self.seq = 0
+        self.built_at: Optional[str] = None
+        self.refreshed_at: Optional[str] = None
+
+    def _payroll_sources(self, session: Session):
+        tables = [Payroll.__table__] + [archive_table(year) for year in archived_years(session)]
+        columns = ["id", "employee_id", "reference_month", "gross_salary", "deductions", "net_salary"]
+        return [select(*[table.c[column] for column in columns]) for table in tables]
+
+    def rebuild(self, session: Session):
+        if np is None:
+            raise AnalyticsUnavailable("NumPy não está instalado")
+        sources = self._payroll_sources(session)
+        statement = sources[0] if len(sources) == 1 else union_all(*sources)
+        payroll_count = session.execute(select(func.count()).select_from(statement.subquery())).scalar_one()
+        employee_count = session.execute(select(func.count(Employee.id))).scalar_one()
+        if payroll_count + employee_count > ANALYTICS_MAX_ROWS:
+            raise AnalyticsUnavailable(
+                f"Snapshot excederia ANALYTICS_MAX_ROWS ({payroll_count + employee_count} > {ANALYTICS_MAX_ROWS})"
+            )
+
+        seq = session.execute(select(func.coalesce(func.max(ChangeLog.seq), 0))).scalar_one()
+        employee = _ColumnTable(EMPLOYEE_SCHEMA, employee_count)
+        employee.load([dict(row) for row in session.execute(
+            select(Employee.id, Employee.department_id, Employee.position, Employee.admission_date)
+        ).mappings()])
+
+        payroll = _ColumnTable(PAYROLL_SCHEMA, payroll_count)
+        attributes = {
+            row_id: {name: employee.decode(name, employee.view(name)[position]) for name in EMPLOYEE_ATTRIBUTES}
+            for row_id, position in employee.index.items()
+        }
+        rows = []
+        for row in session.execute(statement).mappings():
+            row = dict(row)
+            row.update(attributes.get(row["employee_id"], {}))
+            rows.append(row)
+        payroll.load(rows)
+
+        self.tables = {"employee": employee, "payroll": payroll}
+        self.seq = seq
+        self.built_at = self.refreshed_at = datetime.now(timezone.utc).isoformat()
+        logger.info(f"Snapshot analítico reconstruído: {employee.size} funcionários, {payroll.size} folhas")
+
+    def refresh(self, session: Session):
+        """
+        Aplica as alterações do feed posteriores ao snapshot (ou o reconstrói).
+        """
+        if not self.tables:
+            self.rebuild(session)
+            return
+        changes = session.execute(
+            select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.operation, ChangeLog.data)
+            .where(ChangeLog.seq > self.seq, ChangeLog.entity.in_(["employee", "payroll"]))
+            .order_by(ChangeLog.seq)
+            .limit(ANALYTICS_INCREMENTAL_LIMIT + 1)
+        ).all()
+        if len(changes) > ANALYTICS_INCREMENTAL_LIMIT:
+            self.rebuild(session)
+            return
+
+        employee, payroll = self.tables["employee"], self.tables["payroll"]
+        for seq, entity, entity_id, operation, data in changes:
+            if entity == "employee":
+                self._apply_employee(employee, payroll, entity_id, operation, data)
+            else:
+                self._apply_payroll(employee, payroll, entity_id, operation, data)
+            self.seq = seq
+        self.refreshed_at = datetime.now(timezone.utc).isoformat()
+
+        if any(table.dead > MAX_DEAD_FRACTION * max(table.size, 1) for table in self.tables.values()):
+            self.rebuild(session)
+
+    def _apply_employee(self, employee: _ColumnTable, payroll: _ColumnTable, entity_id: int, operation: str, data):
+        if operation == DELETE:
+            employee.delete(entity_id)
+            return
+        row = json.loads(data)
+        employee.upsert(row)
+        # As folhas do funcionário passam a refletir o cargo/departamento novos
+        rows = payroll.view("employee_id") == entity_id
+        for name in EMPLOYEE_ATTRIBUTES:
+            if name in row:
+                payroll.view(name)[rows] = payroll.encode(name, row[name])
+
+    def _apply_payroll(self, employee: _ColumnTable, payroll: _ColumnTable, entity_id: int, operation: str, data):
+        if operation == DELETE:
+            # Folhas arquivadas continuam no snapshot, que também lê o arquivo
+            if not (data and json.loads(data).get("archived")):
+                payroll.delete(entity_id)
+            return
+        row = json.loads(data)
+        employee_id = row.get("employee_id")
+        position = employee.index.get(employee_id) if employee_id is not None else None
+        for name in EMPLOYEE_ATTRIBUTES:
+            row[name] = None if position is None else employee.decode(name, employee.view(name)[position])
+        payroll.upsert(row)
+
+    def stats(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "built_at": self.built_at,
+            "refreshed_at": self.refreshed_at,
+            "max_rows": ANALYTICS_MAX_ROWS,
+            "memory_bytes": sum(table.memory_bytes() for table in self.tables.values()),
+            "datasets": {
+                name: {
+                    "rows": int(table.live[:table.size].sum()),
+                    "dead_rows": table.dead,
+                    "capacity": table.capacity,
+                    "memory_bytes": table.memory_bytes(),
+                }
+                for name, table in self.tables.items()
+            },
+        }
+
+
+_snapshots: "OrderedDict[Optional[str], ColumnarSnapshot]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def _snapshot_for(session: Session) -> ColumnarSnapshot:
+    tenant = session_tenant(session)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(tenant)
+        if snapshot is None:
+            snapshot = _snapshots[tenant] = ColumnarSnapshot()
+            while len(_snapshots) > ANALYTICS_MAX_SNAPSHOTS:
+                _snapshots.popitem(last=False)
+        else:
+            _snapshots.move_to_end(tenant)
+        return snapshot
+
+FILTER_OPERATORS = {"==", "!=", "<", "<=", ">", ">=", "in"}
+AGGREGATE_FUNCTIONS = {"count", "sum", "avg", "min", "max"}
+
+
+def _coerce(column: str, kind: str, value):
+    """
+    Converte o valor do filtro para o tipo da coluna, ou recusa a consulta.
+    """
+    if value is None:
+        return None
+    if kind == CATEGORY:
+        if not isinstance(value, str):
+            raise AnalyticsQueryError(f"A coluna {column} exige texto: {value!r}")
+        return value
+    if kind == MONTH:
+        if not isinstance(value, str) or not MONTH_PATTERN.match(value):
+            raise AnalyticsQueryError(f"A coluna {column} exige mês no formato AAAA-MM: {value!r}")
+        return value
+    if isinstance(value, bool):
+        raise AnalyticsQueryError(f"A coluna {column} exige número: {value!r}")
+    if kind == INT and isinstance(value, int):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise AnalyticsQueryError(f"A coluna {column} exige número: {value!r}")
+    if kind == FLOAT:
+        return number
+    if not number.is_integer():
+        raise AnalyticsQueryError(f"A coluna {column} exige inteiro: {value!r}")
+    return int(number)
+
+
+def _filter_mask(table: _ColumnTable, column: str, operator: str, value):
+    if column not in table.schema:
+        raise AnalyticsQueryError(f"Coluna desconhecida: {column}")
+    if operator not in FILTER_OPERATORS:
+        raise AnalyticsQueryError(f"Operador inválido: {operator}")
+    kind = table.schema[column]
+    values = table.view(column)
+
+    if operator == "in":
+        if not isinstance(value, list):
+            raise AnalyticsQueryError("O operador 'in' exige uma lista")
+        value = [_coerce(column, kind, item) for item in value]
+        if kind == CATEGORY:
+            codes = [table.code_of(column, item) for item in value]
+            return np.isin(values, [code for code in codes if code is not None])
+        return np.isin(values, [table.encode(column, item) for item in value])
+
+    value = _coerce(column, kind, value)
+    if kind == CATEGORY:
+        if operator not in ("==", "!="):
+            raise AnalyticsQueryError(f"A coluna {column} aceita apenas ==, != e in")
+        code = table.code_of(column, value) if value is not None else NULL_INT
+        mask = values == (NULL_INT - 1 if code is None else code)
+        return ~mask if operator == "!=" else mask
+
+    encoded = table.encode(column, value)
+    return {
+        "==": np.equal, "!=": np.not_equal, "<": np.less,
+        "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    }[operator](values, encoded)
+
+
+def _aggregate(function: str, values, groups, group_count: int, counts):
+    if function == "sum":
+        return np.bincount(groups, weights=values, minlength=group_count)
+    if function == "avg":
+        return np.bincount(groups, weights=values, minlength=group_count) / np.maximum(counts, 1)
+    initial = np.inf if function == "min" else -np.inf
+    result = np.full(group_count, initial)
+    (np.minimum if function == "min" else np.maximum).at(result, groups, values)
+    return result
+
+
+def run_query(
+    session: Session,
+    dataset: str,
+    filters: List[Dict],
+    group_by: List[str],
+    aggregates: List[Dict],
+    limit: int,
+) -> Dict:
+    """
+    Avalia filtros, agrupamentos e agregações de forma vetorizada sobre o snapshot.
+    Sem `aggregates`, devolve as linhas filtradas (até `limit`).
+    """
+    if np is None:
+        raise AnalyticsUnavailable("NumPy não está instalado")
+    snapshot = _snapshot_for(session)
+    with snapshot.lock:
+        snapshot.refresh(session)
+        table = snapshot.tables.get(dataset)
+        if table is None:
+            raise AnalyticsQueryError(f"Dataset desconhecido: {dataset}")
+
+        for column in group_by + [item["column"] for item in aggregates if item.get("column")]:
+            if column not in table.schema:
+                raise AnalyticsQueryError(f"Coluna desconhecida: {column}")
+        for item in aggregates:
+            if item["func"] not in AGGREGATE_FUNCTIONS:
+                raise AnalyticsQueryError(f"Agregação inválida: {item['func']}")
+            if item["func"] == "count":
+                continue
+            if not item.get("column"):
+                raise AnalyticsQueryError(f"A agregação {item['func']} exige uma coluna")
+            if table.schema[item["column"]] not in (INT, FLOAT):
+                raise AnalyticsQueryError(f"A agregação {item['func']} exige coluna numérica")
+
+        mask = table.live[:table.size].copy()
+        for item in filters:
+            mask &= _filter_mask(table, item["column"], item["op"], item.get("value"))
+        selected = np.flatnonzero(mask)
+
+        if not aggregates:
+            columns = group_by or list(table.schema)
+            rows = [
+                {column: table.decode(column, table.view(column)[position]) for column in columns}
+                for position in selected[:limit]
+            ]
+            return {"dataset": dataset, "matched": int(len(selected)), "truncated": len(selected) > limit, "rows": rows}
+
+        if group_by:
+            keys = np.stack([table.view(column)[selected] for column in group_by], axis=1)
+            unique_keys, groups = np.unique(keys, axis=0, return_inverse=True)
+            groups = groups.reshape(-1)
+        else:
+            unique_keys, groups = np.zeros((1, 0), dtype=np.int64), np.zeros(len(selected), dtype=np.intp)
+        group_count = len(unique_keys)
+        counts = np.bincount(groups, minlength=group_count)
+
+        results = {}
+        for item in aggregates:
+            name = item.get("alias") or (f"{item['func']}_{item['column']}" if item.get("column") else item["func"])
+            if item["func"] == "count":
+                results[name] = counts
+            else:
+                values = table.view(item["column"])[selected].astype(np.float64)
+                results[name] = _aggregate(item["func"], values, groups, group_count, counts)
+
+        rows = []
+        for group in range(min(group_count, limit)):
+            row = {column: table.decode(column, unique_keys[group][index]) for index, column in enumerate(group_by)}
+            for name, values in results.items():
+                value = values[group]
+                row[name] = int(value) if values.dtype.kind == "i" else (None if counts[group] == 0 else float(value))
+            rows.append(row)
+        return {"dataset": dataset, "matched": int(len(selected)), "truncated": group_count > limit, "rows": rows}
+
+
+def snapshot_stats(session: Session, refresh: bool = True) -> Dict:
+    if np is None:
+        raise AnalyticsUnavailable("NumPy não está instalado")
+    snapshot = _snapshot_for(session)
+    with snapshot.lock:
+        if refresh:
+            snapshot.refresh(session)
+        return snapshot.stats()
+
+
+def rebuild_snapshot(session: Session) -> Dict:
+    snapshot = _snapshot_for(session)
+    with snapshot.lock:
+        snapshot.rebuild(session)
+        return snapshot.stats()
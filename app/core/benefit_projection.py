@@ -0,0 +1,240 @@
+"""
+Projeção de custos de benefícios com cenários hipotéticos (what-if).
+
+A matriz funcionário × benefício é esparsa: só existem os vínculos
+(`EmployeeBenefit`). Ela é carregada uma vez em arrays NumPy paralelos
+(benefício, departamento do funcionário, primeiro e último mês de vigência,
+valor personalizado) e cada cenário é aplicado de forma vetorizada:
+
+- custo mensal do vínculo = `custom_amount`, quando positivo, ou o valor do
+  benefício; benefícios inativos não custam nada;
+- o vínculo conta o mês cheio em todo mês entre `start_date` e `end_date`
+  (sem `end_date` válida, a vigência fica em aberto);
+- o departamento é o atual do funcionário.
+
+Os totais por departamento e mês saem de um array de diferenças: cada
+vínculo soma o custo no primeiro mês do período e subtrai após o último, e
+a soma acumulada ao longo dos meses completa a grade. O trabalho cresce com
+o número de vínculos, não com vínculos × meses.
+
+Antes de cada projeção o feed de alterações é consultado: escritas em
+benefícios, vínculos ou funcionários posteriores à carga fazem a matriz ser
+recarregada. Há uma matriz por tenant.
+
+NumPy é opcional: sem ele a rota responde 503.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional; sem ele a projeção fica indisponível
+    np = None
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.analytics import ANALYTICS_MAX_SNAPSHOTS
+from app.core.payroll_archive import MONTH_PATTERN
+from app.core.tenancy import session_tenant
+from app.logs.logger import logger
+from app.models.Benefit import Benefit
+from app.models.ChangeLog import ChangeLog
+from app.models.Employee import Employee
+from app.models.EmployeeBenefit import EmployeeBenefit
+
+# Tabelas cujas alterações invalidam a matriz
+PROJECTION_TABLES = [Benefit.__tablename__, EmployeeBenefit.__tablename__, Employee.__tablename__]
+DEFAULT_PROJECTION_MONTHS = 3
+MAX_PROJECTION_MONTHS = 120
+
+# Meses são contados como ano * 12 + (mês - 1); vigências sem data ficam em aberto
+OPEN_START = 0
+OPEN_END = 10000 * 12
+# Departamento dos vínculos de funcionários sem departamento
+NO_DEPARTMENT = -1
+
+
+class ProjectionUnavailable(Exception):
+    pass
+
+
+class ProjectionQueryError(ValueError):
+    pass
+
+
+def _month_index(value: Optional[str], default: Optional[int]) -> Optional[int]:
+    # Aceita AAAA-MM e AAAA-MM-DD
+    if not value or not MONTH_PATTERN.match(value[:7]) or not 1 <= int(value[5:7]) <= 12:
+        return default
+    return int(value[:4]) * 12 + int(value[5:7]) - 1
+
+
+def _month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class BenefitMatrix:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq: Optional[int] = None
+        self.loaded_at: Optional[str] = None
+
+    def load(self, session: Session):
+        if np is None:
+            raise ProjectionUnavailable("NumPy não está instalado")
+        seq = session.execute(select(func.coalesce(func.max(ChangeLog.seq), 0))).scalar_one()
+
+        benefits = session.execute(select(Benefit.id, Benefit.amount, Benefit.active).order_by(Benefit.id)).all()
+        self.benefit_position = {benefit_id: position for position, (benefit_id, _, _) in enumerate(benefits)}
+        self.base_amount = np.array([amount or 0.0 for _, amount, _ in benefits], dtype=np.float64)
+        self.active = np.array([bool(active) for _, _, active in benefits], dtype=bool)
+
+        links = session.execute(
+            select(
+                EmployeeBenefit.benefit_id, EmployeeBenefit.start_date, EmployeeBenefit.end_date,
+                EmployeeBenefit.custom_amount, Employee.department_id,
+            ).outerjoin(Employee, Employee.id == EmployeeBenefit.employee_id)
+        ).all()
+        links = [link for link in links if link[0] in self.benefit_position]
+        self.benefit = np.array([self.benefit_position[link[0]] for link in links], dtype=np.int64)
+        self.start = np.array([_month_index(link[1], OPEN_START) for link in links], dtype=np.int64)
+        self.end = np.array([_month_index(link[2], OPEN_END) for link in links], dtype=np.int64)
+        custom = np.array([link[3] or 0.0 for link in links], dtype=np.float64)
+        self.has_custom = custom > 0
+        self.custom = custom
+        departments = np.array(
+            [NO_DEPARTMENT if link[4] is None else link[4] for link in links], dtype=np.int64
+        )
+        self.department_ids, self.department = np.unique(departments, return_inverse=True)
+
+        self.seq = seq
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        logger.info(f"Matriz de benefícios carregada: {len(links)} vínculos, {len(benefits)} benefícios")
+
+    def refresh(self, session: Session):
+        """
+        Recarrega se houve escrita em benefícios, vínculos ou funcionários
+        desde a carga; senão só avança o `seq` conferido.
+        """
+        if self.seq is None:
+            self.load(session)
+            return
+        seq = session.execute(select(func.coalesce(func.max(ChangeLog.seq), 0))).scalar_one()
+        changed = session.execute(
+            select(ChangeLog.seq)
+            .where(ChangeLog.seq > self.seq, ChangeLog.seq <= seq, ChangeLog.entity.in_(PROJECTION_TABLES))
+            .limit(1)
+        ).first()
+        if changed is not None:
+            self.load(session)
+        else:
+            self.seq = seq
+
+    def totals(self, amount, factor, active, first_month: int, months: int):
+        """
+        Grade departamento × mês com o custo dos vínculos vigentes.
+        """
+        cost = np.where(self.has_custom, self.custom, amount[self.benefit]) * factor[self.benefit] * active[self.benefit]
+        first = np.maximum(self.start, first_month) - first_month
+        last = np.minimum(self.end, first_month + months - 1) - first_month
+        valid = (first <= last) & (cost != 0)
+        width = months + 1
+        size = len(self.department_ids) * width
+        rows = self.department[valid] * width
+        grid = (
+            np.bincount(rows + first[valid], weights=cost[valid], minlength=size)
+            - np.bincount(rows + last[valid] + 1, weights=cost[valid], minlength=size)
+        )
+        return np.cumsum(grid.reshape(len(self.department_ids), width), axis=1)[:, :months]
+
+    def project(self, changes: List[Dict], first_month: int, months: int) -> Dict:
+        amount = self.base_amount.copy()
+        factor = np.ones(len(self.base_amount))
+        active = self.active.copy()
+        for change in changes:
+            position = self.benefit_position.get(change["benefit_id"])
+            if position is None:
+                raise ProjectionQueryError(f"Benefício {change['benefit_id']} não encontrado")
+            if change.get("amount") is not None:
+                amount[position] = change["amount"]
+            if change.get("factor") is not None:
+                factor[position] = change["factor"]
+            if change.get("active") is not None:
+                active[position] = change["active"]
+
+        baseline = self.totals(self.base_amount, np.ones(len(self.base_amount)), self.active, first_month, months)
+        projected = self.totals(amount, factor, active, first_month, months)
+        departments = [
+            {
+                "department_id": None if department_id == NO_DEPARTMENT else int(department_id),
+                "baseline": np.round(baseline[row], 2).tolist(),
+                "projected": np.round(projected[row], 2).tolist(),
+                "delta": round(float(projected[row].sum() - baseline[row].sum()), 2),
+            }
+            for row, department_id in enumerate(self.department_ids)
+            if baseline[row].any() or projected[row].any()
+        ]
+        baseline_total = baseline.sum(axis=0) if len(baseline) else np.zeros(months)
+        projected_total = projected.sum(axis=0) if len(projected) else np.zeros(months)
+        return {
+            "months": [_month_label(first_month + offset) for offset in range(months)],
+            "departments": departments,
+            "totals": {
+                "baseline": np.round(baseline_total, 2).tolist(),
+                "projected": np.round(projected_total, 2).tolist(),
+                "delta": round(float(projected_total.sum() - baseline_total.sum()), 2),
+            },
+            "links": int(len(self.benefit)),
+            "loaded_at": self.loaded_at,
+        }
+
+
+_matrices: "OrderedDict[Optional[str], BenefitMatrix]" = OrderedDict()
+_matrices_lock = threading.Lock()
+
+
+def _matrix_for(session: Session) -> BenefitMatrix:
+    tenant = session_tenant(session)
+    with _matrices_lock:
+        matrix = _matrices.get(tenant)
+        if matrix is None:
+            matrix = _matrices[tenant] = BenefitMatrix()
+            while len(_matrices) > ANALYTICS_MAX_SNAPSHOTS:
+                _matrices.popitem(last=False)
+        else:
+            _matrices.move_to_end(tenant)
+        return matrix
+
+
+def project_benefit_costs(
+    session: Session, changes: List[Dict], from_month: Optional[str] = None, to_month: Optional[str] = None
+) -> Dict:
+    """
+    Custos mensais por departamento, atuais (`baseline`) e com as mudanças
+    do cenário (`projected`), de `from_month` a `to_month`.
+    """
+    if np is None:
+        raise ProjectionUnavailable("NumPy não está instalado")
+    today = date.today()
+    next_month = today.year * 12 + today.month
+    first_month = _month_index(from_month, None) if from_month else next_month
+    if first_month is None:
+        raise ProjectionQueryError(f"Mês inválido: {from_month} (use AAAA-MM)")
+    last_month = _month_index(to_month, None) if to_month else first_month + DEFAULT_PROJECTION_MONTHS - 1
+    if last_month is None:
+        raise ProjectionQueryError(f"Mês inválido: {to_month} (use AAAA-MM)")
+    months = last_month - first_month + 1
+    if not 1 <= months <= MAX_PROJECTION_MONTHS:
+        raise ProjectionQueryError(f"O período deve ter de 1 a {MAX_PROJECTION_MONTHS} meses")
+
+    matrix = _matrix_for(session)
+    with matrix.lock:
+        matrix.refresh(session)
+        started = time.perf_counter()
+        result = matrix.project(changes, first_month, months)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
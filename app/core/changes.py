@@ -0,0 +1,123 @@
+"""
+Feed de alterações para sincronização incremental.
+
+Toda escrita das rotas grava uma linha em `ChangeLog` na mesma transação,
+então o `seq` só fica visível para os consumidores junto com o commit. Os
+inserts e deletes registrados aqui também ajustam os contadores de linhas,
+e cada alteração é notificada em `/events` depois do commit.
+
+Deletes não levam dados, exceto as folhas movidas para o arquivo
+(`/pay_rolls/archive`): o `data` delas é `{"id": ..., "archived": true}`.
+
+O `seq` é atribuído no INSERT, não no commit. No SQLite as escritas são
+serializadas e os commits saem em ordem de `seq`, então quem lê `seq > since`
+nunca pula uma linha. Em bancos com escritas concorrentes (PostgreSQL), uma
+transação pode commitar depois de outra com `seq` maior; por isso fora do
+SQLite o feed só entrega alterações gravadas há mais de
+CHANGES_SAFETY_LAG_SECONDS. Transações mais longas que esse intervalo ainda
+podem ser puladas: ajuste-o acima da duração máxima das escritas.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app.core.events import queue_event
+from app.core.row_counts import adjust_row_count
+from app.models.ChangeLog import ChangeLog
+
+CHANGES_SAFETY_LAG_SECONDS = float(os.getenv("CHANGES_SAFETY_LAG_SECONDS", "5"))
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+# Efeito de cada operação no contador de linhas da tabela
+ROW_COUNT_DELTA = {INSERT: 1, DELETE: -1}
+
+# Colunas internas que não fazem sentido para os consumidores do feed
+HIDDEN_COLUMNS = {"content_hash"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def serialize_instance(instance) -> Dict:
+    return {
+        column.name: getattr(instance, column.key)
+        for column in instance.__table__.columns
+        if column.name not in HIDDEN_COLUMNS
+    }
+
+
+def record_change(session: Session, instance, operation: str):
+    """
+    Registra a alteração de um objeto do ORM. Em inserts faz flush para
+    obter o ID; em deletes grava apenas o tombstone.
+    """
+    if instance.id is None:
+        session.flush()
+    data = None if operation == DELETE else json.dumps(serialize_instance(instance), default=str)
+    changed_at = _now()
+    session.add(ChangeLog(
+        entity=instance.__tablename__,
+        entity_id=instance.id,
+        operation=operation,
+        data=data,
+        changed_at=changed_at,
+    ))
+    queue_event(session, instance.__tablename__, instance.id, operation, changed_at)
+    adjust_row_count(session, instance.__tablename__, ROW_COUNT_DELTA.get(operation, 0))
+
+
+def record_changes(session: Session, entity: str, changes: Iterable[Tuple[int, str, Optional[Dict]]]):
+    """
+    Registra em lote alterações feitas fora do ORM (upserts, deletes em massa).
+    `changes` são tuplas (entity_id, operation, data).
+    """
+    changed_at = _now()
+    rows = []
+    delta = 0
+    for entity_id, operation, data in changes:
+        rows.append({
+            "entity": entity,
+            "entity_id": entity_id,
+            "operation": operation,
+            "data": None if data is None else json.dumps(
+                {key: value for key, value in data.items() if key not in HIDDEN_COLUMNS}, default=str
+            ),
+            "changed_at": changed_at,
+        })
+        queue_event(session, entity, entity_id, operation, changed_at)
+        delta += ROW_COUNT_DELTA.get(operation, 0)
+    if rows:
+        session.execute(insert(ChangeLog), rows)
+    adjust_row_count(session, entity, delta)
+
+
+def read_changes(session: Session, since: int, limit: int, entity: Optional[str] = None):
+    statement = select(
+        ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id,
+        ChangeLog.operation, ChangeLog.data, ChangeLog.changed_at
+    ).where(ChangeLog.seq > since)
+    if session.get_bind().dialect.name != "sqlite" and CHANGES_SAFETY_LAG_SECONDS:
+        # Alterações recentes podem ter `seq` menor que outras ainda não commitadas
+        horizon = datetime.now(timezone.utc) - timedelta(seconds=CHANGES_SAFETY_LAG_SECONDS)
+        statement = statement.where(ChangeLog.changed_at <= horizon.isoformat())
+    if entity:
+        statement = statement.where(ChangeLog.entity == entity)
+    return session.execute(statement.order_by(ChangeLog.seq).limit(limit)).all()
+
+
+def change_to_ndjson(change) -> str:
+    seq, entity, entity_id, operation, data, changed_at = change
+    # `data` já está em JSON no banco: é embutido sem decodificar de novo
+    return (
+        f'{{"seq": {seq}, "entity": {json.dumps(entity)}, "entity_id": {entity_id}, '
+        f'"operation": {json.dumps(operation)}, "changed_at": {json.dumps(changed_at)}, '
+        f'"data": {data if data is not None else "null"}}}\n'
+    )
@@ -0,0 +1,270 @@
+import gzip
+import os
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele apenas gzip é oferecido
+    brotli = None
+
+# Tamanho mínimo (bytes) para comprimir respostas não-streaming
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500"))
+# Nível padrão do gzip (1-9) e qualidade padrão do brotli (0-11)
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Tipos de conteúdo que valem a pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain")
+# Tipos enviados em streaming, comprimidos pedaço a pedaço com flush
+STREAMING_TYPES = ("application/x-ndjson", "text/csv")
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """
+    Converte "br;q=0, gzip;q=0.8, *" em {"br": 0.0, "gzip": 0.8, "*": 1.0}.
+    """
+    codings = {}
+    for item in value.lower().split(","):
+        name, *parameters = [part.strip() for part in item.split(";")]
+        if not name:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        codings[name] = quality
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Codificação suportada com o maior q aceito pelo cliente (brotli no
+    empate); q=0 recusa a codificação, inclusive via "*".
+    """
+    codings = parse_accept_encoding(accept_encoding)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = codings.get(encoding, codings.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def parse_route_levels(value: Optional[str]) -> Dict[str, int]:
+    """
+    Converte "/departments=9,/pay_rolls/export=1" em {"/departments": 9, ...}.
+    """
+    levels = {}
+    if not value:
+        return levels
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        prefix, level = item.split("=", 1)
+        levels[prefix.strip()] = int(level)
+    return levels
+
+
+# Níveis por rota, ex.: COMPRESSION_ROUTE_LEVELS="/departments=9,/pay_rolls/export=1"
+# (nível 0 desliga a compressão na rota)
+COMPRESSION_ROUTE_LEVELS = parse_route_levels(os.getenv("COMPRESSION_ROUTE_LEVELS"))
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        # wbits=31 gera o cabeçalho/rodapé gzip
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        chunk = self._compressor.compress(data)
+        if flush:
+            chunk += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return chunk
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        chunk = self._compressor.process(data)
+        if flush:
+            chunk += self._compressor.flush()
+        return chunk
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respostas com brotli ou gzip.
+
+    - Respostas completas abaixo de `minimum_size` seguem sem compressão.
+    - Respostas NDJSON/CSV em streaming são comprimidas pedaço a pedaço,
+      com flush a cada pedaço para o cliente não ficar esperando o fim.
+    - `route_levels` define o nível por prefixo de rota (o mais longo vence),
+      permitindo equilibrar CPU e banda em cada endpoint.
+    - A codificação segue os q-values de Accept-Encoding. Respostas que
+      poderiam ser comprimidas levam `Vary: Accept-Encoding` mesmo quando
+      seguem sem compressão, para caches não servirem a variante errada.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        route_levels: Optional[Dict[str, int]] = None,
+    ):
+        if route_levels is None:
+            route_levels = COMPRESSION_ROUTE_LEVELS
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # Ordena do prefixo mais longo para o mais curto
+        self.route_levels = sorted(route_levels.items(), key=lambda item: -len(item[0]))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        level = self._route_level(scope["path"])
+        if level == 0:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, self._choose_encoding(scope), level, self)
+        await self.app(scope, receive, responder)
+
+    def _choose_encoding(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                return choose_encoding(value.decode("latin-1"))
+        return None
+
+    def _route_level(self, path: str) -> Optional[int]:
+        for prefix, level in self.route_levels:
+            if path.startswith(prefix):
+                return level
+        return None
+
+    def level_for(self, encoding: str, level: Optional[int]) -> int:
+        """
+        Traduz o nível da rota para a escala do algoritmo escolhido
+        (gzip 1-9, brotli 0-11).
+        """
+        if encoding == "br":
+            return self.brotli_quality if level is None else min(level, 11)
+        return self.gzip_level if level is None else min(level, 9)
+
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: Optional[str], level: Optional[int], middleware: CompressionMiddleware):
+        self.send = send
+        self.encoding = encoding
+        self.level = middleware.level_for(encoding, level) if encoding else None
+        self.minimum_size = middleware.minimum_size
+        self.start_message = None
+        self.stream = None
+        self.passthrough = False
+        self.streaming_type = False
+        self.started = False
+
+    async def __call__(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if b"content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+            self.streaming_type = content_type.startswith(STREAMING_TYPES)
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            await self._send_start()
+            await self.send(message)
+            return
+
+        if self.stream is None:
+            if self.encoding is None or (not more_body and len(body) < self.minimum_size):
+                # Cliente sem codificação aceita, ou resposta pequena: comprimir
+                # custaria mais do que economiza
+                self.passthrough = True
+                await self._send_start(vary=True)
+                await self.send(message)
+                return
+            if not more_body:
+                payload = self._compress_whole(body)
+                await self._send_start(compressed=True, compressed_length=len(payload))
+                await self.send({"type": "http.response.body", "body": payload})
+                return
+            self.stream = self._new_stream()
+            await self._send_start(compressed=True)
+
+        # NDJSON/CSV recebem flush por pedaço; outros streams só no final
+        chunk = self.stream.compress(body, flush=self.streaming_type) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _new_stream(self):
+        if self.encoding == "br":
+            return _BrotliStream(self.level)
+        return _GzipStream(self.level)
+
+    def _compress_whole(self, body: bytes) -> bytes:
+        if self.encoding == "br":
+            return brotli.compress(body, quality=self.level)
+        return gzip.compress(body, compresslevel=self.level)
+
+    async def _send_start(self, compressed: bool = False, compressed_length: Optional[int] = None, vary: bool = False):
+        if self.started:
+            return
+        self.started = True
+        message = self.start_message
+        if compressed or vary:
+            headers = list(message.get("headers", []))
+            if compressed:
+                headers = [
+                    (name, value) for name, value in headers
+                    if name.lower() not in (b"content-length", b"content-encoding")
+                ]
+                headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+                if compressed_length is not None:
+                    headers.append((b"content-length", str(compressed_length).encode("latin-1")))
+            message = {**message, "headers": _with_vary(headers)}
+        await self.send(message)
+
+
+def _with_vary(headers):
+    """
+    Acrescenta Accept-Encoding ao Vary da resposta, sem duplicar.
+    """
+    values = [value.decode("latin-1") for name, value in headers if name.lower() == b"vary"]
+    fields = [field.strip() for value in values for field in value.split(",") if field.strip()]
+    if "*" in fields or any(field.lower() == "accept-encoding" for field in fields):
+        return headers
+    headers = [(name, value) for name, value in headers if name.lower() != b"vary"]
+    headers.append((b"vary", ", ".join(fields + ["Accept-Encoding"]).encode("latin-1")))
+    return headers
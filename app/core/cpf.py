@@ -0,0 +1,46 @@
+"""
+Normalização e validação de CPF.
+
+O CPF é gravado como enviado (com ou sem pontuação) e também só com os
+dígitos em `Employee.cpf_normalized`, que tem índice único: a busca exata e
+a detecção de duplicados viram uma consulta pelo índice, qualquer que seja
+a formatação. Este módulo não depende dos modelos, que o usam nos
+validadores de entrada.
+"""
+import re
+
+CPF_LENGTH = 11
+
+
+def normalize_cpf(value: str) -> str:
+    """
+    Só os dígitos do CPF (`123.456.789-09` -> `12345678909`).
+    """
+    return re.sub(r"\D", "", value or "")
+
+
+def _check_digit(digits: str) -> int:
+    weight = len(digits) + 1
+    remainder = sum(int(digit) * (weight - index) for index, digit in enumerate(digits)) * 10 % 11
+    return 0 if remainder == 10 else remainder
+
+
+def is_valid_cpf(value: str) -> bool:
+    """
+    Confere o tamanho e os dois dígitos verificadores. Sequências de um só
+    dígito (`111.111.111-11`) passam na conta, mas não são CPFs válidos.
+    """
+    digits = normalize_cpf(value)
+    if len(digits) != CPF_LENGTH or len(set(digits)) == 1:
+        return False
+    return _check_digit(digits[:9]) == int(digits[9]) and _check_digit(digits[:10]) == int(digits[10])
+
+
+def validate_cpf(value: str) -> str:
+    """
+    Validador dos modelos de entrada: devolve o valor como veio ou levanta
+    ValueError (422 na API).
+    """
+    if not is_valid_cpf(value):
+        raise ValueError("CPF inválido")
+    return value
@@ -1,6 +1,27 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import Integer, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from collections import OrderedDict
 from dotenv import load_dotenv
+from fastapi import HTTPException, Request
 import os
+import threading
+
+from app.core.dedupe import ensure_cpf_normalized
+from app.core.org_chart import ensure_org_closure
+from app.core.query_timeouts import install_query_timeouts
+from app.core.replicas import READ_METHODS, ReplicaSet, client_id
+from app.core.row_counts import ensure_row_counts
+from app.core.slow_queries import install_slow_query_log
+from app.core.tenancy import (
+    TENANT_MAX_ENGINES, TENANT_MAX_OVERFLOW, TENANT_POOL_SIZE, InvalidTenant, UnknownTenant, resolve_tenant, tenant_url
+)
+from app.logs.logger import logger
+from app.models.Benefit import Benefit
+from app.models.Employee import Employee
+from app.models.EmployeeBenefit import EmployeeBenefit
+from app.models.Payroll import Payroll
 
 # Carrega as variáveis do .env
 load_dotenv()
@@ -8,14 +29,204 @@ load_dotenv()
 # Obtém a variável de ambiente DATABASE_URL
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Réplicas de leitura do banco padrão, separadas por vírgula (opcional)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Loga todos os comandos SQL (muito verboso; as consultas lentas já são
+# registradas à parte em /debug/slow-queries)
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+
+def _create_engine(url, **kwargs):
+    new_engine = create_engine(url, echo=SQL_ECHO, **kwargs)
+    install_slow_query_log(new_engine)
+    install_query_timeouts(new_engine)
+    return new_engine
+
 # Cria o engine com a URL do banco
-engine = create_engine(DATABASE_URL, echo=True)
+engine = _create_engine(DATABASE_URL)
+replicas = ReplicaSet(engine, [_create_engine(url) for url in DATABASE_REPLICA_URLS])
+
+# Engines dos tenants, do menos para o mais usado recentemente
+_tenant_engines: OrderedDict = OrderedDict()
+# Tenants cujo schema já foi conferido neste processo
+_prepared_tenants = set()
+_tenant_lock = threading.Lock()
+
+def ensure_column(session: Session, model, column: str, definition: str):
+    """
+    Cria a coluna em bancos anteriores a ela; o create_all não altera tabelas
+    que já existem.
+    """
+    table = model.__tablename__
+    if column not in {existing["name"] for existing in inspect(session.get_bind()).get_columns(table)}:
+        session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+        logger.info(f"Coluna {table}.{column} criada")
+
+def ensure_content_hash(session: Session):
+    # Linhas antigas ficam sem hash e são regravadas no primeiro upsert
+    for model in (Employee, Payroll):
+        ensure_column(session, model, "content_hash", "VARCHAR")
+    session.commit()
+
+def ensure_version(session: Session):
+    # Linhas antigas começam na versão 1
+    for model in (Benefit, Employee, EmployeeBenefit, Payroll):
+        ensure_column(session, model, "version", "INTEGER NOT NULL DEFAULT 1")
+    session.commit()
+
+def create_db_and_tables(bind=None):
+    bind = bind or engine
+    SQLModel.metadata.create_all(bind)
+    with Session(bind) as session:
+        ensure_content_hash(session)
+        ensure_version(session)
+        ensure_cpf_normalized(session)
+    ensure_indexes(bind)
+    with Session(bind) as session:
+        ensure_row_counts(session)
+        ensure_org_closure(session)
+
+# Índices que saíram dos modelos e são removidos dos bancos existentes
+OBSOLETE_INDEXES = [
+    # CPF como digitado: a chave natural é o CPF normalizado
+    "ux_employee_cpf",
+]
+
+def ensure_indexes(bind=None):
+    """
+    O create_all só cria índices junto com tabelas novas; aqui os índices
+    declarados nos modelos são criados também em bancos já existentes, e os
+    obsoletos são removidos.
+    """
+    with (bind or engine).begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=bind or engine, checkfirst=True)
+            except SQLAlchemyError:
+                # Ex.: dados duplicados impedem um índice único
+                logger.exception(f"Não foi possível criar o índice {index.name}")
+
+def coerce_returning(columns, row) -> dict:
+    """
+    Converte uma linha de RETURNING em dict. Algumas versões do SQLite
+    devolvem inteiros como REAL no RETURNING; aqui eles voltam a ser int.
+    """
+    return {
+        column.name: int(row[column.name]) if isinstance(column.type, Integer) and row[column.name] is not None else row[column.name]
+        for column in columns
+    }
+
+def execute_returning(session: Session, statement, columns) -> list:
+    """
+    Executa um INSERT/UPDATE/DELETE com RETURNING das colunas informadas e
+    devolve as linhas afetadas como dicts, num único comando.
+    """
+    return [coerce_returning(columns, row) for row in session.execute(statement.returning(*columns)).mappings()]
+
+def _tenant_database_exists(url, tenant_engine) -> bool:
+    if url.get_backend_name() == "sqlite":
+        # Conectar criaria um arquivo vazio para qualquer tenant informado
+        return bool(url.database) and os.path.exists(url.database)
+    return inspect(tenant_engine).has_table(Employee.__tablename__)
+
+def tenant_engine(tenant: str):
+    """
+    Engine do tenant, criado na primeira requisição. Acima de
+    TENANT_MAX_ENGINES o engine usado há mais tempo é descartado (as conexões
+    livres do pool são fechadas; as em uso fecham ao serem devolvidas).
+    """
+    with _tenant_lock:
+        cached = _tenant_engines.get(tenant)
+        if cached is not None:
+            _tenant_engines.move_to_end(tenant)
+            return cached
+
+    url = make_url(tenant_url(tenant))
+    if url.get_backend_name() == "sqlite" and not _tenant_database_exists(url, None):
+        raise UnknownTenant(tenant)
+    new_engine = _create_engine(url, pool_size=TENANT_POOL_SIZE, max_overflow=TENANT_MAX_OVERFLOW)
+    try:
+        if url.get_backend_name() != "sqlite" and not _tenant_database_exists(url, new_engine):
+            raise UnknownTenant(tenant)
+        if tenant not in _prepared_tenants:
+            create_db_and_tables(new_engine)
+            _prepared_tenants.add(tenant)
+    except Exception:
+        new_engine.dispose()
+        raise
+
+    with _tenant_lock:
+        cached = _tenant_engines.get(tenant)
+        if cached is not None:
+            # Outra requisição criou o engine ao mesmo tempo
+            new_engine.dispose()
+            _tenant_engines.move_to_end(tenant)
+            return cached
+        _tenant_engines[tenant] = new_engine
+        while len(_tenant_engines) > TENANT_MAX_ENGINES:
+            evicted_tenant, evicted = _tenant_engines.popitem(last=False)
+            evicted.dispose()
+            logger.info(f"Engine do tenant {evicted_tenant} descartado")
+    logger.info(f"Engine do tenant {tenant} criado")
+    return new_engine
+
+def create_tenant_database(tenant: str):
+    """
+    Cria o banco (arquivo SQLite ou schema com o nome do tenant) e as tabelas.
+    """
+    url = make_url(tenant_url(tenant))
+    if url.get_backend_name() == "sqlite" and url.database:
+        os.makedirs(os.path.dirname(os.path.abspath(url.database)), exist_ok=True)
+    new_engine = _create_engine(url)
+    try:
+        if url.get_backend_name() == "postgresql":
+            with new_engine.begin() as connection:
+                connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{tenant}"'))
+        create_db_and_tables(new_engine)
+    finally:
+        new_engine.dispose()
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        session.commit()
+def request_engines(request) -> list:
+    """
+    Engines que podem atender a requisição, sem criar engines de tenant nem
+    avançar o rodízio das réplicas. Tenant sem engine em cache (ou inválido)
+    devolve lista vazia: não há pool para esgotar.
+    """
+    try:
+        tenant = resolve_tenant(request.headers)
+    except InvalidTenant:
+        return []
+    if tenant is not None:
+        with _tenant_lock:
+            cached = _tenant_engines.get(tenant)
+        return [] if cached is None else [cached]
+    if request.method in READ_METHODS:
+        return replicas.read_candidates(client_id(request))
+    return [engine]
 
-def get_session():
-    with Session(engine) as session:
+def get_session(request: Request):
+    """
+    Sessão no banco do tenant da requisição ou no banco padrão; no banco
+    padrão, leituras (GET) vão a uma réplica, se houver. O tenant fica em
+    `session.info["tenant"]` e a leitura em réplica, em `session.info["replica"]`.
+    """
+    try:
+        tenant = resolve_tenant(request.headers)
+        bind = engine if tenant is None else tenant_engine(tenant)
+    except InvalidTenant as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except UnknownTenant:
+        logger.warning(f"Tenant não encontrado: {tenant}")
+        raise HTTPException(status_code=404, detail="Tenant não encontrado")
+    client = client_id(request)
+    reading = request.method in READ_METHODS
+    if tenant is None and reading:
+        bind = replicas.read_engine(client)
+    with Session(bind, info={"tenant": tenant, "replica": replicas.is_replica(bind)}) as session:
         yield session
+    if tenant is None and not reading:
+        # Escrita concluída: as próximas leituras do cliente vão ao primário
+        replicas.record_write(client)
@@ -0,0 +1,112 @@
+"""
+Detecção de funcionários duplicados pelo CPF normalizado.
+
+`Employee.cpf_normalized` (só dígitos, índice único) é preenchido em toda
+escrita: pelo ORM (evento abaixo), pelo upsert e pela atualização parcial.
+Antes de uma carga, `dedupe_report` diz, numa consulta pelo índice por
+bloco, quais CPFs do lote são inválidos, quais se repetem no lote e quais já
+existem no banco.
+
+Bancos anteriores à coluna são completados na inicialização
+(`ensure_cpf_normalized`). CPFs que só diferem na formatação ficam sem o
+valor normalizado e são listados no log para correção manual.
+"""
+from typing import Dict, List
+
+from sqlalchemy import bindparam, event, inspect, text, update
+from sqlmodel import Session, select
+
+from app.core.cpf import is_valid_cpf, normalize_cpf
+from app.logs.logger import logger
+from app.models.Employee import Employee
+
+# CPFs (ou linhas) por comando, dentro do limite de parâmetros do SQLite
+DEDUPE_CHUNK_SIZE = 500
+
+
+def _set_cpf_normalized(mapper, connection, target):
+    target.cpf_normalized = normalize_cpf(target.cpf)
+
+
+event.listen(Employee, "before_insert", _set_cpf_normalized)
+event.listen(Employee, "before_update", _set_cpf_normalized)
+
+
+def ensure_cpf_normalized(session: Session):
+    """
+    Cria a coluna em bancos antigos (o create_all não altera tabelas) e
+    preenche as linhas sem o CPF normalizado. Deve rodar antes de
+    `ensure_indexes`, que cria o índice único.
+    """
+    table = Employee.__table__
+    bind = session.get_bind()
+    if "cpf_normalized" not in {column["name"] for column in inspect(bind).get_columns(table.name)}:
+        session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN cpf_normalized VARCHAR"))
+        logger.info("Coluna employee.cpf_normalized criada")
+
+    pending = session.execute(select(table.c.id, table.c.cpf).where(table.c.cpf_normalized.is_(None))).all()
+    if not pending:
+        session.commit()
+        return
+    taken = set(session.execute(select(table.c.cpf_normalized).where(table.c.cpf_normalized.is_not(None))).scalars())
+    values, conflicts = [], []
+    for employee_id, cpf in pending:
+        digits = normalize_cpf(cpf)
+        if not digits or digits in taken:
+            conflicts.append(employee_id)
+            continue
+        taken.add(digits)
+        values.append({"employee_id": employee_id, "digits": digits})
+
+    statement = update(table).where(table.c.id == bindparam("employee_id")).values(cpf_normalized=bindparam("digits"))
+    for start in range(0, len(values), DEDUPE_CHUNK_SIZE):
+        session.execute(statement, values[start:start + DEDUPE_CHUNK_SIZE])
+    session.commit()
+    logger.info(f"CPF normalizado preenchido em {len(values)} funcionários")
+    if conflicts:
+        logger.warning(f"Funcionários com CPF vazio ou duplicado após a normalização (IDs): {conflicts}")
+
+
+def find_by_cpf(session: Session, digits: List[str]) -> Dict[str, int]:
+    """
+    {CPF normalizado: ID} dos CPFs já cadastrados, em blocos pelo índice único.
+    """
+    found = {}
+    for start in range(0, len(digits), DEDUPE_CHUNK_SIZE):
+        chunk = digits[start:start + DEDUPE_CHUNK_SIZE]
+        found.update(session.execute(
+            select(Employee.cpf_normalized, Employee.id).where(Employee.cpf_normalized.in_(chunk))
+        ).all())
+    return found
+
+
+def dedupe_report(session: Session, cpfs: List[str]) -> Dict:
+    """
+    Classifica os CPFs de um lote (posições começando em 0):
+    - invalid: formato ou dígitos verificadores inválidos;
+    - duplicated: mesmo CPF em mais de uma posição do lote;
+    - existing: CPF já cadastrado (com o ID do funcionário);
+    - new: quantos CPFs distintos e válidos ainda não existem.
+    """
+    invalid = []
+    positions: Dict[str, List[int]] = {}
+    for position, cpf in enumerate(cpfs):
+        if not is_valid_cpf(cpf):
+            invalid.append({"position": position, "cpf": cpf})
+            continue
+        positions.setdefault(normalize_cpf(cpf), []).append(position)
+
+    existing = find_by_cpf(session, list(positions))
+    return {
+        "total": len(cpfs),
+        "invalid": invalid,
+        "duplicated": [
+            {"cpf": digits, "positions": found}
+            for digits, found in positions.items() if len(found) > 1
+        ],
+        "existing": [
+            {"cpf": digits, "employee_id": existing[digits], "positions": found}
+            for digits, found in positions.items() if digits in existing
+        ],
+        "new": sum(1 for digits in positions if digits not in existing),
+    }
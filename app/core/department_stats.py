@@ -0,0 +1,232 @@
+"""
+Manutenção incremental dos contadores por departamento.
+
+As rotas de escrita de funcionários, folhas de pagamento e departamentos
+chamam estas funções dentro da mesma transação da alteração, de modo que
+`/departments/stats` lê tudo em O(departamentos), sem `joinedload`.
+
+Recalcular do zero:
+    python -m app.core.department_stats rebuild
+"""
+import sys
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, union_all, update
+from sqlmodel import Session, select
+
+from app.core.payroll_archive import archive_table, archived_years
+from app.models.Department import Department
+from app.models.DepartmentStats import DepartmentPayrollStats, DepartmentStats
+from app.models.Employee import Employee
+from app.models.Payroll import Payroll
+
+
+def current_reference_month() -> str:
+    return date.today().strftime("%Y-%m")
+
+
+def adjust_headcount(session: Session, department_id: Optional[int], delta: int):
+    if department_id is None or delta == 0:
+        return
+    result = session.execute(
+        update(DepartmentStats)
+        .where(DepartmentStats.department_id == department_id)
+        .values(headcount=DepartmentStats.headcount + delta)
+    )
+    if result.rowcount == 0:
+        session.execute(insert(DepartmentStats).values(department_id=department_id, headcount=max(delta, 0)))
+
+
+def adjust_payroll_totals(
+    session: Session,
+    department_id: Optional[int],
+    reference_month: str,
+    count: int,
+    gross: float,
+    net: float,
+):
+    if department_id is None or (count == 0 and gross == 0 and net == 0):
+        return
+    result = session.execute(
+        update(DepartmentPayrollStats)
+        .where(
+            DepartmentPayrollStats.department_id == department_id,
+            DepartmentPayrollStats.reference_month == reference_month,
+        )
+        .values(
+            payroll_count=DepartmentPayrollStats.payroll_count + count,
+            gross_total=DepartmentPayrollStats.gross_total + gross,
+            net_total=DepartmentPayrollStats.net_total + net,
+        )
+    )
+    if result.rowcount == 0:
+        session.execute(insert(DepartmentPayrollStats).values(
+            department_id=department_id,
+            reference_month=reference_month,
+            payroll_count=count,
+            gross_total=gross,
+            net_total=net,
+        ))
+
+
+def employee_department_id(session: Session, employee_id: Optional[int]) -> Optional[int]:
+    if employee_id is None:
+        return None
+    return session.execute(
+        select(Employee.department_id).where(Employee.id == employee_id)
+    ).scalar_one_or_none()
+
+
+def move_employee(
+    session: Session,
+    employee_id: int,
+    old_department_id: Optional[int],
+    new_department_id: Optional[int],
+):
+    """
+    Transfere o funcionário (e os totais das suas folhas) entre departamentos.
+    `None` em um dos lados representa entrada/saída do quadro.
+    """
+    if old_department_id == new_department_id:
+        return
+    adjust_headcount(session, old_department_id, -1)
+    adjust_headcount(session, new_department_id, 1)
+
+    totals = session.execute(
+        select(
+            Payroll.reference_month,
+            func.count(Payroll.id),
+            func.coalesce(func.sum(Payroll.gross_salary), 0),
+            func.coalesce(func.sum(Payroll.net_salary), 0),
+        )
+        .where(Payroll.employee_id == employee_id)
+        .group_by(Payroll.reference_month)
+    ).all()
+    for reference_month, count, gross, net in totals:
+        adjust_payroll_totals(session, old_department_id, reference_month, -count, -gross, -net)
+        adjust_payroll_totals(session, new_department_id, reference_month, count, gross, net)
+
+
+def subtract_payrolls(session: Session, department_id: Optional[int], payrolls):
+    """
+    Retira dos totais do departamento as folhas informadas (dicts com
+    reference_month, gross_salary e net_salary), agrupadas por mês.
+    """
+    if department_id is None:
+        return
+    totals = {}
+    for payroll in payrolls:
+        total = totals.setdefault(payroll["reference_month"], [0, 0.0, 0.0])
+        total[0] += 1
+        total[1] += payroll["gross_salary"]
+        total[2] += payroll["net_salary"]
+    for reference_month, (count, gross, net) in totals.items():
+        adjust_payroll_totals(session, department_id, reference_month, -count, -gross, -net)
+
+
+def remove_reference_month(session: Session, reference_month: str):
+    session.execute(delete(DepartmentPayrollStats).where(DepartmentPayrollStats.reference_month == reference_month))
+
+
+def remove_department(session: Session, department_id: int):
+    session.execute(delete(DepartmentStats).where(DepartmentStats.department_id == department_id))
+    session.execute(delete(DepartmentPayrollStats).where(DepartmentPayrollStats.department_id == department_id))
+
+
+def rebuild_department_stats(session: Session):
+    """
+    Recalcula todos os contadores a partir das tabelas de origem. Os totais
+    mensais incluem os meses arquivados, como no caminho incremental.
+    """
+    session.execute(delete(DepartmentStats))
+    session.execute(delete(DepartmentPayrollStats))
+
+    headcounts = session.execute(
+        select(Department.id, func.count(Employee.id))
+        .outerjoin(Employee, Employee.department_id == Department.id)
+        .group_by(Department.id)
+    ).all()
+    if headcounts:
+        session.execute(insert(DepartmentStats), [
+            {"department_id": department_id, "headcount": headcount}
+            for department_id, headcount in headcounts
+        ])
+
+    tables = [Payroll.__table__] + [archive_table(year) for year in archived_years(session)]
+    sources = [
+        select(table.c.id, table.c.employee_id, table.c.reference_month, table.c.gross_salary, table.c.net_salary)
+        for table in tables
+    ]
+    payrolls = (sources[0] if len(sources) == 1 else union_all(*sources)).subquery()
+    totals = session.execute(
+        select(
+            Employee.department_id,
+            payrolls.c.reference_month,
+            func.count(payrolls.c.id),
+            func.sum(payrolls.c.gross_salary),
+            func.sum(payrolls.c.net_salary),
+        )
+        .join(Employee, Employee.id == payrolls.c.employee_id)
+        .join(Department, Department.id == Employee.department_id)
+        .group_by(Employee.department_id, payrolls.c.reference_month)
+    ).all()
+    if totals:
+        session.execute(insert(DepartmentPayrollStats), [
+            {
+                "department_id": department_id,
+                "reference_month": reference_month,
+                "payroll_count": count,
+                "gross_total": gross,
+                "net_total": net,
+            }
+            for department_id, reference_month, count, gross, net in totals
+        ])
+    session.commit()
+
+
+def get_department_stats(session: Session, reference_month: str):
+    statement = (
+        select(
+            Department.id,
+            Department.name,
+            Department.manager_id,
+            func.coalesce(DepartmentStats.headcount, 0),
+            func.coalesce(DepartmentPayrollStats.payroll_count, 0),
+            func.coalesce(DepartmentPayrollStats.gross_total, 0),
+            func.coalesce(DepartmentPayrollStats.net_total, 0),
+        )
+        .outerjoin(DepartmentStats, DepartmentStats.department_id == Department.id)
+        .outerjoin(
+            DepartmentPayrollStats,
+            (DepartmentPayrollStats.department_id == Department.id)
+            & (DepartmentPayrollStats.reference_month == reference_month),
+        )
+        .order_by(Department.id)
+    )
+    return [
+        {
+            "department_id": department_id,
+            "name": name,
+            "manager_id": manager_id,
+            "headcount": headcount,
+            "reference_month": reference_month,
+            "payroll_count": payroll_count,
+            "gross_total": gross_total,
+            "net_total": net_total,
+        }
+        for department_id, name, manager_id, headcount, payroll_count, gross_total, net_total
+        in session.execute(statement).all()
+    ]
+
+
+if __name__ == "__main__":
+    from app.core.db import create_db_and_tables, engine
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Uso: python -m app.core.department_stats rebuild")
+        sys.exit(1)
+    create_db_and_tables()
+    with Session(engine) as session:
+        rebuild_department_stats(session)
+    print("Contadores de departamento recalculados.")
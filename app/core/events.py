@@ -0,0 +1,168 @@
+"""
+Notificações de alterações em tempo real (SSE e WebSocket).
+
+As escritas já passam por `record_change` / `record_changes`, que enfileiram
+aqui um evento leve (tabela, ID, operação) em `session.info`. Só depois do
+commit os eventos são publicados; num rollback são descartados. Assim o
+cliente nunca é avisado de algo que não foi gravado.
+
+A publicação vem das threads das rotas síncronas e é entregue no event loop
+(`call_soon_threadsafe`), onde cada conexão tem uma fila limitada
+(EVENTS_QUEUE_SIZE). Um cliente lento não segura os demais: quando a fila
+dele enche, os eventos excedentes são descartados e ele recebe um aviso
+`overflow` com a quantidade perdida, para reler o que precisar (por exemplo
+em `/changes?since=`). Uma conexão ociosa custa uma fila vazia e um
+keepalive a cada EVENTS_KEEPALIVE_SECONDS.
+
+O pub/sub é do processo: com vários workers, cada um avisa os próprios
+clientes das escritas que ele fez. Outros módulos do processo que dependem
+das escritas confirmadas se registram com `on_commit`.
+"""
+import asyncio
+import itertools
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.tenancy import session_tenant
+from app.logs.logger import logger
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+
+# Chave de `session.info` com os eventos da transação em andamento
+PENDING_KEY = "pending_events"
+
+# Chamados após cada commit com alterações, com (tenant, eventos)
+_commit_listeners: List[Callable[[Optional[str], List[Dict]], None]] = []
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscriber:
+    """
+    Uma conexão: fila limitada e contagem de eventos descartados desde a
+    última entrega.
+    """
+
+    def __init__(self, tenant: Optional[str], entities: Optional[Set[str]]):
+        self.tenant = tenant
+        self.entities = entities
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, tenant: Optional[str], entity: str) -> bool:
+        return tenant == self.tenant and (not self.entities or entity in self.entities)
+
+    async def next(self, timeout: float) -> Optional[Dict]:
+        """
+        Próxima mensagem: um aviso de overflow, se houve descarte, ou um
+        evento. None quando nada chega em `timeout` (hora do keepalive).
+        """
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return {"type": "overflow", "dropped": dropped}
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, tenant: Optional[str], entities: Optional[Iterable[str]] = None) -> Subscriber:
+        # Chamado no event loop, que passa a receber as publicações
+        if len(self._subscribers) >= EVENTS_MAX_SUBSCRIBERS:
+            raise TooManySubscribers()
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(tenant, set(entities) if entities else None)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, tenant: Optional[str], events: List[Dict]):
+        """
+        Publica a partir de qualquer thread. Sem conexões abertas não custa nada.
+        """
+        if not events or not self._subscribers or self._loop is None:
+            return
+        with self._lock:
+            for item in events:
+                item["id"] = next(self._ids)
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, tenant, events)
+        except RuntimeError:
+            # Event loop encerrado (desligamento do servidor)
+            self._loop = None
+
+    def _dispatch(self, tenant: Optional[str], events: List[Dict]):
+        self.published += len(events)
+        for subscriber in list(self._subscribers):
+            for item in events:
+                if not subscriber.wants(tenant, item["entity"]):
+                    continue
+                try:
+                    subscriber.queue.put_nowait(item)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    subscriber.dropped += 1
+                    self.dropped += 1
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "queue_size": EVENTS_QUEUE_SIZE,
+        }
+
+
+broker = EventBroker()
+
+
+def queue_event(session, entity: str, entity_id: Optional[int], operation: str, changed_at: str, **extra):
+    """
+    Enfileira um evento para ser publicado no commit da sessão.
+    """
+    session.info.setdefault(PENDING_KEY, []).append({
+        "type": "change", "entity": entity, "entity_id": entity_id,
+        "operation": operation, "changed_at": changed_at, **extra,
+    })
+
+
+def on_commit(listener: Callable[[Optional[str], List[Dict]], None]):
+    _commit_listeners.append(listener)
+    return listener
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    events = session.info.pop(PENDING_KEY, None)
+    if events:
+        tenant = session_tenant(session)
+        for listener in _commit_listeners:
+            listener(tenant, events)
+        broker.publish(tenant, events)
+        logger.debug(f"{len(events)} eventos publicados")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,72 @@
+"""
+Caminho de leitura enxuto para listagens somente leitura.
+
+Em vez de carregar objetos do ORM (estado do identity map, descritores de
+relacionamento) e validá-los um a um no modelo Pydantic da resposta, as
+rotas selecionam só as colunas do modelo de leitura. As linhas vêm como
+tuplas nomeadas (`Row`) em blocos de LEAN_CHUNK_SIZE e são serializadas
+direto em JSON, em streaming: o processo nunca guarda a lista inteira.
+
+O JSON tem o mesmo formato (campos e ordem) do `response_model` da rota.
+"""
+import itertools
+import json
+import os
+from typing import Iterator, List
+
+from sqlalchemy import Column
+from sqlmodel import Session, SQLModel
+
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+LEAN_CHUNK_SIZE = int(os.getenv("LEAN_CHUNK_SIZE", "1000"))
+
+
+def read_columns(model, schema: type[SQLModel]) -> List[Column]:
+    """
+    Colunas da tabela de `model` presentes no modelo de leitura `schema`,
+    na ordem dos campos do schema.
+    """
+    table = model.__table__
+    return [table.c[name] for name in schema.model_fields if name in table.c]
+
+
+def _json_rows(session: Session, partitions: Iterator, first_rows: List, names: List[str]) -> Iterator[bytes]:
+    try:
+        yield b"["
+        first = True
+        for rows in itertools.chain([first_rows], partitions):
+            if not rows:
+                continue
+            chunk = ",".join(json.dumps(dict(zip(names, row)), default=str) for row in rows)
+            yield (chunk if first else "," + chunk).encode("utf-8")
+            first = False
+        yield b"]"
+    finally:
+        session.close()
+
+
+def lean_json_response(session: Session, statement, names: List[str]) -> StreamingResponse:
+    """
+    Responde `statement` (um select de colunas) como um array JSON de objetos
+    com as chaves `names`, sem criar objetos do ORM.
+
+    A consulta e o primeiro bloco rodam antes da resposta: um erro do banco
+    sobe para a rota (500) em vez de virar um 200 com JSON truncado.
+    """
+    # Sessão própria: a da dependência já foi fechada quando o streaming começa
+    stream_session = Session(session.get_bind())
+    try:
+        result = stream_session.execute(statement.execution_options(yield_per=LEAN_CHUNK_SIZE))
+        partitions = result.partitions()
+        first_rows = next(partitions, [])
+    except Exception:
+        stream_session.close()
+        raise
+    return StreamingResponse(
+        _json_rows(stream_session, partitions, first_rows, names),
+        media_type="application/json",
+        # Fecha a sessão mesmo se o streaming nunca começar
+        background=BackgroundTask(stream_session.close),
+    )
@@ -0,0 +1,114 @@
+"""
+Controle de concorrência otimista para as rotas de atualização.
+
+Cada linha tem uma coluna `version`. A atualização é um único
+`UPDATE ... WHERE id = ? AND version = ? RETURNING ...` que incrementa a
+versão; se nenhuma linha voltar, houve conflito.
+
+A versão esperada pode vir do cabeçalho `If-Match` (conflito → 412) ou do
+campo `version` do corpo (conflito → 409). Com OPTIMISTIC_LOCKING_REQUIRED=true
+atualizações sem nenhuma das duas são recusadas com 428.
+"""
+import os
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app.core.db import coerce_returning
+from app.logs.logger import logger
+
+OPTIMISTIC_LOCKING_REQUIRED = os.getenv("OPTIMISTIC_LOCKING_REQUIRED", "false").lower() == "true"
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cabeçalho If-Match inválido")
+
+
+class ExpectedVersion:
+    """
+    Versão esperada pelo cliente e o status devolvido em caso de conflito.
+    """
+
+    def __init__(self, if_match: Optional[str], body_version: Optional[int]):
+        header_version = parse_if_match(if_match)
+        if header_version is not None:
+            self.version, self.conflict_status = header_version, 412
+        elif body_version is not None:
+            self.version, self.conflict_status = body_version, 409
+        else:
+            if OPTIMISTIC_LOCKING_REQUIRED:
+                raise HTTPException(status_code=428, detail="Informe If-Match ou version para atualizar")
+            self.version, self.conflict_status = None, 409
+
+
+def fetch_current(session: Session, model, entity_id: int, *columns: str, not_found: str = "Registro não encontrado") -> Dict:
+    """
+    Lê apenas as colunas pedidas (e a versão) quando a rota precisa dos
+    valores antigos, por exemplo para ajustar contadores.
+    """
+    table = model.__table__
+    row = session.execute(
+        select(table.c.version, *[table.c[column] for column in columns]).where(table.c.id == entity_id)
+    ).mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return dict(row)
+
+
+def compare_and_swap(
+    session: Session,
+    model,
+    entity_id: int,
+    values: Dict,
+    expected: ExpectedVersion,
+    current: Optional[Dict] = None,
+    not_found: str = "Registro não encontrado",
+) -> Dict:
+    """
+    Atualiza a linha se a versão ainda for a esperada e devolve a linha nova.
+
+    Se `current` (lido por `fetch_current`) for informado, a troca é feita
+    contra a versão lida, garantindo que os valores antigos usados pela rota
+    são exatamente os que foram substituídos.
+    """
+    table = model.__table__
+    version = expected.version
+    if current is not None:
+        if version is not None and version != current["version"]:
+            raise _conflict(model, entity_id, expected)
+        version = current["version"]
+
+    statement = update(table).where(table.c.id == entity_id)
+    if version is not None:
+        statement = statement.where(table.c.version == version)
+    statement = statement.values(**values, version=table.c.version + 1).returning(*table.c)
+    row = session.execute(statement).mappings().first()
+    if row is not None:
+        return coerce_returning(table.c, row)
+
+    exists = session.execute(select(table.c.id).where(table.c.id == entity_id)).first()
+    if exists is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    raise _conflict(model, entity_id, expected)
+
+
+def _conflict(model, entity_id: int, expected: ExpectedVersion) -> HTTPException:
+    logger.warning(f"Conflito de versão em {model.__tablename__} ID {entity_id}")
+    return HTTPException(
+        status_code=expected.conflict_status,
+        detail="O registro foi alterado por outra requisição; recarregue e tente novamente",
+    )
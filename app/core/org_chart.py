@@ -0,0 +1,235 @@
+"""
+Consultas do organograma.
+
+O superior de um funcionário é o gerente (`Department.manager_id`) do seu
+departamento. Subordinados em qualquer profundidade e a cadeia de gerentes
+acima de alguém saem de uma CTE recursiva, numa única consulta.
+
+Com ORG_CLOSURE_ENABLED, o fecho transitivo fica materializado em
+`OrgClosure` e as duas consultas viram uma leitura indexada. As rotas que
+mudam a hierarquia (troca de departamento, de gerente, exclusões) chamam
+`refresh_org_closure` na mesma transação, recalculando só as linhas dos
+funcionários afetados e dos seus subordinados.
+
+Ciclos (A gerencia o departamento de B e B o de A) são cortados: ninguém é
+superior de si mesmo e a profundidade é limitada a ORG_MAX_DEPTH.
+
+Recalcular do zero:
+    python -m app.core.org_chart rebuild
+"""
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, literal
+from sqlmodel import Session, select
+
+from app.core.lean import read_columns
+from app.models.Department import Department
+from app.models.Employee import Employee, EmployeeRead
+from app.models.OrgClosure import OrgClosure
+
+ORG_CLOSURE_ENABLED = os.getenv("ORG_CLOSURE_ENABLED", "false").lower() == "true"
+ORG_MAX_DEPTH = int(os.getenv("ORG_MAX_DEPTH", "50"))
+
+# Funcionários por comando ao recalcular o fecho
+CLOSURE_CHUNK_SIZE = 500
+
+
+def _managers_cte(employee_ids: Optional[List[int]] = None, max_depth: int = ORG_MAX_DEPTH):
+    """
+    CTE (descendant_id, ancestor_id, depth) com os superiores dos
+    funcionários informados (de todos, se None).
+    """
+    employee = Employee.__table__.alias("employee")
+    department = Department.__table__.alias("department")
+    manager = Employee.__table__.alias("manager")
+
+    base = (
+        select(
+            employee.c.id.label("descendant_id"),
+            department.c.manager_id.label("ancestor_id"),
+            literal(1).label("depth"),
+        )
+        .select_from(
+            employee
+            .join(department, department.c.id == employee.c.department_id)
+            .join(manager, manager.c.id == department.c.manager_id)
+        )
+        .where(department.c.manager_id != employee.c.id)
+    )
+    if employee_ids is not None:
+        base = base.where(employee.c.id.in_(employee_ids))
+    managers = base.cte("managers", recursive=True)
+
+    step_employee = Employee.__table__.alias("step_employee")
+    step_department = Department.__table__.alias("step_department")
+    step_manager = Employee.__table__.alias("step_manager")
+    return managers.union(
+        select(managers.c.descendant_id, step_department.c.manager_id, managers.c.depth + 1)
+        .select_from(
+            managers
+            .join(step_employee, step_employee.c.id == managers.c.ancestor_id)
+            .join(step_department, step_department.c.id == step_employee.c.department_id)
+            .join(step_manager, step_manager.c.id == step_department.c.manager_id)
+        )
+        .where(
+            step_department.c.manager_id != step_employee.c.id,
+            step_department.c.manager_id != managers.c.descendant_id,
+            managers.c.depth < max_depth,
+        )
+    )
+
+
+def _reports_cte(employee_id: int, max_depth: int):
+    """
+    CTE (id, depth) com os subordinados de `employee_id` até `max_depth`.
+    """
+    employee = Employee.__table__.alias("employee")
+    department = Department.__table__.alias("department")
+
+    reports = (
+        select(employee.c.id.label("id"), literal(1).label("depth"))
+        .select_from(employee.join(department, department.c.id == employee.c.department_id))
+        .where(department.c.manager_id == employee_id, employee.c.id != employee_id)
+        .cte("reports", recursive=True)
+    )
+    step_employee = Employee.__table__.alias("step_employee")
+    step_department = Department.__table__.alias("step_department")
+    return reports.union(
+        select(step_employee.c.id, reports.c.depth + 1)
+        .select_from(
+            reports
+            .join(step_department, step_department.c.manager_id == reports.c.id)
+            .join(step_employee, step_employee.c.department_id == step_department.c.id)
+        )
+        .where(
+            step_employee.c.id != step_department.c.manager_id,
+            step_employee.c.id != employee_id,
+            reports.c.depth < max_depth,
+        )
+    )
+
+
+def _entries(session: Session, related, related_id, depth) -> List[Dict]:
+    """
+    Funcionários de `related` (pares id/profundidade, na menor profundidade
+    de cada um) com as colunas de EmployeeRead.
+    """
+    columns = read_columns(Employee, EmployeeRead)
+    nearest = (
+        select(related_id.label("id"), func.min(depth).label("depth"))
+        .select_from(related)
+        .group_by(related_id)
+        .subquery()
+    )
+    statement = (
+        select(*columns, nearest.c.depth)
+        .join(nearest, nearest.c.id == Employee.id)
+        .order_by(nearest.c.depth, Employee.id)
+    )
+    names = [column.name for column in columns] + ["depth"]
+    return [dict(zip(names, row)) for row in session.execute(statement).all()]
+
+
+def get_reports(session: Session, employee_id: int, depth: Optional[int] = None) -> List[Dict]:
+    """
+    Subordinados diretos e indiretos até `depth` níveis (todos, se None).
+    """
+    depth = min(depth or ORG_MAX_DEPTH, ORG_MAX_DEPTH)
+    if ORG_CLOSURE_ENABLED:
+        closure = (
+            select(OrgClosure.descendant_id, OrgClosure.depth)
+            .where(OrgClosure.ancestor_id == employee_id, OrgClosure.depth <= depth)
+            .subquery()
+        )
+        return _entries(session, closure, closure.c.descendant_id, closure.c.depth)
+    reports = _reports_cte(employee_id, depth)
+    return _entries(session, reports, reports.c.id, reports.c.depth)
+
+
+def get_chain(session: Session, employee_id: int) -> List[Dict]:
+    """
+    Gerentes acima do funcionário, do imediato ao do topo.
+    """
+    if ORG_CLOSURE_ENABLED:
+        closure = (
+            select(OrgClosure.ancestor_id, OrgClosure.depth)
+            .where(OrgClosure.descendant_id == employee_id)
+            .subquery()
+        )
+        return _entries(session, closure, closure.c.ancestor_id, closure.c.depth)
+    managers = _managers_cte([employee_id])
+    return _entries(session, managers, managers.c.ancestor_id, managers.c.depth)
+
+
+def _insert_closure(session: Session, employee_ids: Optional[List[int]]):
+    managers = _managers_cte(employee_ids)
+    session.execute(insert(OrgClosure).from_select(
+        ["descendant_id", "ancestor_id", "depth"],
+        select(managers.c.descendant_id, managers.c.ancestor_id, func.min(managers.c.depth))
+        .group_by(managers.c.descendant_id, managers.c.ancestor_id),
+    ))
+
+
+def refresh_org_closure(session: Session, employee_ids: Iterable[Optional[int]]):
+    """
+    Recalcula o fecho dos funcionários cujo superior mudou e dos seus
+    subordinados (que herdam a nova cadeia). Sem ORG_CLOSURE_ENABLED não faz nada.
+    """
+    if not ORG_CLOSURE_ENABLED:
+        return
+    roots = sorted({employee_id for employee_id in employee_ids if employee_id is not None})
+    if not roots:
+        return
+    session.flush()
+    affected = set(roots)
+    for start in range(0, len(roots), CLOSURE_CHUNK_SIZE):
+        chunk = roots[start:start + CLOSURE_CHUNK_SIZE]
+        affected.update(session.execute(
+            select(OrgClosure.descendant_id).where(OrgClosure.ancestor_id.in_(chunk))
+        ).scalars())
+    affected = sorted(affected)
+    for start in range(0, len(affected), CLOSURE_CHUNK_SIZE):
+        chunk = affected[start:start + CLOSURE_CHUNK_SIZE]
+        session.execute(delete(OrgClosure).where(OrgClosure.descendant_id.in_(chunk)))
+        _insert_closure(session, chunk)
+
+
+def refresh_department_closure(session: Session, department_id: int, removed_ids: Iterable[int] = ()):
+    """
+    Após trocar o gerente ou os membros do departamento: recalcula os membros
+    atuais e os que saíram (`removed_ids`).
+    """
+    if not ORG_CLOSURE_ENABLED:
+        return
+    session.flush()
+    members = session.execute(select(Employee.id).where(Employee.department_id == department_id)).scalars().all()
+    refresh_org_closure(session, list(removed_ids) + list(members))
+
+
+def rebuild_org_closure(session: Session):
+    session.execute(delete(OrgClosure))
+    _insert_closure(session, None)
+    session.commit()
+
+
+def ensure_org_closure(session: Session):
+    """
+    Na inicialização, com ORG_CLOSURE_ENABLED, recalcula o fecho: ele pode
+    estar desatualizado se a opção esteve desligada.
+    """
+    if ORG_CLOSURE_ENABLED:
+        rebuild_org_closure(session)
+
+
+if __name__ == "__main__":
+    from app.core.db import create_db_and_tables, engine
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Uso: python -m app.core.org_chart rebuild")
+        sys.exit(1)
+    create_db_and_tables()
+    with Session(engine) as session:
+        rebuild_org_closure(session)
+    print("Fecho do organograma recalculado.")
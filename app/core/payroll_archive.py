@@ -0,0 +1,319 @@
+"""
+Arquivamento das folhas de pagamento por mês de referência.
+
+Meses fechados saem da tabela `payroll` (partição quente) e vão para tabelas
+anuais `payroll_archive_<ano>`. Para cada ano arquivado também é gravado um
+snapshot colunar compacto (arrays empacotados + zlib) usado nos resumos
+históricos, sem depender de Parquet/Arrow. Com NumPy instalado, os
+snapshots são somados de forma vetorizada.
+
+As rotas consultam apenas a partição quente, a menos que o intervalo de
+meses pedido alcance um mês arquivado. O arquivo é fechado: não recebe
+folhas novas e um funcionário com folhas arquivadas não pode ser removido.
+
+Arquivar pela linha de comando (meses anteriores a 2025-01):
+    python -m app.core.payroll_archive archive 2025-01
+"""
+import json
+import os
+import re
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional; sem ele os snapshots são somados em Python
+    np = None
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, delete, distinct, func, union_all
+from sqlmodel import Session, select
+
+from app.core.changes import DELETE, record_changes
+from app.core.tenancy import session_tenant
+from app.models.Payroll import Payroll
+from app.models.PayrollArchive import PayrollArchiveMonth
+
+PAYROLL_ARCHIVE_DIR = os.getenv("PAYROLL_ARCHIVE_DIR", "archive")
+
+ARCHIVE_COLUMNS = ["id", "employee_id", "reference_month", "gross_salary", "deductions", "net_salary"]
+# Layout do snapshot colunar: (coluna, typecode do módulo array)
+SNAPSHOT_LAYOUT = [
+    ("id", "q"),
+    ("employee_id", "q"),
+    ("month", "i"),
+    ("gross_salary", "d"),
+    ("deductions", "d"),
+    ("net_salary", "d"),
+]
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+# Metadata separado: as tabelas de arquivo não entram no create_all
+_archive_metadata = MetaData()
+_archive_tables: Dict[int, Table] = {}
+# Chave: caminho do arquivo (separa os snapshots de cada tenant)
+_snapshot_cache: Dict[str, tuple] = {}
+
+
+def archive_table(year: int) -> Table:
+    if year not in _archive_tables:
+        _archive_tables[year] = Table(
+            f"payroll_archive_{year}",
+            _archive_metadata,
+            Column("id", Integer, primary_key=True),
+            Column("employee_id", Integer, index=True),
+            Column("reference_month", String, index=True),
+            Column("gross_salary", Float),
+            Column("deductions", Float),
+            Column("net_salary", Float),
+        )
+    return _archive_tables[year]
+
+
+def month_to_int(reference_month: str) -> int:
+    return int(reference_month[:4]) * 100 + int(reference_month[5:7])
+
+
+def int_to_month(value: int) -> str:
+    return f"{value // 100:04d}-{value % 100:02d}"
+
+
+def archive_months(session: Session, before: str) -> Dict:
+    """
+    Move para o arquivo todos os meses de referência anteriores a `before`.
+    """
+    payroll = Payroll.__table__
+    months = session.execute(
+        select(distinct(payroll.c.reference_month)).where(payroll.c.reference_month < before)
+    ).scalars().all()
+    months = sorted(month for month in months if MONTH_PATTERN.match(month))
+
+    archived_at = datetime.now(timezone.utc).isoformat()
+    years = set()
+    moved = 0
+    for month in months:
+        year = int(month[:4])
+        table = archive_table(year)
+        table.create(bind=session.connection(), checkfirst=True)
+        session.execute(table.insert().from_select(
+            ARCHIVE_COLUMNS,
+            select(*[payroll.c[column] for column in ARCHIVE_COLUMNS]).where(payroll.c.reference_month == month),
+        ))
+        # Para os consumidores do feed, as folhas arquivadas saem de `payroll`;
+        # `archived` distingue a mudança de partição de uma exclusão de fato
+        deleted = session.execute(
+            delete(payroll).where(payroll.c.reference_month == month).returning(payroll.c.id)
+        ).scalars().all()
+        record_changes(session, Payroll.__tablename__, [
+            (payroll_id, DELETE, {"id": payroll_id, "archived": True}) for payroll_id in deleted
+        ])
+        row_count = len(deleted)
+        moved += row_count
+
+        archived_month = session.get(PayrollArchiveMonth, month)
+        if archived_month:
+            archived_month.row_count += row_count
+            archived_month.archived_at = archived_at
+        else:
+            session.add(PayrollArchiveMonth(reference_month=month, year=year, row_count=row_count, archived_at=archived_at))
+        years.add(year)
+    session.commit()
+
+    for year in years:
+        write_snapshot(session, year)
+    return {"months": months, "years": sorted(years), "rows": moved}
+
+
+def archived_years(session: Session, from_month: Optional[str] = None, to_month: Optional[str] = None) -> List[int]:
+    statement = select(distinct(PayrollArchiveMonth.year))
+    if from_month:
+        statement = statement.where(PayrollArchiveMonth.reference_month >= from_month)
+    if to_month:
+        statement = statement.where(PayrollArchiveMonth.reference_month <= to_month)
+    return sorted(session.execute(statement).scalars().all())
+
+
+def has_archived_payrolls(session: Session, employee_id: int) -> bool:
+    """
+    Se o funcionário tem folhas em algum mês arquivado.
+    """
+    for year in archived_years(session):
+        table = archive_table(year)
+        if session.execute(select(table.c.id).where(table.c.employee_id == employee_id).limit(1)).first():
+            return True
+    return False
+
+
+def select_payrolls(
+    session: Session,
+    conditions: Callable[[Table], List],
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Busca folhas na partição quente e, se o intervalo pedido alcançar meses
+    arquivados, também nas tabelas anuais (num único UNION ALL).
+    `conditions(table)` devolve os filtros para a tabela informada.
+    """
+    tables = [Payroll.__table__]
+    if from_month or to_month:
+        tables += [archive_table(year) for year in archived_years(session, from_month, to_month)]
+
+    statements = []
+    for table in tables:
+        statement = select(*[table.c[column] for column in ARCHIVE_COLUMNS]).where(*conditions(table))
+        if from_month:
+            statement = statement.where(table.c.reference_month >= from_month)
+        if to_month:
+            statement = statement.where(table.c.reference_month <= to_month)
+        statements.append(statement)
+
+    statement = statements[0] if len(statements) == 1 else union_all(*statements)
+    return [dict(row) for row in session.execute(statement).mappings()]
+
+
+def _snapshot_directory(session: Session) -> str:
+    tenant = session_tenant(session)
+    return PAYROLL_ARCHIVE_DIR if tenant is None else os.path.join(PAYROLL_ARCHIVE_DIR, "tenants", tenant)
+
+
+def _snapshot_path(session: Session, year: int) -> str:
+    return os.path.join(_snapshot_directory(session), f"payroll_{year}.col")
+
+
+def write_snapshot(session: Session, year: int):
+    """
+    Grava o snapshot colunar do ano a partir da tabela de arquivo.
+    """
+    table = archive_table(year)
+    columns = {name: array(typecode) for name, typecode in SNAPSHOT_LAYOUT}
+    rows = session.execute(select(*[table.c[column] for column in ARCHIVE_COLUMNS]).order_by(table.c.id))
+    for payroll_id, employee_id, reference_month, gross_salary, deductions, net_salary in rows:
+        columns["id"].append(payroll_id)
+        columns["employee_id"].append(-1 if employee_id is None else employee_id)
+        columns["month"].append(month_to_int(reference_month))
+        columns["gross_salary"].append(gross_salary)
+        columns["deductions"].append(deductions)
+        columns["net_salary"].append(net_salary)
+
+    os.makedirs(_snapshot_directory(session), exist_ok=True)
+    header = {"year": year, "rows": len(columns["id"]), "columns": SNAPSHOT_LAYOUT}
+    path = _snapshot_path(session, year)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(json.dumps(header).encode("utf-8") + b"\n")
+        file.write(zlib.compress(b"".join(columns[name].tobytes() for name, _ in SNAPSHOT_LAYOUT)))
+    os.replace(temporary_path, path)
+
+
+def load_snapshot(session: Session, year: int) -> Dict[str, array]:
+    """
+    Lê o snapshot colunar do ano (com cache pelo mtime do arquivo),
+    regravando-o a partir da tabela de arquivo se não existir.
+    """
+    path = _snapshot_path(session, year)
+    if not os.path.exists(path):
+        write_snapshot(session, year)
+    mtime = os.path.getmtime(path)
+    cached = _snapshot_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, "rb") as file:
+        header = json.loads(file.readline())
+        payload = zlib.decompress(file.read())
+    columns = {}
+    offset = 0
+    for name, typecode in header["columns"]:
+        values = array(typecode)
+        size = header["rows"] * values.itemsize
+        values.frombytes(payload[offset:offset + size])
+        offset += size
+        columns[name] = values
+    _snapshot_cache[path] = (mtime, columns)
+    return columns
+
+
+def _add_snapshot_totals(totals: Dict[str, List], snapshot: Dict[str, array], low: int, high: int, employee_id: Optional[int]):
+    # Os arrays do snapshot viram arrays NumPy sem cópia; a soma por mês é um bincount
+    columns = {name: np.frombuffer(snapshot[name], dtype=typecode) for name, typecode in SNAPSHOT_LAYOUT}
+    months = columns["month"]
+    selected = (months >= low) & (months <= high)
+    if employee_id is not None:
+        selected &= columns["employee_id"] == employee_id
+    if not selected.any():
+        return
+    found, position = np.unique(months[selected], return_inverse=True)
+    counts = np.bincount(position, minlength=len(found))
+    gross = np.bincount(position, weights=columns["gross_salary"][selected], minlength=len(found))
+    net = np.bincount(position, weights=columns["net_salary"][selected], minlength=len(found))
+    for index, month in enumerate(found.tolist()):
+        total = totals.setdefault(int_to_month(month), [0, 0.0, 0.0])
+        total[0] += int(counts[index])
+        total[1] += float(gross[index])
+        total[2] += float(net[index])
+
+
+def history_summary(
+    session: Session,
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    employee_id: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Totais mensais (quantidade, bruto, líquido) somando a partição quente
+    (via SQL) e os snapshots colunares dos anos arquivados.
+    """
+    totals: Dict[str, List] = {}
+
+    low = month_to_int(from_month) if from_month else 0
+    high = month_to_int(to_month) if to_month else 999999
+    for year in archived_years(session, from_month, to_month):
+        snapshot = load_snapshot(session, year)
+        if np is not None:
+            _add_snapshot_totals(totals, snapshot, low, high, employee_id)
+            continue
+        months, employees = snapshot["month"], snapshot["employee_id"]
+        gross, net = snapshot["gross_salary"], snapshot["net_salary"]
+        for index in range(len(months)):
+            month = months[index]
+            if month < low or month > high or (employee_id is not None and employees[index] != employee_id):
+                continue
+            total = totals.setdefault(int_to_month(month), [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += gross[index]
+            total[2] += net[index]
+
+    statement = select(
+        Payroll.reference_month, func.count(Payroll.id), func.sum(Payroll.gross_salary), func.sum(Payroll.net_salary)
+    ).group_by(Payroll.reference_month)
+    if from_month:
+        statement = statement.where(Payroll.reference_month >= from_month)
+    if to_month:
+        statement = statement.where(Payroll.reference_month <= to_month)
+    if employee_id is not None:
+        statement = statement.where(Payroll.employee_id == employee_id)
+    for reference_month, count, gross_total, net_total in session.execute(statement).all():
+        total = totals.setdefault(reference_month, [0, 0.0, 0.0])
+        total[0] += count
+        total[1] += gross_total
+        total[2] += net_total
+
+    return [
+        {"reference_month": month, "payroll_count": count, "gross_total": gross_total, "net_total": net_total}
+        for month, (count, gross_total, net_total) in sorted(totals.items())
+    ]
+
+
+if __name__ == "__main__":
+    from app.core.db import create_db_and_tables, engine
+
+    if len(sys.argv) != 3 or sys.argv[1] != "archive" or not MONTH_PATTERN.match(sys.argv[2]):
+        print("Uso: python -m app.core.payroll_archive archive AAAA-MM")
+        sys.exit(1)
+    create_db_and_tables()
+    with Session(engine) as session:
+        result = archive_months(session, sys.argv[2])
+    print(f"{result['rows']} folhas arquivadas de {len(result['months'])} meses: {result['months']}")
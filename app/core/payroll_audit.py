@@ -0,0 +1,212 @@
+"""
+Auditoria das folhas de pagamento de um mês ou ano.
+
+As folhas (partição quente e arquivo) são lidas em blocos ordenados por
+funcionário e mês, direto em arrays NumPy, sem criar objetos do ORM. Cada
+bloco é verificado de forma vetorizada:
+
+- inconsistência: `net_salary` diferente de `gross_salary - deductions`;
+- valores negativos ou descontos maiores que o salário bruto;
+- duplicidade de (employee_id, reference_month);
+- outliers por funcionário: z-score do líquido contra os demais meses do
+  funcionário (média/desvio sem o próprio mês) e variação brusca em relação
+  ao mês anterior.
+
+Os meses anteriores ao escopo (AUDIT_LOOKBACK_MONTHS) entram só como
+histórico para os outliers; apenas folhas do escopo são apontadas.
+"""
+import os
+from typing import Dict, List
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional; sem ele a auditoria fica indisponível
+    np = None
+
+from sqlalchemy import union_all
+from sqlmodel import Session, select
+
+from app.core.payroll_archive import MONTH_PATTERN, archive_table, archived_years, int_to_month, month_to_int
+from app.models.Payroll import Payroll
+
+AUDIT_CHUNK_SIZE = int(os.getenv("AUDIT_CHUNK_SIZE", "50000"))
+AUDIT_LOOKBACK_MONTHS = int(os.getenv("AUDIT_LOOKBACK_MONTHS", "12"))
+
+# Tolerância relativa abaixo da qual desvio e diferença de médias são zero
+RELATIVE_EPSILON = 1e-9
+
+AUDIT_COLUMNS = ["id", "employee_id", "reference_month", "gross_salary", "deductions", "net_salary"]
+
+INCONSISTENT_NET = "inconsistent_net"
+NEGATIVE_VALUE = "negative_value"
+DEDUCTIONS_ABOVE_GROSS = "deductions_above_gross"
+DUPLICATE = "duplicate"
+OUTLIER = "outlier"
+MONTH_OVER_MONTH = "month_over_month"
+
+
+class AuditUnavailable(Exception):
+    pass
+
+
+def shift_month(reference_month: str, months: int) -> str:
+    value = int(reference_month[:4]) * 12 + int(reference_month[5:7]) - 1 + months
+    return f"{value // 12:04d}-{value % 12 + 1:02d}"
+
+
+def _rows(session: Session, from_month: str, to_month: str):
+    tables = [Payroll.__table__] + [archive_table(year) for year in archived_years(session, from_month, to_month)]
+    statements = [
+        select(*[table.c[column] for column in AUDIT_COLUMNS])
+        .where(table.c.reference_month >= from_month, table.c.reference_month <= to_month)
+        for table in tables
+    ]
+    statement = statements[0] if len(statements) == 1 else union_all(*statements)
+    statement = statement.order_by("employee_id", "reference_month", "id")
+    return session.execute(statement.execution_options(yield_per=AUDIT_CHUNK_SIZE))
+
+
+def _to_arrays(rows) -> Dict:
+    def floats(index: int):
+        return np.fromiter((np.nan if row[index] is None else row[index] for row in rows), dtype=np.float64, count=len(rows))
+
+    return {
+        "id": np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+        "employee_id": np.fromiter((-1 if row[1] is None else row[1] for row in rows), dtype=np.int64, count=len(rows)),
+        # Meses fora do formato AAAA-MM ficam fora do escopo
+        "month": np.fromiter(
+            (month_to_int(row[2]) if MONTH_PATTERN.match(row[2]) else 0 for row in rows), dtype=np.int32, count=len(rows)
+        ),
+        "gross": floats(3),
+        "deductions": floats(4),
+        "net": floats(5),
+    }
+
+
+class _Report:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.counts = {name: 0 for name in (
+            INCONSISTENT_NET, NEGATIVE_VALUE, DEDUCTIONS_ABOVE_GROSS, DUPLICATE, OUTLIER, MONTH_OVER_MONTH
+        )}
+        self.issues: List[Dict] = []
+        self.scanned = 0
+
+    def flag(self, issue: str, arrays: Dict, mask, **details):
+        positions = np.flatnonzero(mask)
+        self.counts[issue] += len(positions)
+        for position in positions[:max(self.limit - len(self.issues), 0)]:
+            item = {
+                "issue": issue,
+                "payroll_id": int(arrays["id"][position]),
+                "employee_id": None if arrays["employee_id"][position] == -1 else int(arrays["employee_id"][position]),
+                "reference_month": int_to_month(int(arrays["month"][position])),
+                "gross_salary": float(arrays["gross"][position]),
+                "deductions": float(arrays["deductions"][position]),
+                "net_salary": float(arrays["net"][position]),
+            }
+            item.update({
+                name: round(float(values[position]), 4) if np.isfinite(values[position]) else None
+                for name, values in details.items()
+            })
+            self.issues.append(item)
+
+
+def _check_chunk(report: _Report, arrays: Dict, in_scope, tolerance: float, z_threshold: float,
+                 change_threshold: float, min_history: int):
+    gross, deductions, net = arrays["gross"], arrays["deductions"], arrays["net"]
+
+    difference = net - (gross - deductions)
+    report.flag(INCONSISTENT_NET, arrays, in_scope & (np.abs(difference) > tolerance), difference=difference)
+    report.flag(NEGATIVE_VALUE, arrays, in_scope & ((gross < 0) | (deductions < 0) | (net < 0)))
+    report.flag(DEDUCTIONS_ABOVE_GROSS, arrays, in_scope & (deductions > gross))
+
+    # Linhas ordenadas por (funcionário, mês): duplicatas e mês anterior são vizinhos
+    employee, month = arrays["employee_id"], arrays["month"]
+    same_employee = np.zeros(len(net), dtype=bool)
+    same_employee[1:] = (employee[1:] == employee[:-1]) & (employee[1:] != -1)
+    duplicate = np.zeros(len(net), dtype=bool)
+    duplicate[1:] = same_employee[1:] & (month[1:] == month[:-1])
+    report.flag(DUPLICATE, arrays, in_scope & duplicate)
+
+    previous = np.full(len(net), np.nan)
+    previous[1:] = np.where(same_employee[1:] & ~duplicate[1:], net[:-1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (net - previous) / np.abs(previous)
+    report.flag(MONTH_OVER_MONTH, arrays, in_scope & (np.abs(change) > change_threshold), change=change)
+
+    # z-score contra os demais meses do funcionário (leave-one-out). A
+    # variância parte dos desvios em torno da média do grupo (duas passadas):
+    # somar quadrados brutos perde precisão e inventa desvio em salários iguais
+    _, groups, counts = np.unique(employee, return_inverse=True, return_counts=True)
+    groups = groups.reshape(-1)
+    sizes = counts[groups]
+    others = sizes - 1
+    deviation = net - (np.bincount(groups, weights=net) / counts)[groups]
+    squares = np.bincount(groups, weights=deviation * deviation)[groups]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = net - deviation * sizes / others
+        variance = (squares - deviation * deviation * sizes / others) / others
+        # Diferenças no nível do arredondamento contam como zero
+        epsilon = RELATIVE_EPSILON * np.maximum(np.abs(mean), 1.0)
+        distance = np.where(np.abs(net - mean) > epsilon, net - mean, 0.0)
+        spread = np.sqrt(np.maximum(variance, 0))
+        z_score = distance / np.where(spread > epsilon, spread, 0.0)
+    # Desvio zero com valor diferente da média dá z infinito, e também é outlier
+    outlier = (others >= min_history) & (employee != -1) & ~np.isnan(z_score) & (np.abs(z_score) > z_threshold)
+    report.flag(OUTLIER, arrays, in_scope & outlier, z_score=z_score, employee_mean=mean)
+
+
+def audit_payrolls(
+    session: Session,
+    from_month: str,
+    to_month: str,
+    tolerance: float = 0.01,
+    z_threshold: float = 3.0,
+    change_threshold: float = 0.5,
+    min_history: int = 3,
+    limit: int = 1000,
+    lookback_months: int = AUDIT_LOOKBACK_MONTHS,
+) -> Dict:
+    """
+    Audita as folhas entre `from_month` e `to_month` (inclusive).
+    """
+    if np is None:
+        raise AuditUnavailable("NumPy não está instalado")
+    report = _Report(limit)
+    scope_start = month_to_int(from_month)
+    result = _rows(session, shift_month(from_month, -lookback_months), to_month)
+
+    # Os blocos terminam na troca de funcionário: as linhas do último
+    # funcionário do bloco passam para o próximo, para ter o histórico completo
+    pending: List = []
+    for partition in result.partitions():
+        rows = pending + list(partition)
+        last_employee = rows[-1][1]
+        cut = len(rows)
+        while cut > 0 and rows[cut - 1][1] == last_employee:
+            cut -= 1
+        if cut == 0:
+            pending = rows
+            continue
+        pending = rows[cut:]
+        _audit_rows(report, rows[:cut], scope_start, tolerance, z_threshold, change_threshold, min_history)
+    if pending:
+        _audit_rows(report, pending, scope_start, tolerance, z_threshold, change_threshold, min_history)
+
+    return {
+        "from_month": from_month,
+        "to_month": to_month,
+        "rows_scanned": report.scanned,
+        "counts": report.counts,
+        "truncated": sum(report.counts.values()) > len(report.issues),
+        "issues": report.issues,
+    }
+
+
+def _audit_rows(report: _Report, rows: List, scope_start: int, tolerance: float, z_threshold: float,
+                change_threshold: float, min_history: int):
+    arrays = _to_arrays(rows)
+    in_scope = arrays["month"] >= scope_start
+    report.scanned += int(in_scope.sum())
+    _check_chunk(report, arrays, in_scope, tolerance, z_threshold, change_threshold, min_history)
@@ -0,0 +1,171 @@
+"""
+Profiler por amostragem para analisar rotas lentas em produção.
+
+Uma thread lê periodicamente as pilhas de todas as threads
+(`sys._current_frames`) e atribui cada amostra à rota cujo endpoint
+aparece na pilha. O resultado sai em "collapsed stacks" (uma linha
+`rota;frame;...;frame contagem` por pilha), formato aceito por
+flamegraph.pl, speedscope e similares.
+
+Nada é medido fora de uma sessão de profiling. Só uma sessão roda por vez e
+a duração é limitada, então o profiler pode ficar habilitado num worker em
+produção. Uma sessão é iniciada por `POST /debug/profile` ou pelo sinal
+SIGUSR1 (o resultado vai para PROFILER_OUTPUT_DIR).
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.logs.logger import logger
+
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_SIGNAL_SECONDS = float(os.getenv("PROFILER_SIGNAL_SECONDS", "30"))
+PROFILER_OUTPUT_DIR = os.getenv("PROFILER_OUTPUT_DIR", "profiles")
+
+# Amostras fora de qualquer rota (threads ociosas, event loop esperando I/O)
+NO_ROUTE = "(sem rota)"
+
+_session_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _iter_routes(routes):
+    # Routers incluídos/montados guardam as próprias rotas
+    for route in routes:
+        router = getattr(route, "original_router", route)
+        nested = getattr(router, "routes", None)
+        if nested is not None and not hasattr(route, "endpoint"):
+            yield from _iter_routes(nested)
+        else:
+            yield route
+
+
+def route_map(routes) -> Dict:
+    """
+    {code object do endpoint: "MÉTODO /caminho"} para as rotas da aplicação.
+    """
+    endpoints = {}
+    for route in _iter_routes(routes):
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            continue
+        methods = ",".join(sorted(getattr(route, "methods", None) or []))
+        endpoints[code] = f"{methods} {route.path}".strip()
+    return endpoints
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, routes, interval_ms: float = PROFILER_INTERVAL_MS, include_idle: bool = False):
+        self.endpoints = route_map(routes)
+        self.interval = interval_ms / 1000
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+    def _sample(self, ignored_thread: int):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == ignored_thread:
+                continue
+            labels = []
+            route = None
+            while frame is not None:
+                code = frame.f_code
+                labels.append(_frame_label(code))
+                if route is None:
+                    route = self.endpoints.get(code)
+                frame = frame.f_back
+            if route is None and not self.include_idle:
+                continue
+            labels.reverse()
+            self.stacks[(route or NO_ROUTE, ";".join(labels))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float):
+        """
+        Amostra por `seconds` segundos na thread atual.
+        """
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            current_thread = threading.get_ident()
+            start = time.perf_counter()
+            deadline = start + min(seconds, PROFILER_MAX_SECONDS)
+            while time.perf_counter() < deadline:
+                self._sample(current_thread)
+                time.sleep(self.interval)
+            self.duration = time.perf_counter() - start
+        finally:
+            _session_lock.release()
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{route};{stack} {count}\n"
+            for (route, stack), count in sorted(self.stacks.items())
+        )
+
+    def summary(self) -> Dict:
+        routes: Counter = Counter()
+        for (route, _), count in self.stacks.items():
+            routes[route] += count
+        return {
+            "duration_seconds": round(self.duration, 3),
+            "sampling_rounds": self.samples,
+            "interval_ms": self.interval * 1000,
+            "routes": [{"route": route, "samples": count} for route, count in routes.most_common()],
+        }
+
+    def write(self, directory: str = PROFILER_OUTPUT_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(directory, f"profile-{os.getpid()}-{stamp}.collapsed")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(self.collapsed())
+        return path
+
+
+def _profile_in_background(app, seconds: float):
+    def run():
+        try:
+            profiler = SamplingProfiler(app.routes).run(seconds)
+        except ProfilerBusy:
+            logger.warning("Profiling já em andamento; sinal ignorado")
+            return
+        logger.info(f"Profile gravado em {profiler.write()}")
+
+    threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+
+
+def install_profiler_signal(app):
+    """
+    Registra SIGUSR1 para iniciar um profile de PROFILER_SIGNAL_SECONDS
+    (apenas com PROFILER_ENABLED e em sistemas que têm o sinal).
+    """
+    if not PROFILER_ENABLED or not hasattr(signal, "SIGUSR1"):
+        return
+    if threading.current_thread() is not threading.main_thread():
+        logger.warning("Sinal do profiler não registrado: fora da thread principal")
+        return
+    signal.signal(signal.SIGUSR1, lambda signum, frame: _profile_in_background(app, PROFILER_SIGNAL_SECONDS))
+    logger.info(f"Profiler: envie SIGUSR1 ao processo {os.getpid()} para gravar um profile")
+
+
+def profile_app(app, seconds: float, interval_ms: Optional[float] = None, include_idle: bool = False) -> SamplingProfiler:
+    return SamplingProfiler(app.routes, interval_ms or PROFILER_INTERVAL_MS, include_idle).run(seconds)
@@ -0,0 +1,194 @@
+"""
+Tempo limite e cancelamento de consultas longas.
+
+Um filtro só com curingas (`/employees/filtered?name=a`) varre a tabela
+inteira, e a rota síncrona continua consultando mesmo depois que o cliente
+desistiu. As rotas sujeitas a isso declaram a dependência `query_budget`:
+
+- tempo limite por rota: QUERY_TIMEOUT_ROUTES por prefixo (ex.:
+  "/employees/filtered=2000"), ou QUERY_TIMEOUT_MS (0 desliga);
+- cancelamento quando o cliente desconecta: uma tarefa no loop confere a
+  conexão a cada QUERY_DISCONNECT_POLL_MS enquanto a rota roda no
+  threadpool.
+
+No SQLite, um progress handler instalado em cada conexão confere o orçamento
+da requisição a cada QUERY_PROGRESS_STEPS instruções da VM e interrompe a
+consulta em andamento. O orçamento fica numa ContextVar, que acompanha a
+rota no threadpool; fora dessas rotas o handler não faz nada. Nos demais
+bancos o tempo limite vira `SET LOCAL statement_timeout` e o cancelamento
+usa o `cancel()` da conexão do driver.
+
+A rota envolve a consulta em `budget.guard()`, que converte a interrupção em
+`QueryTimeout` (504) ou `QueryCancelled` (499). As contagens por rota ficam
+em `/debug/query-timeouts`.
+"""
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.compression import parse_route_levels
+from app.logs.logger import logger
+
+QUERY_TIMEOUT_MS = int(os.getenv("QUERY_TIMEOUT_MS", "5000"))
+# Tempo limite (ms) por prefixo de rota, ex.: "/employees/filtered=2000,/benefits/filtered=1000"
+QUERY_TIMEOUT_ROUTES = parse_route_levels(os.getenv("QUERY_TIMEOUT_ROUTES"))
+QUERY_DISCONNECT_POLL_MS = float(os.getenv("QUERY_DISCONNECT_POLL_MS", "100"))
+# Instruções da VM do SQLite entre duas conferências do orçamento
+QUERY_PROGRESS_STEPS = int(os.getenv("QUERY_PROGRESS_STEPS", "10000"))
+
+_current_budget: ContextVar[Optional["QueryBudget"]] = ContextVar("query_budget", default=None)
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+def route_timeout_ms(route: str) -> int:
+    # O prefixo mais longo vence
+    for prefix, timeout_ms in sorted(QUERY_TIMEOUT_ROUTES.items(), key=lambda item: -len(item[0])):
+        if route.startswith(prefix):
+            return timeout_ms
+    return QUERY_TIMEOUT_MS
+
+
+class QueryBudget:
+    def __init__(self, route: str, timeout_ms: int):
+        self.route = route
+        self.timeout_ms = timeout_ms
+        self.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+        self.disconnected = False
+        # "timeout" ou "cancelled" quando a consulta foi interrompida
+        self.outcome: Optional[str] = None
+        self._cancel_driver = None
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def exceeded(self) -> bool:
+        return self.disconnected or self.expired()
+
+    def cancel(self):
+        self.disconnected = True
+        if self._cancel_driver is not None:
+            try:
+                self._cancel_driver()
+            except Exception:
+                logger.exception(f"Falha ao cancelar a consulta de {self.route}")
+
+    def prepare(self, session):
+        """
+        Fora do SQLite, aplica o tempo limite na transação da sessão e guarda
+        o cancelamento do driver.
+        """
+        if session.get_bind().dialect.name == "sqlite":
+            return
+        connection = session.connection()
+        if connection.dialect.name == "postgresql" and self.timeout_ms:
+            connection.execute(text(f"SET LOCAL statement_timeout = {int(self.timeout_ms)}"))
+        self._cancel_driver = getattr(connection.connection.dbapi_connection, "cancel", None)
+
+    @contextmanager
+    def guard(self):
+        """
+        Converte a interrupção da consulta em QueryTimeout / QueryCancelled.
+        """
+        try:
+            yield
+        except SQLAlchemyError as exc:
+            if self.disconnected:
+                self.outcome = "cancelled"
+                raise QueryCancelled() from exc
+            if self.expired():
+                self.outcome = "timeout"
+                raise QueryTimeout() from exc
+            raise
+
+
+def query_interrupted() -> bool:
+    """
+    Se a consulta da requisição atual foi interrompida pelo orçamento (e não
+    falhou por problema no banco).
+    """
+    budget = _current_budget.get()
+    return budget is not None and budget.exceeded()
+
+
+def _progress_handler() -> int:
+    budget = _current_budget.get()
+    return 1 if budget is not None and budget.exceeded() else 0
+
+
+def _on_connect(dbapi_connection, connection_record):
+    dbapi_connection.set_progress_handler(_progress_handler, QUERY_PROGRESS_STEPS)
+
+
+def install_query_timeouts(engine):
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _on_connect)
+
+
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(budget: QueryBudget):
+    with _stats_lock:
+        stats = _stats.setdefault(budget.route, {"requests": 0, "timeouts": 0, "cancelled": 0, "disconnects": 0})
+        stats["requests"] += 1
+        stats["disconnects"] += budget.disconnected
+        if budget.outcome == "timeout":
+            stats["timeouts"] += 1
+        elif budget.outcome == "cancelled":
+            stats["cancelled"] += 1
+
+
+def query_timeout_stats() -> Dict:
+    with _stats_lock:
+        routes = {route: dict(values) for route, values in _stats.items()}
+    return {
+        "timeout_ms": QUERY_TIMEOUT_MS,
+        "route_timeouts_ms": QUERY_TIMEOUT_ROUTES,
+        "progress_steps": QUERY_PROGRESS_STEPS,
+        "routes": routes,
+    }
+
+
+async def _watch_disconnect(request: Request, budget: QueryBudget):
+    while True:
+        await asyncio.sleep(QUERY_DISCONNECT_POLL_MS / 1000)
+        if await request.is_disconnected():
+            logger.info(f"Cliente desconectou; cancelando a consulta de {budget.route}")
+            budget.cancel()
+            return
+
+
+def query_budget(session_dependency):
+    """
+    Dependência com o orçamento da requisição, na mesma sessão de
+    `session_dependency` (ex.: `budget = Depends(query_budget(get_session))`).
+    """
+    async def dependency(request: Request, session = Depends(session_dependency)):
+        route = request.scope["route"].path
+        budget = QueryBudget(route, route_timeout_ms(route))
+        await run_in_threadpool(budget.prepare, session)
+        _current_budget.set(budget)
+        watcher = asyncio.create_task(_watch_disconnect(request, budget))
+        try:
+            yield budget
+        finally:
+            watcher.cancel()
+            _record(budget)
+    return dependency
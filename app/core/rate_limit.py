@@ -0,0 +1,224 @@
+"""
+Limite de taxa e descarte de carga por classe de rota.
+
+- Cada cliente tem um token bucket por classe de rota ("default", "heavy"...);
+  sem token disponível a resposta é 429 com `Retry-After`.
+- Classes com limite de concorrência (rotas caras, com joinedload) recusam
+  com 503 quando todas as vagas estão ocupadas, em vez de enfileirar.
+- Se o pool de conexões do banco que atenderia a requisição (primário,
+  réplicas ou engine do tenant) estiver esgotado, ela é descartada na hora com
+  503, antes de esperar pelo timeout do pool.
+
+O estado fica em memória no processo. Para compartilhar os buckets entre
+processos, RATE_LIMIT_STORE aponta para uma fábrica ("pacote.modulo:fabrica")
+que devolve um objeto com o método `take(key, rate, burst, now) -> float`.
+"""
+import importlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.core.db import request_engines
+from app.logs.logger import logger
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Cabeçalho que identifica o cliente (ex.: X-API-Key); sem ele usa o IP, e
+# atrás de um proxy todos os clientes dividiriam o mesmo bucket
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER")
+# Segundos sugeridos no Retry-After quando a carga é descartada (503)
+RATE_LIMIT_RETRY_AFTER = int(os.getenv("RATE_LIMIT_RETRY_AFTER", "1"))
+
+DEFAULT_ROUTE_CLASS = "default"
+
+
+def parse_mapping(value: Optional[str]) -> Dict[str, str]:
+    """
+    Converte "a=1,b=2" em {"a": "1", "b": "2"}.
+    """
+    mapping = {}
+    if not value:
+        return mapping
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        key, item_value = item.split("=", 1)
+        mapping[key.strip()] = item_value.strip()
+    return mapping
+
+
+def parse_budgets(value: Optional[str]) -> Dict[str, Tuple[float, float]]:
+    """
+    Converte "default=50:100,heavy=5:10" em {classe: (tokens por segundo, rajada)}.
+    """
+    budgets = {}
+    for route_class, budget in parse_mapping(value).items():
+        rate, _, burst = budget.partition(":")
+        budgets[route_class] = (float(rate), float(burst or rate))
+    return budgets
+
+
+# Classe por prefixo de rota (o prefixo mais longo vence; com "$" no fim, só
+# o caminho exato). Só leituras (GET/HEAD) são classificadas: escritas e
+# consultas pontuais ficam na classe padrão
+RATE_LIMIT_ROUTE_CLASSES = parse_mapping(os.getenv(
+    "RATE_LIMIT_ROUTE_CLASSES",
+    "/employees/filtered=heavy,/departments/$=heavy,/pay_rolls/export=heavy,/pay_rolls/history=heavy",
+))
+CLASSIFIED_METHODS = {"GET", "HEAD"}
+# Orçamento por classe: tokens por segundo e rajada máxima por cliente
+RATE_LIMIT_BUDGETS = parse_budgets(os.getenv("RATE_LIMIT_BUDGETS", "default=50:100,heavy=5:10"))
+# Requisições simultâneas permitidas por classe (classes ausentes não têm limite)
+RATE_LIMIT_CONCURRENCY = {
+    route_class: int(limit)
+    for route_class, limit in parse_mapping(os.getenv("RATE_LIMIT_CONCURRENCY", "heavy=4")).items()
+}
+
+
+class LocalBucketStore:
+    """
+    Token buckets em memória, com no máximo `max_keys` clientes (os menos
+    recentes são descartados).
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        """
+        Consome um token. Devolve 0 se permitido, ou os segundos até haver token.
+        """
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate if rate > 0 else float(RATE_LIMIT_RETRY_AFTER)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+def load_store():
+    path = os.getenv("RATE_LIMIT_STORE")
+    if not path:
+        return LocalBucketStore()
+    module_name, _, factory = path.partition(":")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+def pool_saturated(bind) -> bool:
+    """
+    Indica se todas as conexões do pool (incluindo overflow) estão em uso.
+    Pools sem esses contadores (StaticPool, NullPool) nunca saturam.
+    """
+    pool = bind.pool
+    size, checkedout = getattr(pool, "size", None), getattr(pool, "checkedout", None)
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    if not callable(size) or not callable(checkedout) or max_overflow < 0:
+        return False
+    return checkedout() >= size() + max_overflow
+
+
+def request_pool_saturated(scope) -> bool:
+    """
+    Indica se todos os pools que poderiam atender a requisição estão
+    esgotados (numa leitura, basta uma réplica livre para seguir).
+    """
+    engines = request_engines(Request(scope))
+    return bool(engines) and all(pool_saturated(bind) for bind in engines)
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI de limite de taxa e descarte de carga (ver docstring do módulo).
+    """
+
+    def __init__(
+        self,
+        app,
+        route_classes: Optional[Dict[str, str]] = None,
+        budgets: Optional[Dict[str, Tuple[float, float]]] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        store=None,
+        enabled: bool = RATE_LIMIT_ENABLED,
+    ):
+        self.app = app
+        self.route_classes = RATE_LIMIT_ROUTE_CLASSES if route_classes is None else route_classes
+        self.budgets = RATE_LIMIT_BUDGETS if budgets is None else budgets
+        self.concurrency = RATE_LIMIT_CONCURRENCY if concurrency is None else concurrency
+        self.store = load_store() if store is None else store
+        self.enabled = enabled
+        self._in_flight: Dict[str, int] = {}
+        # Prefixos do mais longo para o mais curto
+        self._prefixes = sorted(self.route_classes, key=len, reverse=True)
+
+    def route_class(self, path: str, method: str = "GET") -> str:
+        if method not in CLASSIFIED_METHODS:
+            return DEFAULT_ROUTE_CLASS
+        for prefix in self._prefixes:
+            if prefix.endswith("$") and path == prefix[:-1] or not prefix.endswith("$") and path.startswith(prefix):
+                return self.route_classes[prefix]
+        return DEFAULT_ROUTE_CLASS
+
+    def client_key(self, scope) -> str:
+        if RATE_LIMIT_CLIENT_HEADER:
+            header = RATE_LIMIT_CLIENT_HEADER.lower().encode("latin-1")
+            for name, value in scope.get("headers", []):
+                if name == header:
+                    return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "anonymous"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        route_class = self.route_class(path, scope["method"])
+
+        if request_pool_saturated(scope):
+            logger.warning(f"Pool de conexões esgotado; descartando {scope['method']} {path}")
+            await self._reject(scope, receive, send, 503, "Servidor sobrecarregado, tente novamente", RATE_LIMIT_RETRY_AFTER)
+            return
+
+        budget = self.budgets.get(route_class)
+        if budget:
+            key = f"{self.client_key(scope)}:{route_class}"
+            wait = self.store.take(key, budget[0], budget[1], time.monotonic())
+            if wait > 0:
+                logger.warning(f"Limite de taxa excedido para {key} em {path}")
+                await self._reject(scope, receive, send, 429, "Muitas requisições, tente novamente", math.ceil(wait))
+                return
+
+        limit = self.concurrency.get(route_class)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        # O middleware roda no event loop: o contador não precisa de lock
+        if self._in_flight.get(route_class, 0) >= limit:
+            logger.warning(f"Limite de concorrência da classe '{route_class}' atingido; descartando {path}")
+            await self._reject(scope, receive, send, 503, "Servidor sobrecarregado, tente novamente", RATE_LIMIT_RETRY_AFTER)
+            return
+        self._in_flight[route_class] = self._in_flight.get(route_class, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight[route_class] -= 1
+
+    async def _reject(self, scope, receive, send, status_code: int, detail: str, retry_after: int):
+        response = JSONResponse(
+            {"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(retry_after, 1))}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,186 @@
+"""
+Réplicas de leitura.
+
+Com DATABASE_REPLICA_URLS, as rotas GET recebem sessões ligadas a uma
+réplica (rodízio entre as saudáveis) e as demais rotas, o primário. Depois
+de uma escrita, as leituras do mesmo cliente vão ao primário por
+REPLICA_STICKY_SECONDS, para que ele veja a própria escrita mesmo com o
+atraso da replicação.
+
+Cada réplica é verificada a cada REPLICA_HEALTH_INTERVAL segundos (consulta
+ao feed de alterações; com REPLICA_MAX_LAG, réplicas com mais alterações
+pendentes que isso também saem do rodízio). Erros de conexão tiram a réplica
+do rodízio na hora. Sem réplica saudável a leitura vai ao primário.
+Tenants (`app.core.tenancy`) sempre usam o próprio banco.
+
+Para testar localmente, cópias do arquivo SQLite servem de réplicas:
+    DATABASE_REPLICA_URLS=sqlite:///./rh-replica1.db,sqlite:///./rh-replica2.db
+    python -m app.core.replicas sync
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+from sqlalchemy import event, func
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlmodel import select
+
+from app.core.query_timeouts import query_interrupted
+from app.logs.logger import logger
+from app.models.ChangeLog import ChangeLog
+
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_MAX_LAG = int(os.getenv("REPLICA_MAX_LAG")) if os.getenv("REPLICA_MAX_LAG") else None
+# Cabeçalho que identifica o cliente para a leitura das próprias escritas (padrão: IP)
+REPLICA_CLIENT_HEADER = os.getenv("REPLICA_CLIENT_HEADER", os.getenv("RATE_LIMIT_CLIENT_HEADER"))
+REPLICA_STICKY_CLIENTS = 10000
+
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _last_seq(connection) -> int:
+    return connection.execute(select(func.coalesce(func.max(ChangeLog.seq), 0))).scalar_one()
+
+
+class _Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = 0.0
+        self.check_lock = threading.Lock()
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _handle_error(self, exception_context):
+        # Conexão perdida ou banco inacessível; erros de SQL e consultas
+        # interrompidas por tempo limite ou cancelamento não contam
+        if query_interrupted():
+            return
+        if exception_context.is_disconnect or isinstance(exception_context.sqlalchemy_exception, OperationalError):
+            self.mark_down(exception_context.original_exception)
+
+    def mark_down(self, reason):
+        if self.healthy:
+            logger.warning(f"Réplica {self.engine.url.render_as_string()} fora do rodízio: {reason}")
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+    def check(self, primary):
+        # Só uma requisição verifica a réplica; as demais usam o último estado
+        if not self.check_lock.acquire(blocking=False):
+            return
+        try:
+            with self.engine.connect() as connection:
+                replica_seq = _last_seq(connection)
+            if REPLICA_MAX_LAG is not None:
+                with primary.connect() as connection:
+                    lag = _last_seq(connection) - replica_seq
+                if lag > REPLICA_MAX_LAG:
+                    self.mark_down(f"atrasada em {lag} alterações")
+                    return
+            if not self.healthy:
+                logger.info(f"Réplica {self.engine.url.render_as_string()} de volta ao rodízio")
+            self.healthy = True
+            self.checked_at = time.monotonic()
+        except SQLAlchemyError as exc:
+            self.mark_down(exc)
+        finally:
+            self.check_lock.release()
+
+
+class ReplicaSet:
+    def __init__(self, primary, engines: List):
+        self.primary = primary
+        self.replicas = [_Replica(engine) for engine in engines]
+        self._counter = itertools.count()
+        self._recent_writes: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        Próxima réplica saudável no rodízio, ou None.
+        """
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._counter) % len(self.replicas)]
+            if time.monotonic() - replica.checked_at >= REPLICA_HEALTH_INTERVAL:
+                replica.check(self.primary)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def record_write(self, client: str):
+        with self._lock:
+            self._recent_writes.pop(client, None)
+            self._recent_writes[client] = time.monotonic()
+            while len(self._recent_writes) > REPLICA_STICKY_CLIENTS:
+                self._recent_writes.popitem(last=False)
+
+    def wrote_recently(self, client: str) -> bool:
+        with self._lock:
+            written_at = self._recent_writes.get(client)
+        return written_at is not None and time.monotonic() - written_at < REPLICA_STICKY_SECONDS
+
+    def is_replica(self, bind) -> bool:
+        return any(replica.engine is bind for replica in self.replicas)
+
+    def read_candidates(self, client: str) -> List:
+        """
+        Engines que podem atender uma leitura do cliente, sem avançar o rodízio
+        nem verificar a saúde das réplicas.
+        """
+        if not self.replicas or self.wrote_recently(client):
+            return [self.primary]
+        return [replica.engine for replica in self.replicas if replica.healthy] or [self.primary]
+
+    def read_engine(self, client: str):
+        """
+        Engine para uma leitura do cliente: réplica, salvo escrita recente.
+        """
+        if not self.replicas or self.wrote_recently(client):
+            return self.primary
+        return self.choose() or self.primary
+
+
+def client_id(request) -> str:
+    if REPLICA_CLIENT_HEADER and request.headers.get(REPLICA_CLIENT_HEADER):
+        return request.headers[REPLICA_CLIENT_HEADER]
+    return request.client.host if request.client else "anonymous"
+
+
+def sync_sqlite_replicas(primary, engines: List) -> List[str]:
+    """
+    Copia o banco SQLite primário para as réplicas SQLite (API de backup do
+    SQLite, consistente mesmo com escritas em andamento).
+    """
+    copied = []
+    source = sqlite3.connect(primary.url.database)
+    try:
+        for engine in engines:
+            if engine.url.get_backend_name() != "sqlite" or not engine.url.database:
+                continue
+            engine.dispose()
+            target = sqlite3.connect(engine.url.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            copied.append(engine.url.database)
+    finally:
+        source.close()
+    return copied
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.core.db import engine, replicas
+
+    if sys.argv[1:] != ["sync"] or engine.url.get_backend_name() != "sqlite":
+        print("Uso (primário SQLite): python -m app.core.replicas sync")
+        sys.exit(1)
+    for path in sync_sqlite_replicas(engine, [replica.engine for replica in replicas.replicas]):
+        print(f"Réplica atualizada: {path}")
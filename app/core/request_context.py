@@ -0,0 +1,40 @@
+"""
+Contexto da requisição em andamento, disponível fora das rotas (eventos do
+engine, profiler etc.).
+
+O middleware guarda o `scope` ASGI numa ContextVar; depois do roteamento o
+Starlette acrescenta `route` ao mesmo scope, então o nome da rota já está
+disponível quando as consultas são executadas. A ContextVar acompanha as
+rotas síncronas, que o Starlette executa no threadpool copiando o contexto.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+_current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+def current_route_name() -> Optional[str]:
+    """
+    "MÉTODO /caminho/{parametro}" da requisição atual, ou None fora de requisições.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method')} {path}"
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
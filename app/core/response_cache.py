@@ -0,0 +1,182 @@
+"""
+Cache de respostas prontas para listagens pesadas.
+
+O corpo JSON já serializado fica num LRU com teto de memória
+(RESPONSE_CACHE_MAX_BYTES), etiquetado com as tabelas que a rota lê. Num
+acerto a rota devolve os bytes guardados, sem banco nem serialização.
+
+A invalidação vem das próprias escritas: todo commit com alterações
+registradas no feed (`record_change` / `record_changes`) descarta as
+entradas etiquetadas com as tabelas alteradas, no mesmo tenant. Cada
+etiqueta tem sua geração: uma carga em andamento só deixa de ser guardada
+se uma das tabelas que ela lê foi alterada, para não deixar no cache dados
+anteriores à escrita.
+
+A invalidação é do processo. Com vários workers, uma escrita só limpa o
+cache do worker que a atendeu; as entradas também expiram após
+RESPONSE_CACHE_TTL_SECONDS, o que limita quanto tempo os demais workers
+servem dados antigos.
+
+As faltas passam pelo single-flight: várias faltas simultâneas viram uma
+consulta. Com réplicas de leitura, só leituras feitas no primário alimentam
+o cache (uma réplica atrasada o encheria de dados já invalidados).
+
+Estatísticas e limpeza em `/debug/response-cache`.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request, Response
+
+from app.core.db import replicas
+from app.core.events import on_commit
+from app.core.single_flight import coalesced_response
+from app.core.tenancy import session_tenant
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Validade de cada entrada; limita a defasagem entre workers (0 = sem expiração)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+Tag = Tuple[Optional[str], str]
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[bytes, Set[Tag], Optional[float]]]" = OrderedDict()
+        self._keys_by_tag: Dict[Tag, Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.size = 0
+        # Incrementadas a cada invalidação da etiqueta / limpeza do cache
+        self._generations: Dict[Tag, int] = {}
+        self._clears = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and time.monotonic() >= entry[2]:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self, tags: Set[Tag]) -> Tuple:
+        """
+        Gerações atuais das etiquetas, para conferir no `put`.
+        """
+        with self._lock:
+            return self._clears, tuple(sorted((tag, self._generations.get(tag, 0)) for tag in tags))
+
+    def put(self, key: Tuple, body: bytes, tags: Set[Tag], generation: Tuple):
+        """
+        Guarda o corpo carregado na geração `generation`, se nenhuma das
+        etiquetas foi invalidada desde então.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            clears, tag_generations = generation
+            if clears != self._clears or any(self._generations.get(tag, 0) != value for tag, value in tag_generations):
+                return
+            self._remove(key)
+            expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+            self._entries[key] = (body, tags, expires_at)
+            self.size += len(body)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tenant: Optional[str], tables: Iterable[str]):
+        with self._lock:
+            for table in tables:
+                self._generations[(tenant, table)] = self._generations.get((tenant, table), 0) + 1
+                for key in self._keys_by_tag.pop((tenant, table), set()):
+                    if self._remove(key):
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._generations.clear()
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self.size = 0
+
+    def _remove(self, key: Tuple) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        body, tags, _ = entry
+        self.size -= len(body)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": RESPONSE_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = ResponseCache()
+on_commit(lambda tenant, events: response_cache.invalidate(tenant, {item["entity"] for item in events}))
+
+
+def cached_response(request: Request, session, schema, tables: Iterable[str], load: Callable[[], object]) -> Response:
+    """
+    Resposta de `load()` (validada em `schema`) servida do cache enquanto
+    nenhuma das `tables` for alterada.
+    """
+    if not RESPONSE_CACHE_ENABLED:
+        return coalesced_response(request, session, schema, load)
+    tenant = session_tenant(session)
+    key = (
+        request.scope["route"].path,
+        tuple(sorted(request.path_params.items())),
+        tuple(sorted(request.query_params.multi_items())),
+        tenant,
+    )
+    body = response_cache.get(key)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+    tags = {(tenant, table) for table in tables}
+    generation = response_cache.generation(tags)
+    response = coalesced_response(request, session, schema, load)
+    if not replicas.is_replica(session.get_bind()):
+        response_cache.put(key, response.body, tags, generation)
+    response.headers["X-Cache"] = "MISS"
+    return response
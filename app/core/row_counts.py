@@ -0,0 +1,159 @@
+"""
+Contadores de linhas por tabela para os endpoints `/count` e o cabeçalho
+`X-Total-Count` das rotas paginadas, sem `COUNT(*)` a cada requisição.
+
+O total de cada tabela é ajustado pelo feed de alterações (`record_change` /
+`record_changes`), que toda escrita já chama dentro da própria transação:
+cada INSERT soma 1 e cada DELETE subtrai 1. Contagens agrupadas
+(GROUPED_COUNTS) são ajustadas pelas rotas que conhecem o valor antigo da
+coluna. Escritas que não passam pelo feed (arquivamento de folhas) ajustam
+o contador diretamente.
+
+Tabelas sem contador são contadas uma vez na inicialização (ou na primeira
+leitura). Numa leitura em réplica o contador ausente vira um `COUNT(*)`
+sem gravar nada. Recalcular do zero:
+    python -m app.core.row_counts rebuild
+"""
+import sys
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, insert, update
+from sqlmodel import Session, select
+
+from app.models.Benefit import Benefit
+from app.models.Department import Department
+from app.models.Employee import Employee
+from app.models.EmployeeBenefit import EmployeeBenefit
+from app.models.Payroll import Payroll
+from app.models.RowCount import RowCount
+
+COUNTED_MODELS = {model.__tablename__: model for model in (Benefit, Department, Employee, EmployeeBenefit, Payroll)}
+
+# Colunas com contagem por valor, por tabela
+GROUPED_COUNTS = {Benefit.__tablename__: ["type"]}
+
+# `group_value` faz parte da chave primária e não aceita NULL; o valor nulo da
+# coluna é gravado com este marcador (o símbolo ␀, já que o PostgreSQL recusa o
+# byte NUL em texto) e volta como None na leitura
+NULL_GROUP_VALUE = "\u2400"
+
+
+def _group_key(value: Any) -> str:
+    return NULL_GROUP_VALUE if value is None else str(value)
+
+
+def _group_value(key: str) -> Optional[str]:
+    return None if key == NULL_GROUP_VALUE else key
+
+
+def _counter(table_name: str, group_by: str = "", group_value: str = ""):
+    return (
+        RowCount.table_name == table_name,
+        RowCount.group_by == group_by,
+        RowCount.group_value == group_value,
+    )
+
+
+def adjust_row_count(session: Session, table_name: str, delta: int, group_by: str = "", group_value: Optional[str] = ""):
+    """
+    Soma `delta` ao contador. Sem o total da tabela não há o que ajustar:
+    ele será contado por inteiro na próxima leitura, já incluindo esta escrita.
+    """
+    if delta == 0 or table_name not in COUNTED_MODELS:
+        return
+    group_value = _group_key(group_value) if group_by else ""
+    result = session.execute(
+        update(RowCount)
+        .where(*_counter(table_name, group_by, group_value))
+        .values(row_count=RowCount.row_count + delta)
+    )
+    if result.rowcount == 0 and group_by and _total(session, table_name) is not None:
+        # Primeiro registro com este valor
+        session.execute(insert(RowCount).values(
+            table_name=table_name, group_by=group_by, group_value=group_value, row_count=max(delta, 0)
+        ))
+
+
+def move_group_count(session: Session, table_name: str, group_by: str, old_value: Optional[str], new_value: Optional[str]):
+    if old_value == new_value:
+        return
+    adjust_row_count(session, table_name, -1, group_by, old_value)
+    adjust_row_count(session, table_name, 1, group_by, new_value)
+
+
+def _total(session: Session, table_name: str):
+    return session.execute(select(RowCount.row_count).where(*_counter(table_name))).scalar_one_or_none()
+
+
+def count_table(session: Session, table_name: str) -> int:
+    """
+    Conta a tabela com `COUNT(*)` e grava o total e as contagens agrupadas.
+    """
+    model = COUNTED_MODELS[table_name]
+    session.execute(delete(RowCount).where(RowCount.table_name == table_name))
+    total = session.execute(select(func.count()).select_from(model)).scalar_one()
+    rows = [{"table_name": table_name, "group_by": "", "group_value": "", "row_count": total}]
+    for column in GROUPED_COUNTS.get(table_name, []):
+        attribute = getattr(model, column)
+        rows += [
+            {"table_name": table_name, "group_by": column, "group_value": _group_key(value), "row_count": count}
+            for value, count in session.execute(select(attribute, func.count()).group_by(attribute)).all()
+        ]
+    session.execute(insert(RowCount), rows)
+    return total
+
+
+def row_count(session: Session, model) -> int:
+    total = _total(session, model.__tablename__)
+    if total is None:
+        if session.info.get("replica"):
+            # Réplica é somente leitura: conta sem gravar o contador
+            return session.execute(select(func.count()).select_from(model)).scalar_one()
+        total = count_table(session, model.__tablename__)
+        session.commit()
+    return total
+
+
+def grouped_row_counts(session: Session, model, group_by: str) -> Dict[Optional[str], int]:
+    """
+    Contagem por valor da coluna; linhas com a coluna nula ficam na chave None.
+    """
+    if session.info.get("replica") and _total(session, model.__tablename__) is None:
+        attribute = getattr(model, group_by)
+        rows = session.execute(select(attribute, func.count()).group_by(attribute)).all()
+        return {_group_value(key): count for key, count in sorted((_group_key(value), count) for value, count in rows)}
+    row_count(session, model)
+    rows = session.execute(
+        select(RowCount.group_value, RowCount.row_count)
+        .where(RowCount.table_name == model.__tablename__, RowCount.group_by == group_by, RowCount.row_count > 0)
+        .order_by(RowCount.group_value)
+    ).all()
+    return {_group_value(key): count for key, count in rows}
+
+
+def ensure_row_counts(session: Session):
+    """
+    Conta as tabelas que ainda não têm contador (banco novo ou anterior aos contadores).
+    """
+    for table_name in COUNTED_MODELS:
+        if _total(session, table_name) is None:
+            count_table(session, table_name)
+    session.commit()
+
+
+def rebuild_row_counts(session: Session):
+    for table_name in COUNTED_MODELS:
+        count_table(session, table_name)
+    session.commit()
+
+
+if __name__ == "__main__":
+    from app.core.db import create_db_and_tables, engine
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Uso: python -m app.core.row_counts rebuild")
+        sys.exit(1)
+    create_db_and_tables()
+    with Session(engine) as session:
+        rebuild_row_counts(session)
+    print("Contadores de linhas recalculados.")
@@ -0,0 +1,129 @@
+"""
+Coalescência de leituras idênticas simultâneas (single-flight).
+
+Quando centenas de clientes abrem a mesma página ao mesmo tempo, a primeira
+requisição (líder) executa a consulta e serializa a resposta. As idênticas
+que chegam enquanto ela está em andamento (seguidoras) esperam e recebem os
+mesmos bytes, sem consultar o banco nem serializar de novo. Nada fica
+guardado depois: terminada a consulta, a próxima requisição é líder de novo.
+
+Requisições são idênticas quando têm a mesma rota, os mesmos parâmetros de
+caminho e de query (em ordem canônica), o mesmo tenant e o mesmo banco
+(primário ou réplica). Uma requisição que chega depois de um commit com
+alterações não se junta a uma consulta iniciada antes dele, para não
+receber dados anteriores à escrita.
+
+As rotas usam `coalesced_response` e as estatísticas (proporção de
+seguidoras por rota) ficam em `/debug/single-flight`.
+"""
+import os
+import threading
+from typing import Callable, Dict, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.core.events import on_commit
+from app.core.tenancy import session_tenant
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+# Espera máxima de uma seguidora; depois disso ela consulta por conta própria
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "30"))
+
+
+class _Flight:
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.body = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Tuple, _Flight] = {}
+        self._lock = threading.Lock()
+        # Incrementada a cada commit com alterações
+        self.generation = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+
+    def do(self, key: Tuple, route: str, load: Callable[[], bytes]) -> bytes:
+        """
+        Executa `load` ou espera a execução idêntica em andamento.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(route, {"leaders": 0, "followers": 0})
+            flight = self._flights.get(key)
+            leader = flight is None or flight.generation != self.generation
+            if leader:
+                flight = self._flights[key] = _Flight(self.generation)
+                stats["leaders"] += 1
+            else:
+                stats["followers"] += 1
+
+        if not leader:
+            if not flight.done.wait(SINGLE_FLIGHT_TIMEOUT):
+                return load()
+            if flight.error is not None:
+                raise flight.error
+            return flight.body
+
+        try:
+            flight.body = load()
+            return flight.body
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            routes = {route: dict(values) for route, values in self._stats.items()}
+            in_flight = len(self._flights)
+        for values in routes.values():
+            total = values["leaders"] + values["followers"]
+            values["coalescing_ratio"] = round(values["followers"] / total, 4) if total else 0.0
+        return {"enabled": SINGLE_FLIGHT_ENABLED, "in_flight": in_flight, "routes": routes}
+
+
+single_flight = SingleFlight()
+on_commit(lambda tenant, events: single_flight.invalidate())
+
+_adapters: Dict[object, TypeAdapter] = {}
+
+
+def _serialize(schema, result) -> bytes:
+    # O mesmo JSON que o response_model da rota produziria
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+
+def coalesced_response(request: Request, session, schema, load: Callable[[], object]) -> Response:
+    """
+    Resposta JSON de `load()` (validada em `schema`), compartilhada entre as
+    requisições idênticas simultâneas. Exceções da líder (404, erro de
+    banco) são repassadas às seguidoras.
+    """
+    if not SINGLE_FLIGHT_ENABLED:
+        body = _serialize(schema, load())
+    else:
+        route = request.scope["route"].path
+        key = (
+            route,
+            tuple(sorted(request.path_params.items())),
+            tuple(sorted(request.query_params.multi_items())),
+            session_tenant(session),
+            str(session.get_bind().url),
+        )
+        body = single_flight.do(key, route, lambda: _serialize(schema, load()))
+    return Response(content=body, media_type="application/json")
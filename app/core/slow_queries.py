@@ -0,0 +1,136 @@
+"""
+Registro de consultas lentas.
+
+Eventos do engine medem cada comando; os que passam de
+SLOW_QUERY_THRESHOLD_MS entram num buffer circular com os tipos dos
+parâmetros (os valores, como CPFs e salários, não são guardados), a rota que
+os executou e o plano (`EXPLAIN QUERY PLAN` no SQLite, `EXPLAIN` nos
+demais bancos). O buffer é exposto em `/debug/slow-queries`.
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.core.request_context import current_route_name
+from app.logs.logger import logger
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "100"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+
+# Em executemany só os primeiros conjuntos de parâmetros são guardados
+MAX_PARAMETER_SETS = 5
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+
+_slow_queries: deque = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+def _explain(cursor, dialect_name: str, statement: str, parameters, executemany: bool = False) -> Optional[List[str]]:
+    """
+    Obtém o plano usando um cursor DBAPI novo na mesma conexão, sem passar
+    pelos eventos do engine (evita recursão e não entra no próprio registro).
+    Fora do SQLite o EXPLAIN roda dentro de um SAVEPOINT: no PostgreSQL um
+    erro abortaria a transação da requisição.
+    """
+    if executemany:
+        # Não há um único conjunto de parâmetros para explicar
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    savepoint = dialect_name != "sqlite"
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if savepoint:
+            explain_cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            rows = explain_cursor.fetchall()
+        except Exception as exc:
+            if savepoint:
+                explain_cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            return [f"EXPLAIN indisponível: {exc}"]
+        if savepoint:
+            explain_cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    except Exception as exc:
+        # Sem transação aberta (autocommit) não há SAVEPOINT: o plano é omitido
+        return [f"EXPLAIN indisponível: {exc}"]
+    finally:
+        explain_cursor.close()
+    if dialect_name == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [" | ".join(str(value) for value in row) for row in rows]
+
+
+def _mask(parameters):
+    # Só o tipo de cada valor: os parâmetros trazem dados pessoais
+    if isinstance(parameters, dict):
+        return {key: _mask(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_mask(value) for value in parameters]
+    return None if parameters is None else type(parameters).__name__
+
+
+def _serialize_parameters(parameters, executemany: bool):
+    if executemany:
+        return {"sets": len(parameters), "first": [_mask(item) for item in parameters[:MAX_PARAMETER_SETS]]}
+    return _mask(parameters)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    if duration_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    route = current_route_name()
+    plan = None
+    if SLOW_QUERY_EXPLAIN:
+        plan = _explain(cursor, conn.dialect.name, statement, parameters, executemany)
+    logger.warning(f"Consulta lenta ({duration_ms:.1f} ms) em {route}: {statement}")
+    with _lock:
+        _slow_queries.append({
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 3),
+            "route": route,
+            "statement": statement,
+            "parameters": _serialize_parameters(parameters, executemany),
+            "plan": plan,
+        })
+
+
+def _handle_error(exception_context):
+    # Comando que falhou não chega ao after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def install_slow_query_log(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def get_slow_queries(limit: Optional[int] = None, route: Optional[str] = None) -> List[Dict]:
+    """
+    Consultas lentas registradas, da mais recente para a mais antiga.
+    """
+    with _lock:
+        queries = list(reversed(_slow_queries))
+    if route:
+        queries = [query for query in queries if query["route"] and route in query["route"]]
+    return queries[:limit] if limit else queries
+
+
+def clear_slow_queries():
+    with _lock:
+        _slow_queries.clear()
@@ -0,0 +1,263 @@
+"""
+Snapshots e restauração do banco SQLite sem parar o servidor.
+
+O snapshot usa a API de backup online do SQLite em passos de
+SNAPSHOT_PAGES_PER_STEP páginas. Entre um passo e outro o lock de leitura é
+liberado (e a thread pausa SNAPSHOT_STEP_PAUSE_MS), então as escritas
+continuam durante um snapshot de vários GB. A cópia é consistente: se outra
+conexão escreve no meio, o SQLite recomeça o backup. Depois de
+SNAPSHOT_MAX_RESTARTS recomeços, o restante é copiado num passo só.
+
+A cópia vai para um arquivo temporário, é comprimida em gzip
+(`<banco>-AAAAMMDDTHHMMSS.db.gz` em SNAPSHOT_DIR, ou
+SNAPSHOT_DIR/tenants/<tenant>) e o temporário é apagado. O job roda numa
+thread à parte; `POST /admin/snapshot` responde na hora e o progresso e a
+vazão ficam em `GET /admin/snapshot/{job_id}`.
+
+A restauração é feita pela linha de comando, com o servidor parado: o
+arquivo é descomprimido, conferido (`PRAGMA integrity_check`) e copiado
+sobre o banco com a mesma API de backup.
+    python -m app.core.snapshots create
+    python -m app.core.snapshots list
+    python -m app.core.snapshots restore snapshots/rh-20250101T030000.db.gz
+"""
+import gzip
+import itertools
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.logs.logger import logger
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_PAGES_PER_STEP = int(os.getenv("SNAPSHOT_PAGES_PER_STEP", "1024"))
+SNAPSHOT_STEP_PAUSE_MS = float(os.getenv("SNAPSHOT_STEP_PAUSE_MS", "1"))
+SNAPSHOT_MAX_RESTARTS = int(os.getenv("SNAPSHOT_MAX_RESTARTS", "3"))
+SNAPSHOT_GZIP_LEVEL = int(os.getenv("SNAPSHOT_GZIP_LEVEL", "6"))
+
+# Bloco de leitura/escrita na compressão
+COPY_CHUNK_SIZE = 1024 * 1024
+# Jobs mantidos para consulta
+SNAPSHOT_MAX_JOBS = 20
+
+SNAPSHOT_SUFFIX = ".db.gz"
+
+
+class SnapshotUnsupported(Exception):
+    pass
+
+
+class SnapshotBusy(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def database_path(bind) -> str:
+    """
+    Arquivo do banco SQLite do engine; outros bancos não são suportados.
+    """
+    url = bind.url
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise SnapshotUnsupported("Snapshots só são suportados para bancos SQLite em arquivo")
+    return url.database
+
+
+def snapshot_directory(tenant: Optional[str] = None) -> Path:
+    directory = Path(SNAPSHOT_DIR)
+    return directory / "tenants" / tenant if tenant else directory
+
+
+def list_snapshots(tenant: Optional[str] = None) -> List[Dict]:
+    directory = snapshot_directory(tenant)
+    if not directory.is_dir():
+        return []
+    return [
+        {"file": str(path), "bytes": path.stat().st_size}
+        for path in sorted(directory.glob(f"*{SNAPSHOT_SUFFIX}"), reverse=True)
+    ]
+
+
+class SnapshotJob:
+    def __init__(self, job_id: int, source: str, directory: Path, tenant: Optional[str] = None):
+        self.id = job_id
+        self.source = source
+        self.tenant = tenant
+        self.directory = directory
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.file: Optional[str] = None
+        self.pages_total = 0
+        self.pages_done = 0
+        self.page_size = 0
+        self.restarts = 0
+        self.compressed_bytes = 0
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.finished_at: Optional[str] = None
+        self.backup_seconds = 0.0
+        self.compress_seconds = 0.0
+
+    def _progress(self, status, remaining, total):
+        done = total - remaining
+        if remaining and self.pages_done and done <= self.pages_done:
+            # Outra conexão escreveu: o SQLite recomeçou a cópia do início
+            self.restarts += 1
+            if self.restarts > SNAPSHOT_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        self.pages_total, self.pages_done = total, done
+        if SNAPSHOT_STEP_PAUSE_MS:
+            time.sleep(SNAPSHOT_STEP_PAUSE_MS / 1000)
+
+    def _backup(self, target_path: Path):
+        source = sqlite3.connect(self.source)
+        target = sqlite3.connect(target_path)
+        try:
+            self.page_size = source.execute("PRAGMA page_size").fetchone()[0]
+            try:
+                source.backup(target, pages=SNAPSHOT_PAGES_PER_STEP, progress=self._progress)
+            except _TooManyRestarts:
+                logger.warning(f"Snapshot {self.id}: escritas contínuas, copiando o restante num passo só")
+                self.pages_done = 0
+                source.backup(target, pages=-1)
+                self.pages_done = self.pages_total
+        finally:
+            target.close()
+            source.close()
+
+    def run(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        final_path = self.directory / f"{Path(self.source).stem}-{stamp}{SNAPSHOT_SUFFIX}"
+        temporary = final_path.with_suffix(".tmp")
+        try:
+            started = time.perf_counter()
+            self._backup(temporary)
+            self.backup_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with open(temporary, "rb") as source, gzip.open(final_path, "wb", compresslevel=SNAPSHOT_GZIP_LEVEL) as target:
+                shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+            self.compress_seconds = time.perf_counter() - started
+
+            self.compressed_bytes = final_path.stat().st_size
+            self.file = str(final_path)
+            self.status = "done"
+            logger.info(f"Snapshot {self.id} concluído: {self.file} ({self.stats()['backup_mb_per_s']} MB/s na cópia)")
+        except Exception as exc:
+            self.status = "failed"
+            self.error = str(exc)
+            final_path.unlink(missing_ok=True)
+            logger.exception(f"Falha no snapshot {self.id}")
+        finally:
+            temporary.unlink(missing_ok=True)
+            self.finished_at = datetime.now(timezone.utc).isoformat()
+
+    def stats(self) -> Dict:
+        database_bytes = self.pages_total * self.page_size
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "file": self.file,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "progress": round(self.pages_done / self.pages_total, 4) if self.pages_total else 0.0,
+            "restarts": self.restarts,
+            "database_bytes": database_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "backup_seconds": round(self.backup_seconds, 3),
+            "compress_seconds": round(self.compress_seconds, 3),
+            "backup_mb_per_s": round(database_bytes / 1e6 / self.backup_seconds, 2) if self.backup_seconds else None,
+            "compress_mb_per_s": round(database_bytes / 1e6 / self.compress_seconds, 2) if self.compress_seconds else None,
+        }
+
+
+_jobs: "OrderedDict[int, SnapshotJob]" = OrderedDict()
+_job_ids = itertools.count(1)
+_jobs_lock = threading.Lock()
+
+
+def start_snapshot(bind, tenant: Optional[str] = None) -> SnapshotJob:
+    """
+    Inicia o snapshot em segundo plano. Um job por vez em cada banco.
+    """
+    source = database_path(bind)
+    with _jobs_lock:
+        if any(job.status == "running" and job.source == source for job in _jobs.values()):
+            raise SnapshotBusy()
+        job = SnapshotJob(next(_job_ids), source, snapshot_directory(tenant), tenant)
+        _jobs[job.id] = job
+        while len(_jobs) > SNAPSHOT_MAX_JOBS:
+            _jobs.popitem(last=False)
+    threading.Thread(target=job.run, name=f"snapshot-{job.id}", daemon=True).start()
+    return job
+
+
+def get_job(job_id: int, tenant: Optional[str] = None) -> Optional[SnapshotJob]:
+    """
+    Job do snapshot, se for do banco do `tenant` (None: banco padrão).
+    """
+    job = _jobs.get(job_id)
+    return job if job is not None and job.tenant == tenant else None
+
+
+def restore_snapshot(bind, snapshot_file: str) -> Dict:
+    """
+    Substitui o conteúdo do banco pelo do snapshot (com o servidor parado).
+    """
+    target_path = database_path(bind)
+    temporary = Path(target_path).with_name(Path(target_path).name + ".restore.tmp")
+    started = time.perf_counter()
+    try:
+        with gzip.open(snapshot_file, "rb") as source, open(temporary, "wb") as target:
+            shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+        source = sqlite3.connect(temporary)
+        try:
+            check = source.execute("PRAGMA integrity_check").fetchone()[0]
+            if check != "ok":
+                raise ValueError(f"Snapshot corrompido: {check}")
+            bind.dispose()
+            target = sqlite3.connect(target_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
+        restored_bytes = temporary.stat().st_size
+    finally:
+        temporary.unlink(missing_ok=True)
+    seconds = time.perf_counter() - started
+    return {"file": snapshot_file, "database": target_path, "bytes": restored_bytes, "seconds": round(seconds, 3)}
+
+
+if __name__ == "__main__":
+    from app.core.db import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "create" and len(sys.argv) == 2:
+        snapshot = SnapshotJob(0, database_path(engine), snapshot_directory())
+        snapshot.run()
+        print(snapshot.stats())
+        sys.exit(0 if snapshot.status == "done" else 1)
+    if command == "list" and len(sys.argv) == 2:
+        for item in list_snapshots():
+            print(f"{item['file']}  {item['bytes']} bytes")
+        sys.exit(0)
+    if command == "restore" and len(sys.argv) == 3:
+        print(restore_snapshot(engine, sys.argv[2]))
+        print("Banco restaurado. Reinicie o servidor para descartar caches em memória.")
+        sys.exit(0)
+    print("Uso: python -m app.core.snapshots create | list | restore <arquivo.db.gz>")
+    sys.exit(1)
@@ -0,0 +1,91 @@
+"""
+Resolução do tenant (empresa cliente) de cada requisição.
+
+Com TENANT_DATABASE_URL definido, cada tenant tem o próprio banco: a URL é
+um modelo com `{tenant}`, por exemplo um arquivo SQLite por tenant
+(`sqlite:///tenants/{tenant}.db`) ou um schema por tenant no PostgreSQL
+(`postgresql://.../rh?options=-csearch_path%3D{tenant}`). O tenant vem do
+cabeçalho TENANT_HEADER ou, com TENANT_HOST_SUFFIX, do subdomínio do Host
+(`acme.rh.exemplo.com` -> `acme`).
+
+Os engines dos tenants são criados sob demanda em `app.core.db`, com pools
+pequenos e um teto de engines abertos (os menos usados são descartados).
+Sem TENANT_DATABASE_URL a aplicação atende um único banco (DATABASE_URL).
+
+Criar o banco (ou schema) de um tenant:
+    python -m app.core.tenancy create acme
+"""
+import os
+import re
+import sys
+from typing import Mapping, Optional
+
+TENANT_DATABASE_URL = os.getenv("TENANT_DATABASE_URL")
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-ID")
+TENANT_HOST_SUFFIX = os.getenv("TENANT_HOST_SUFFIX")
+# Sem tenant identificado: 400 se obrigatório, senão usa o banco de DATABASE_URL
+TENANT_REQUIRED = os.getenv("TENANT_REQUIRED", "false").lower() == "true"
+TENANT_MAX_ENGINES = int(os.getenv("TENANT_MAX_ENGINES", "50"))
+TENANT_POOL_SIZE = int(os.getenv("TENANT_POOL_SIZE", "2"))
+TENANT_MAX_OVERFLOW = int(os.getenv("TENANT_MAX_OVERFLOW", "3"))
+
+# O identificador entra em nomes de arquivo e de schema
+TENANT_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+class InvalidTenant(Exception):
+    pass
+
+
+class UnknownTenant(Exception):
+    pass
+
+
+def resolve_tenant(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Tenant da requisição (cabeçalho ou subdomínio), ou None se não houver
+    multi-tenancy ou nenhum tenant for informado.
+    """
+    if not TENANT_DATABASE_URL:
+        return None
+    tenant = headers.get(TENANT_HEADER)
+    if not tenant and TENANT_HOST_SUFFIX:
+        host = headers.get("host", "").split(":")[0]
+        if host.endswith(TENANT_HOST_SUFFIX) and len(host) > len(TENANT_HOST_SUFFIX):
+            tenant = host[:-len(TENANT_HOST_SUFFIX)].rstrip(".")
+    if not tenant:
+        if TENANT_REQUIRED:
+            raise InvalidTenant("Tenant não informado")
+        return None
+    tenant = tenant.strip().lower()
+    if not TENANT_PATTERN.match(tenant):
+        raise InvalidTenant(f"Tenant inválido: {tenant}")
+    return tenant
+
+
+def tenant_url(tenant: str) -> str:
+    return TENANT_DATABASE_URL.format(tenant=tenant)
+
+
+def session_tenant(session) -> Optional[str]:
+    """
+    Tenant ao qual a sessão está ligada (None no banco padrão). Usado para
+    separar caches e arquivos mantidos pelo processo.
+    """
+    return session.info.get("tenant")
+
+
+if __name__ == "__main__":
+    from app.core.db import create_tenant_database
+
+    if len(sys.argv) != 3 or sys.argv[1] != "create":
+        print("Uso: python -m app.core.tenancy create <tenant>")
+        sys.exit(1)
+    if not TENANT_DATABASE_URL:
+        print("Defina TENANT_DATABASE_URL")
+        sys.exit(1)
+    if not TENANT_PATTERN.match(sys.argv[2]):
+        print(f"Tenant inválido: {sys.argv[2]}")
+        sys.exit(1)
+    create_tenant_database(sys.argv[2])
+    print(f"Banco do tenant {sys.argv[2]} criado.")
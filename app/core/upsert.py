@@ -0,0 +1,108 @@
+"""
+Apoio aos endpoints de upsert idempotente por chave natural.
+
+Cada linha recebe um `content_hash` com os campos de negócio. O upsert usa
+`INSERT ... ON CONFLICT DO UPDATE ... WHERE content_hash IS DISTINCT FROM
+excluded.content_hash`, e as linhas cujo hash já bate com o banco nem são
+enviadas, de modo que uma ressincronização sem mudanças quase não escreve.
+"""
+import hashlib
+import json
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from app.core.db import coerce_returning
+from app.models.Employee import Employee
+from app.models.Payroll import Payroll
+
+# Limita o número de parâmetros por comando (SQLite aceita poucos por padrão)
+UPSERT_CHUNK_SIZE = 500
+
+EMPLOYEE_HASH_COLUMNS = ["cpf", "name", "position", "admission_date", "department_id"]
+PAYROLL_HASH_COLUMNS = ["employee_id", "reference_month", "gross_salary", "deductions", "net_salary"]
+
+
+class UpsertUnsupported(Exception):
+    pass
+
+
+def content_hash(values: Dict, columns: Sequence[str]) -> str:
+    payload = json.dumps([values.get(column) for column in columns], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _register_content_hash(model, columns: Sequence[str]):
+    """
+    Mantém o `content_hash` atualizado também nas escritas feitas pelo ORM
+    (criação, atualização, troca de departamento etc.).
+    """
+    def set_hash(mapper, connection, target):
+        target.content_hash = content_hash({column: getattr(target, column) for column in columns}, columns)
+
+    event.listen(model, "before_insert", set_hash)
+    event.listen(model, "before_update", set_hash)
+
+
+_register_content_hash(Employee, EMPLOYEE_HASH_COLUMNS)
+_register_content_hash(Payroll, PAYROLL_HASH_COLUMNS)
+
+
+def _chunks(items: List, size: int = UPSERT_CHUNK_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def dialect_insert(session: Session):
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert
+    if dialect == "postgresql":
+        return postgresql_insert
+    raise UpsertUnsupported(f"Upsert não suportado para o banco '{dialect}'")
+
+
+def fetch_existing(session: Session, model, key_columns: Sequence[str], keys: List[Tuple], columns: Sequence[str]) -> Dict[Tuple, Dict]:
+    """
+    Busca, em blocos, as linhas já existentes para as chaves naturais informadas.
+    Retorna {chave: {coluna: valor}} apenas com as colunas pedidas.
+    """
+    table = model.__table__
+    key_expression = tuple_(*[table.c[column] for column in key_columns]) if len(key_columns) > 1 else table.c[key_columns[0]]
+    selected = [table.c[column] for column in dict.fromkeys([*key_columns, *columns])]
+    existing = {}
+    for chunk in _chunks(keys):
+        values = chunk if len(key_columns) > 1 else [key[0] for key in chunk]
+        for row in session.execute(select(*selected).where(key_expression.in_(values))).mappings():
+            existing[tuple(row[column] for column in key_columns)] = dict(row)
+    return existing
+
+
+def upsert_rows(session: Session, model, rows: List[Dict], key_columns: Sequence[str]) -> List[Dict]:
+    """
+    Executa INSERT ... ON CONFLICT DO UPDATE para as linhas (que já devem
+    conter `content_hash`). Retorna id, versão e chave natural das linhas escritas.
+    """
+    if not rows:
+        return []
+    insert = dialect_insert(session)
+    table = model.__table__
+    update_columns = [column for column in rows[0] if column not in key_columns]
+    returning = [table.c.id, table.c.version, *[table.c[column] for column in key_columns]]
+
+    written = []
+    for chunk in _chunks(rows):
+        statement = insert(table).values(chunk)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={
+                **{column: statement.excluded[column] for column in update_columns},
+                "version": table.c.version + 1,
+            },
+            where=table.c.content_hash.is_distinct_from(statement.excluded.content_hash),
+        ).returning(*returning)
+        written.extend(coerce_returning(returning, row) for row in session.execute(statement).mappings())
+    return written
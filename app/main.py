@@ -1,23 +1,53 @@
+import os
+
 import uvicorn
 from fastapi import FastAPI
 
+from app.core.compression import CompressionMiddleware
 from app.core.db import create_db_and_tables
+from app.core.profiler import install_profiler_signal
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.request_context import RequestContextMiddleware
+from app.routers.AdminRouter import router as AdminRouter
+from app.routers.AnalyticsRouter import router as AnalyticsRouter
 from app.routers.BenefitRouter import router as BenefitRouter
+from app.routers.ChangeRouter import router as ChangeRouter
+from app.routers.DebugRouter import router as DebugRouter
 from app.routers.DepartmentRouter import router as DepartmentRouter
 from app.routers.EmployeeRouter import router as EmployeeRouter
+from app.routers.EventRouter import router as EventRouter
 from app.routers.PayrollRouter import router as PayrollRouter
 from app.routers.EmployeeBenefitRouter import router as EmployeeBenefitRouter
 
+# Rotas de diagnóstico (/debug) expõem SQL, perfis e estatísticas internas,
+# sem autenticação: ligue só em desenvolvimento
+DEBUG_ROUTES_ENABLED = os.getenv("DEBUG_ROUTES_ENABLED", "false").lower() == "true"
+# Rotas administrativas (/admin: snapshots do banco), também sem
+# autenticação: ligue só atrás de uma rede ou proxy restritos
+ADMIN_ROUTES_ENABLED = os.getenv("ADMIN_ROUTES_ENABLED", "false").lower() == "true"
+
 app = FastAPI()
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Adicionado por último: é o mais externo e descarta a carga antes de comprimir
+app.add_middleware(RateLimitMiddleware)
+if ADMIN_ROUTES_ENABLED:
+    app.include_router(AdminRouter)
+app.include_router(AnalyticsRouter)
 app.include_router(BenefitRouter)
+app.include_router(ChangeRouter)
+if DEBUG_ROUTES_ENABLED:
+    app.include_router(DebugRouter)
 app.include_router(DepartmentRouter)
 app.include_router(EmployeeRouter)
 app.include_router(EmployeeBenefitRouter)
+app.include_router(EventRouter)
 app.include_router(PayrollRouter)
 
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    install_profiler_signal(app)
     
 if __name__=="__main__":
     uvicorn.run(app="main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,28 @@
+from typing import Any, List, Optional
+from sqlmodel import SQLModel, Field
+
+class AnalyticsFilter(SQLModel):
+    column: str
+    op: str = "=="
+    value: Any = None
+
+class AnalyticsAggregate(SQLModel):
+    func: str
+    column: Optional[str] = None
+    alias: Optional[str] = None
+
+class AnalyticsQuery(SQLModel):
+    """
+    Consulta sobre o snapshot colunar. Exemplo (salário líquido médio por
+    cargo em 24 meses):
+
+        {"dataset": "payroll",
+         "filters": [{"column": "reference_month", "op": ">=", "value": "2023-11"}],
+         "group_by": ["position"],
+         "aggregates": [{"func": "avg", "column": "net_salary"}, {"func": "count"}]}
+    """
+    dataset: str = "payroll"
+    filters: List[AnalyticsFilter] = []
+    group_by: List[str] = []
+    aggregates: List[AnalyticsAggregate] = []
+    limit: int = Field(default=1000, ge=1, le=100000)
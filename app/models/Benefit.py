@@ -13,6 +13,7 @@ class BenefitBase(SQLModel):
 
 class Benefit(BenefitBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     employees: List["EmployeeBenefit"] = Relationship(back_populates="benefit")
 
 class BenefitCreate(BenefitBase):
@@ -20,6 +21,7 @@ class BenefitCreate(BenefitBase):
 
 class BenefitRead(BenefitBase):
     id: int
+    version: int = 1
 
 class BenefitUpdate(SQLModel):
     name: Optional[str] = None
@@ -27,3 +29,4 @@ class BenefitUpdate(SQLModel):
     amount: Optional[float] = None
     type: Optional[str] = None
     active: Optional[bool] = None
+    version: Optional[int] = None
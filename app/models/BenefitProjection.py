@@ -0,0 +1,26 @@
+from typing import List, Optional
+from sqlmodel import SQLModel, Field
+
+class BenefitScenarioChange(SQLModel):
+    benefit_id: int
+    # Novo valor base (vale para os vínculos sem valor personalizado)
+    amount: Optional[float] = Field(default=None, ge=0)
+    # Multiplica o custo de todos os vínculos do benefício, inclusive os personalizados
+    factor: Optional[float] = Field(default=None, ge=0)
+    active: Optional[bool] = None
+
+class BenefitProjectionQuery(SQLModel):
+    """
+    Cenário hipotético de custos de benefícios. Exemplo (plano de saúde 12%
+    mais caro e vale-alimentação desativado no próximo trimestre):
+
+        {"from_month": "2025-01", "to_month": "2025-03",
+         "changes": [{"benefit_id": 3, "factor": 1.12},
+                     {"benefit_id": 5, "active": false}]}
+
+    Sem meses informados, projeta os três meses seguintes ao atual.
+    """
+    # Meses no formato AAAA-MM
+    from_month: Optional[str] = None
+    to_month: Optional[str] = None
+    changes: List[BenefitScenarioChange] = []
@@ -0,0 +1,14 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class ChangeLog(SQLModel, table=True):
+    """
+    Registro append-only das escritas (insert/update/delete) de todas as entidades.
+    """
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    entity: str
+    entity_id: int
+    operation: str
+    # Registro serializado em JSON; None nas exclusões (tombstones)
+    data: Optional[str] = None
+    changed_at: str
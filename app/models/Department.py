@@ -16,12 +16,15 @@ class Department(DepartmentBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     manager_id: Optional[int] = Field(default=None, foreign_key="employee.id")
     
-    # Especificar explicitamente a chave estrangeira para o gerente
+    # Especificar explicitamente a chave estrangeira para o gerente.
+    # post_update: gerente e departamento apontam um para o outro; o
+    # manager_id é gravado num UPDATE à parte para o flush não ficar circular
     manager: Optional["Employee"] = Relationship(
         back_populates="managed_department",
         sa_relationship_kwargs={
             "uselist": False,
-            "foreign_keys": "Department.manager_id"
+            "foreign_keys": "Department.manager_id",
+            "post_update": True
         }
     )
     
@@ -0,0 +1,29 @@
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class DepartmentStats(SQLModel, table=True):
+    """
+    Contadores desnormalizados por departamento, mantidos pelas rotas de escrita.
+    """
+    department_id: int = Field(primary_key=True, foreign_key="department.id")
+    headcount: int = 0
+
+class DepartmentPayrollStats(SQLModel, table=True):
+    """
+    Totais de folha de pagamento por departamento e mês de referência.
+    """
+    department_id: int = Field(primary_key=True, foreign_key="department.id")
+    reference_month: str = Field(primary_key=True)
+    payroll_count: int = 0
+    gross_total: float = 0
+    net_total: float = 0
+
+class DepartmentStatsRead(SQLModel):
+    department_id: int
+    name: str
+    manager_id: Optional[int] = None
+    headcount: int
+    reference_month: str
+    payroll_count: int
+    gross_total: float
+    net_total: float
@@ -1,6 +1,10 @@
 from typing import List, Optional, TYPE_CHECKING
+from pydantic import field_validator
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
+from app.core.cpf import validate_cpf
+
 if TYPE_CHECKING:
     from app.models.Department import Department
     from app.models.EmployeeBenefit import EmployeeBenefit
@@ -14,7 +18,13 @@ class EmployeeBase(SQLModel):
     department_id: Optional[int] = Field(default=None, foreign_key="department.id")
 
 class Employee(EmployeeBase, table=True):
+    # O CPF só com dígitos é a chave natural usada pelo upsert (ON CONFLICT)
+    __table_args__ = (Index("ux_employee_cpf_normalized", "cpf_normalized", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    cpf_normalized: Optional[str] = Field(default=None)
+    content_hash: Optional[str] = Field(default=None)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     # Especificar explicitamente a chave estrangeira para o departamento
     department: Optional["Department"] = Relationship(
@@ -27,7 +37,8 @@ class Employee(EmployeeBase, table=True):
         back_populates="manager",
         sa_relationship_kwargs={
             "uselist": False,
-            "foreign_keys": "Department.manager_id"
+            "foreign_keys": "Department.manager_id",
+            "post_update": True
         }
     )
 
@@ -35,14 +46,34 @@ class Employee(EmployeeBase, table=True):
     benefits: List["EmployeeBenefit"] = Relationship(back_populates="employee")
 
 class EmployeeCreate(EmployeeBase):
-    pass
+    @field_validator("cpf")
+    @classmethod
+    def check_cpf(cls, value: str) -> str:
+        return validate_cpf(value)
 
 class EmployeeRead(EmployeeBase):
     id: int
+    version: int = 1
+
+class OrgChartEntry(EmployeeRead):
+    # Distância até o funcionário consultado (1 = subordinado/gerente direto)
+    depth: int
+
+class EmployeeUpsert(SQLModel):
+    name: str
+    position: str
+    admission_date: str
+    department_id: Optional[int] = None
 
 class EmployeeUpdate(SQLModel):
     name: Optional[str] = None
     cpf: Optional[str] = None
     position: Optional[str] = None
     admission_date: Optional[str] = None
-    department_id: Optional[int] = None
\ No newline at end of file
+    department_id: Optional[int] = None
+    version: Optional[int] = None
+
+    @field_validator("cpf")
+    @classmethod
+    def check_cpf(cls, value: Optional[str]) -> Optional[str]:
+        return value if value is None else validate_cpf(value)
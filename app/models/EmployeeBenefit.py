@@ -14,6 +14,7 @@ class EmployeeBenefitBase(SQLModel):
 
 class EmployeeBenefit(EmployeeBenefitBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     employee: Optional["Employee"] = Relationship(back_populates="benefits")
     benefit: Optional["Benefit"] = Relationship(back_populates="employees")
@@ -24,8 +25,10 @@ class EmployeeBenefitCreate(EmployeeBenefitBase):
 
 class EmployeeBenefitRead(EmployeeBenefitBase):
     id: int
+    version: int = 1
 
 class EmployeeBenefitUpdate(EmployeeBenefitBase):
     start_date: Optional[str] = None
     end_date: Optional[str] = None
     custom_amount: Optional[float] = None
+    version: Optional[int] = None
@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+
+class OrgClosure(SQLModel, table=True):
+    """
+    Fecho transitivo da hierarquia (gerente do departamento do funcionário):
+    uma linha por par (superior, subordinado) com a distância entre eles.
+    Mantido só com ORG_CLOSURE_ENABLED.
+    """
+    ancestor_id: int = Field(primary_key=True)
+    descendant_id: int = Field(primary_key=True, index=True)
+    depth: int
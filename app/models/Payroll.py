@@ -1,4 +1,5 @@
 from typing import Optional, TYPE_CHECKING, List
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 if TYPE_CHECKING:
@@ -11,8 +12,13 @@ class PayrollBase(SQLModel):
     reference_month: str
 
 class Payroll(PayrollBase, table=True):
+    # Uma folha por funcionário e mês: chave natural usada pelo upsert
+    __table_args__ = (Index("ux_payroll_employee_month", "employee_id", "reference_month", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     employee_id: int = Field(default=None, foreign_key="employee.id")
+    content_hash: Optional[str] = Field(default=None)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     employee: Optional["Employee"] = Relationship(back_populates="payrolls")
 
@@ -21,6 +27,12 @@ class PayrollCreate(PayrollBase):
 
 class PayrollRead(PayrollBase):
     id: int
+    version: int = 1
+
+class PayrollUpsert(SQLModel):
+    gross_salary: float
+    deductions: float
+    net_salary: float
 
 class PayrollUpdate(PayrollBase):
     gross_salary: Optional[float] = None
@@ -28,3 +40,4 @@ class PayrollUpdate(PayrollBase):
     net_salary: Optional[float] = None
     reference_month: Optional[str] = None
     employee_id: Optional[int] = None
+    version: Optional[int] = None
@@ -0,0 +1,16 @@
+from sqlmodel import SQLModel, Field
+
+class PayrollArchiveMonth(SQLModel, table=True):
+    """
+    Meses de referência já movidos da tabela `payroll` para o arquivo anual.
+    """
+    reference_month: str = Field(primary_key=True)
+    year: int = Field(index=True)
+    row_count: int
+    archived_at: str
+
+class PayrollHistoryRead(SQLModel):
+    reference_month: str
+    payroll_count: int
+    gross_total: float
+    net_total: float
@@ -0,0 +1,12 @@
+from sqlmodel import SQLModel, Field
+
+class RowCount(SQLModel, table=True):
+    """
+    Quantidade de linhas por tabela, mantida junto das escritas. A linha com
+    `group_by` vazio é o total; as demais contam por valor de uma coluna
+    (ex.: benefícios por `type`).
+    """
+    table_name: str = Field(primary_key=True)
+    group_by: str = Field(default="", primary_key=True)
+    group_value: str = Field(default="", primary_key=True)
+    row_count: int = 0
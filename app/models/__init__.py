@@ -1,7 +1,12 @@
 from .Benefit import Benefit
+from .ChangeLog import ChangeLog
 from .Department import Department
+from .DepartmentStats import DepartmentStats, DepartmentPayrollStats
 from .Employee import Employee
 from .EmployeeBenefit import EmployeeBenefit
+from .OrgClosure import OrgClosure
 from .Payroll import Payroll
+from .PayrollArchive import PayrollArchiveMonth
+from .RowCount import RowCount
 
-__all__ = ["Benefit", "Department", "Employee", "EmployeeBenefit", "Payroll"]
+__all__ = ["Benefit", "ChangeLog", "Department", "DepartmentStats", "DepartmentPayrollStats", "Employee", "EmployeeBenefit", "OrgClosure", "Payroll", "PayrollArchiveMonth", "RowCount"]
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.analytics import AnalyticsUnavailable, rebuild_snapshot
+from app.core.db import get_session
+from app.core.department_stats import rebuild_department_stats
+from app.core.snapshots import SnapshotBusy, SnapshotUnsupported, get_job, list_snapshots, start_snapshot
+from app.core.tenancy import session_tenant
+from app.logs.logger import logger
+
+router = APIRouter(prefix="/admin", tags=["Administração"])
+
+@router.post("/snapshot", status_code=202)
+def create_snapshot(response: Response, session = Depends(get_session)):
+    """
+    Inicia um snapshot comprimido do banco (do tenant, se informado) em
+    segundo plano, sem bloquear as escritas. Acompanhe em `Location`.
+    """
+    try:
+        job = start_snapshot(session.get_bind(), session_tenant(session))
+    except SnapshotUnsupported as exc:
+        raise HTTPException(status_code=501, detail=str(exc))
+    except SnapshotBusy:
+        raise HTTPException(status_code=409, detail="Já existe um snapshot em andamento")
+    logger.info(f"Snapshot {job.id} iniciado")
+    response.headers["Location"] = f"/admin/snapshot/{job.id}"
+    return job.stats()
+
+@router.get("/snapshot/{job_id}")
+def get_snapshot_job(job_id: int, session = Depends(get_session)):
+    """
+    Progresso (páginas copiadas), vazão e arquivo gerado do snapshot. Só
+    responde snapshots do banco do tenant da requisição.
+    """
+    job = get_job(job_id, session_tenant(session))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Snapshot não encontrado")
+    return job.stats()
+
+@router.get("/snapshots")
+def get_snapshots(session = Depends(get_session)):
+    """
+    Arquivos de snapshot disponíveis, do mais recente para o mais antigo.
+    """
+    return list_snapshots(session_tenant(session))
+
+@router.post("/department-stats/rebuild")
+def rebuild_departments_stats(session = Depends(get_session)):
+    """
+    Recalcula do zero os contadores de todos os departamentos (varre
+    funcionários, folhas e o arquivo da folha).
+    """
+    logger.debug("Recalculando estatísticas dos departamentos")
+    try:
+        rebuild_department_stats(session)
+        logger.info("Estatísticas dos departamentos recalculadas com sucesso")
+        return {"message": "Estatísticas recalculadas com sucesso"}
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception("Erro ao recalcular estatísticas dos departamentos")
+        raise HTTPException(status_code=500, detail="Erro interno ao recalcular estatísticas dos departamentos")
+
+@router.post("/analytics/rebuild")
+def rebuild_analytics_snapshot(session = Depends(get_session)):
+    """
+    Reconstrói do zero o snapshot analítico do tenant.
+    """
+    try:
+        stats = rebuild_snapshot(session)
+    except AnalyticsUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except SQLAlchemyError:
+        logger.exception("Erro ao reconstruir o snapshot analítico")
+        raise HTTPException(status_code=500, detail="Erro interno ao reconstruir o snapshot analítico")
+    logger.info("Snapshot analítico reconstruído sob demanda")
+    return stats
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.analytics import (
+    AnalyticsQueryError, AnalyticsUnavailable, run_query, snapshot_stats
+)
+from app.core.db import get_session
+from app.logs.logger import logger
+from app.models.Analytics import AnalyticsQuery
+
+router = APIRouter(prefix="/analytics", tags=["Análises"])
+
+@router.post("/query")
+def query_analytics(query: AnalyticsQuery, session = Depends(get_session)):
+    """
+    Executa filtros, agrupamentos e agregações (count, sum, avg, min, max)
+    sobre o snapshot colunar em memória dos datasets `payroll` e `employee`.
+    """
+    logger.debug(f"Consulta analítica: {query}")
+    try:
+        result = run_query(
+            session,
+            query.dataset,
+            [item.dict() for item in query.filters],
+            query.group_by,
+            [item.dict() for item in query.aggregates],
+            query.limit,
+        )
+    except AnalyticsUnavailable as exc:
+        logger.warning(f"Snapshot analítico indisponível: {exc}")
+        raise HTTPException(status_code=503, detail=str(exc))
+    except AnalyticsQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except SQLAlchemyError:
+        logger.exception("Erro ao atualizar o snapshot analítico")
+        raise HTTPException(status_code=500, detail="Erro interno ao executar consulta analítica")
+
+    result["snapshot"] = snapshot_stats(session, refresh=False)
+    logger.info(f"Consulta analítica retornou {len(result['rows'])} linhas")
+    return result
+
+@router.get("/snapshot")
+def get_snapshot_stats(session = Depends(get_session)):
+    """
+    Linhas, memória ocupada e último `seq` aplicado do snapshot.
+    """
+    try:
+        return snapshot_stats(session)
+    except AnalyticsUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except SQLAlchemyError:
+        logger.exception("Erro ao atualizar o snapshot analítico")
+        raise HTTPException(status_code=500, detail="Erro interno ao atualizar o snapshot analítico")
@@ -1,10 +1,18 @@
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from sqlalchemy.exc import SQLAlchemyError
-from sqlmodel import Session, func, select
-from app.models.Benefit import Benefit, BenefitCreate, BenefitRead
-from ..core.db import get_session
+from sqlmodel import Session, select
+from app.models.Benefit import Benefit, BenefitCreate, BenefitRead, BenefitUpdate
+from app.models.BenefitProjection import BenefitProjectionQuery
+from app.models.EmployeeBenefit import EmployeeBenefit
+from ..core.benefit_projection import ProjectionQueryError, ProjectionUnavailable, project_benefit_costs
+from ..core.changes import DELETE, INSERT, UPDATE, record_change, record_changes
+from ..core.db import execute_returning, get_session
+from ..core.locking import ExpectedVersion, compare_and_swap, etag, fetch_current
+from ..core.query_timeouts import QueryBudget, QueryCancelled, QueryTimeout, query_budget
+from ..core.response_cache import cached_response
+from ..core.row_counts import adjust_row_count, grouped_row_counts, move_group_count, row_count
 from ..logs.logger import logger
 
 
@@ -21,6 +29,8 @@ def create_benefit(benefit: BenefitCreate, session: Session = Depends(get_sessio
     try:
         db_benefit = Benefit.from_orm(benefit)
         session.add(db_benefit)
+        record_change(session, db_benefit, INSERT)
+        adjust_row_count(session, Benefit.__tablename__, 1, "type", db_benefit.type)
         session.commit()
         session.refresh(db_benefit)
         logger.info(f"Benefício criado com sucesso: {db_benefit}")
@@ -31,21 +41,39 @@ def create_benefit(benefit: BenefitCreate, session: Session = Depends(get_sessio
         raise HTTPException(status_code=500, detail="Erro interno ao criar benefício")
     
 @router.put("/{benefit_id}", response_model=BenefitRead)
-def update_benefit(benefit_id: int, benefit: BenefitCreate, session: Session = Depends(get_session)):
+def update_benefit(
+    benefit_id: int,
+    benefit: BenefitUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    session: Session = Depends(get_session)
+):
     """
     Atualiza um benefício existente.
+
+    Envie `If-Match` (ETag recebido) ou `version` no corpo para evitar
+    sobrescrever alterações concorrentes (conflito: 412 / 409).
     """
-    db_benefit = session.query(Benefit).filter(Benefit.id == benefit_id).first()
-    if not db_benefit:
-        logger.warning(f"Benefício com ID {benefit_id} não encontrado para atualização.")
-        raise HTTPException(status_code=404, detail="Benefício não encontrado")
-    
-    update_data = benefit.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_benefit, key, value)
-    
-    session.commit()
-    session.refresh(db_benefit)
+    expected = ExpectedVersion(if_match, benefit.version)
+    update_data = benefit.dict(exclude_unset=True, exclude={"version"})
+    try:
+        # O tipo antigo só é lido quando a contagem por tipo pode mudar
+        current = None
+        if "type" in update_data:
+            current = fetch_current(session, Benefit, benefit_id, "type", not_found="Benefício não encontrado")
+        db_benefit = compare_and_swap(
+            session, Benefit, benefit_id, update_data, expected, current, not_found="Benefício não encontrado"
+        )
+        if current is not None:
+            move_group_count(session, Benefit.__tablename__, "type", current["type"], db_benefit["type"])
+        record_changes(session, Benefit.__tablename__, [(benefit_id, UPDATE, db_benefit)])
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception(f"Erro ao atualizar benefício ID {benefit_id}")
+        raise HTTPException(status_code=500, detail="Erro interno ao atualizar benefício")
+
+    response.headers["ETag"] = etag(db_benefit["version"])
     logger.info(f"Benefício atualizado com sucesso: {db_benefit}")
     return db_benefit
 
@@ -56,12 +84,21 @@ def delete_benefit(benefit_id: int, session: Session = Depends(get_session)):
     """
     logger.debug(f"Tentando deletar benefício com ID {benefit_id}")
     try:
-        benefit = session.query(Benefit).filter(Benefit.id == benefit_id).first()
-        if not benefit:
+        # As concessões do benefício saem junto (employee_benefit.benefit_id não aceita NULL)
+        employee_benefit = EmployeeBenefit.__table__
+        assignments = execute_returning(
+            session, employee_benefit.delete().where(employee_benefit.c.benefit_id == benefit_id), [employee_benefit.c.id]
+        )
+        table = Benefit.__table__
+        deleted = execute_returning(session, table.delete().where(table.c.id == benefit_id), [table.c.id, table.c.type])
+        if not deleted:
+            session.rollback()
             logger.warning(f"Benefício com ID {benefit_id} não encontrado.")
             raise HTTPException(status_code=404, detail="Benefício não encontrado")
-        
-        session.delete(benefit)
+
+        record_changes(session, EmployeeBenefit.__tablename__, [(row["id"], DELETE, None) for row in assignments])
+        record_changes(session, Benefit.__tablename__, [(benefit_id, DELETE, None)])
+        adjust_row_count(session, Benefit.__tablename__, -1, "type", deleted[0]["type"])
         session.commit()
         logger.info(f"Benefício deletado com sucesso: ID {benefit_id}")
         return {"message": "Benefício deletado com sucesso"}
@@ -109,7 +146,7 @@ def count_benefits(session: Session = Depends(get_session)):
     """
     logger.debug("Solicitação para contar benefícios")
     try:
-        quantidade = session.query(Benefit).count()
+        quantidade = row_count(session, Benefit)
         logger.info(f"Quantidade total de benefícios: {quantidade}")
         return {"quantidade": quantidade}
     except SQLAlchemyError:
@@ -118,15 +155,17 @@ def count_benefits(session: Session = Depends(get_session)):
     
 @router.get("/paginated", response_model=List[Benefit])
 def get_benefit_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     session=Depends(get_session)
 ):
     """
-    Retorna benefícios paginados
+    Retorna benefícios paginados; o total vai no cabeçalho `X-Total-Count`.
     """
     logger.debug(f"Buscando beneficios página {page} com limite {limit}")
     try:
+        response.headers["X-Total-Count"] = str(row_count(session, Benefit))
         offset = (page - 1) * limit
         benefits = session.query(Benefit).offset(offset).limit(limit).all()
         logger.info(f"{len(benefits)} benefícios recuperados na página {page}")
@@ -257,20 +296,26 @@ def get_benefits_by_description(
 
 @router.get("/sorted-by-amount", response_model=List[BenefitRead])
 def get_benefits_sorted_by_amount(
+    request: Request,
     order: str = Query("asc", regex="^(asc|desc)$"),
     session: Session = Depends(get_session)
 ):
     """
     Retorna os benefícios ordenados pelo valor (amount) em ordem crescente ou decrescente.
+    Servido do cache até a próxima escrita em benefícios.
     """
     logger.debug(f"Solicitação para listar benefícios ordenados por amount em ordem: {order}")
-    try:
+
+    def load():
         query = select(Benefit).order_by(
             Benefit.amount.asc() if order == "asc" else Benefit.amount.desc()
         )
         benefits = session.exec(query).all()
         logger.info(f"{len(benefits)} benefícios ordenados por amount retornados")
         return benefits
+
+    try:
+        return cached_response(request, session, List[BenefitRead], [Benefit.__tablename__], load)
     except SQLAlchemyError:
         logger.exception("Erro ao ordenar benefícios por amount")
         raise HTTPException(status_code=500, detail="Erro interno ao ordenar benefícios")
@@ -304,18 +349,40 @@ def get_benefits_by_amount_range(
         raise HTTPException(status_code=500, detail="Erro interno ao buscar benefícios")
     
 @router.get("/benefits/count-by-type")
-def count_benefits_by_type(session: Session = Depends(get_session)):
-    statement = (
-        select(
-            Benefit.type,
-            func.count(Benefit.id).label("count")
+def count_benefits_by_type(request: Request, session: Session = Depends(get_session)):
+    def load():
+        counts = grouped_row_counts(session, Benefit, "type")
+        return [{"type": type, "count": count} for type, count in counts.items()]
+
+    try:
+        # Os contadores só mudam com escritas em benefícios
+        return cached_response(request, session, List[Dict], [Benefit.__tablename__], load)
+    except SQLAlchemyError:
+        logger.exception("Erro ao contar benefícios por tipo")
+        raise HTTPException(status_code=500, detail="Erro interno ao contar benefícios por tipo")
+
+@router.post("/projection")
+def project_benefits(query: BenefitProjectionQuery, session: Session = Depends(get_session)):
+    """
+    Projeta o custo mensal dos benefícios por departamento, atual e com as
+    mudanças hipotéticas do cenário (novo valor, fator, ativação), sem
+    gravar nada.
+    """
+    logger.debug(f"Projeção de benefícios: {query}")
+    try:
+        result = project_benefit_costs(
+            session, [change.dict() for change in query.changes], query.from_month, query.to_month
         )
-        .group_by(Benefit.type)
-    )
-    
-    results = session.exec(statement).all()
-    
-    return [{"type": r[0], "count": r[1]} for r in results]
+    except ProjectionUnavailable as exc:
+        logger.warning(f"Projeção de benefícios indisponível: {exc}")
+        raise HTTPException(status_code=503, detail=str(exc))
+    except ProjectionQueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except SQLAlchemyError:
+        logger.exception("Erro ao carregar a matriz de benefícios")
+        raise HTTPException(status_code=500, detail="Erro interno ao projetar benefícios")
+    logger.info(f"Projeção de benefícios calculada em {result['elapsed_ms']} ms")
+    return result
 
 @router.get("/filtered", response_model=List[BenefitRead])
 def filter_benefits(
@@ -325,10 +392,13 @@ def filter_benefits(
     max_amount: Optional[float] = Query(None, ge=0),
     type: Optional[str] = Query(None),
     active: Optional[bool] = Query(None),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    budget: QueryBudget = Depends(query_budget(get_session))
 ):
     """
     Filtra benefícios por múltiplos atributos com suporte a intervalo de valores.
+    A consulta é interrompida no tempo limite da rota (504) ou se o cliente
+    desconectar.
     
     Parâmetros:
     - name: Busca parcial no nome (case-insensitive)
@@ -364,7 +434,8 @@ def filter_benefits(
         if active is not None:
             query = query.where(Benefit.active == active)
         
-        benefits = session.exec(query).all()
+        with budget.guard():
+            benefits = session.exec(query).all()
         
         if not benefits:
             logger.info("Nenhum benefício encontrado com os filtros especificados")
@@ -376,6 +447,14 @@ def filter_benefits(
         logger.info(f"{len(benefits)} benefícios encontrados com os filtros")
         return benefits
     
+    except QueryTimeout:
+        logger.warning(f"Filtro de benefícios excedeu {budget.timeout_ms} ms")
+        raise HTTPException(
+            status_code=504,
+            detail="A consulta excedeu o tempo limite. Refine os filtros"
+        )
+    except QueryCancelled:
+        raise HTTPException(status_code=499, detail="Requisição cancelada pelo cliente")
     except SQLAlchemyError as e:
         logger.exception(f"Erro ao filtrar benefícios: {str(e)}")
         raise HTTPException(
@@ -385,9 +464,9 @@ def filter_benefits(
 
     
 @router.get("/{benefit_id}", response_model=Benefit)
-def get_benefit(benefit_id: int, session=Depends(get_session)):
+def get_benefit(benefit_id: int, response: Response, session=Depends(get_session)):
     """
-    Obtém um benefício pelo ID.
+    Obtém um benefício pelo ID (com ETag para atualizações condicionais).
     """
     try:
         benefit = session.query(Benefit).filter(Benefit.id == benefit_id).first()
@@ -395,6 +474,7 @@ def get_benefit(benefit_id: int, session=Depends(get_session)):
             logger.warning(f"Benefício com ID {benefit_id} não encontrado.")
             raise HTTPException(status_code=404, detail="Benefício não encontrado")
         logger.debug(f"Benefício recuperado com sucesso: {benefit}")
+        response.headers["ETag"] = etag(benefit.version)
         return benefit
     except SQLAlchemyError:
         logger.exception("Erro ao buscar benefício por ID")
@@ -0,0 +1,41 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.changes import change_to_ndjson, read_changes
+from app.core.db import get_session
+from app.logs.logger import logger
+
+router = APIRouter(prefix="/changes", tags=["Alterações"])
+
+@router.get("/")
+def get_changes(
+    since: int = Query(0, ge=0, description="Último seq já processado pelo cliente"),
+    limit: int = Query(1000, ge=1, le=10000),
+    entity: Optional[str] = Query(None, description="Filtra por tabela (ex.: employee, payroll)"),
+    session = Depends(get_session)
+):
+    """
+    Retorna, em ordem de `seq`, inserts, updates e tombstones (deletes)
+    posteriores a `since`, em NDJSON. O cabeçalho `X-Next-Since` traz o
+    valor a ser usado na próxima chamada.
+
+    Exemplo:
+    - /changes?since=120&limit=500
+    """
+    logger.debug(f"Solicitação de alterações desde {since} (limite {limit}, entidade {entity})")
+    try:
+        changes = read_changes(session, since, limit, entity)
+    except SQLAlchemyError:
+        logger.exception("Erro ao ler o feed de alterações")
+        raise HTTPException(status_code=500, detail="Erro interno ao ler alterações")
+
+    next_since = changes[-1][0] if changes else since
+    logger.info(f"{len(changes)} alterações retornadas desde {since}")
+    return StreamingResponse(
+        (change_to_ndjson(change) for change in changes),
+        media_type="application/x-ndjson",
+        headers={"X-Next-Since": str(next_since)},
+    )
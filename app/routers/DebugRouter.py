@@ -0,0 +1,89 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiler import PROFILER_ENABLED, PROFILER_MAX_SECONDS, ProfilerBusy, profile_app
+from app.core.query_timeouts import query_timeout_stats
+from app.core.response_cache import response_cache
+from app.core.single_flight import single_flight
+from app.core.slow_queries import SLOW_QUERY_THRESHOLD_MS, clear_slow_queries, get_slow_queries
+from app.logs.logger import logger
+
+router = APIRouter(prefix="/debug", tags=["Diagnóstico"])
+
+@router.get("/slow-queries")
+def list_slow_queries(
+    limit: Optional[int] = Query(None, ge=1, description="Quantidade máxima de consultas retornadas"),
+    route: Optional[str] = Query(None, description="Filtra pelo trecho do nome da rota (ex.: /departments)")
+):
+    """
+    Consultas acima de SLOW_QUERY_THRESHOLD_MS, da mais recente para a mais
+    antiga, com os tipos dos parâmetros, rota de origem e plano de execução.
+    """
+    queries = get_slow_queries(limit, route)
+    logger.debug(f"{len(queries)} consultas lentas retornadas")
+    return {"threshold_ms": SLOW_QUERY_THRESHOLD_MS, "queries": queries}
+
+@router.delete("/slow-queries")
+def delete_slow_queries():
+    clear_slow_queries()
+    logger.info("Registro de consultas lentas limpo")
+    return {"message": "Registro de consultas lentas limpo"}
+
+@router.post("/profile")
+def run_profile(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS, description="Duração da amostragem"),
+    interval_ms: Optional[float] = Query(None, ge=1, description="Intervalo entre amostras"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    include_idle: bool = Query(False, description="Inclui amostras fora de rotas"),
+):
+    """
+    Amostra as pilhas do processo durante `seconds` e devolve as pilhas
+    agregadas por rota em formato collapsed (flamegraph) ou um resumo JSON.
+
+    Exemplo:
+    - curl -X POST "/debug/profile?seconds=20" > departments.collapsed
+    """
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiler desabilitado (PROFILER_ENABLED)")
+    logger.info(f"Iniciando profiling por {seconds}s")
+    try:
+        profiler = profile_app(request.app, seconds, interval_ms, include_idle)
+    except ProfilerBusy:
+        raise HTTPException(status_code=409, detail="Já existe um profiling em andamento")
+
+    logger.info(f"Profiling concluído: {profiler.samples} rodadas de amostragem")
+    if format == "json":
+        return profiler.summary()
+    return PlainTextResponse(profiler.collapsed())
+
+@router.get("/single-flight")
+def single_flight_stats():
+    """
+    Por rota coalescida: consultas executadas (líderes), requisições que
+    aproveitaram uma consulta em andamento (seguidoras) e a proporção destas.
+    """
+    return single_flight.stats()
+
+@router.get("/query-timeouts")
+def get_query_timeout_stats():
+    """
+    Por rota com orçamento de consulta: requisições, consultas interrompidas
+    por tempo limite, canceladas por desconexão do cliente e desconexões.
+    """
+    return query_timeout_stats()
+
+@router.get("/response-cache")
+def response_cache_stats():
+    """
+    Entradas, memória ocupada, acertos, faltas e descartes do cache de respostas.
+    """
+    return response_cache.stats()
+
+@router.delete("/response-cache")
+def clear_response_cache():
+    response_cache.clear()
+    logger.info("Cache de respostas limpo")
+    return {"message": "Cache de respostas limpo"}
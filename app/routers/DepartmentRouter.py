@@ -1,10 +1,19 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
 from app.models.Department import Department, DepartmentCreate, DepartmentRead, DepartmentUpdate
+from app.models.DepartmentStats import DepartmentStatsRead
 from app.models.Employee import Employee
-from ..core.db import get_session
+from ..core.changes import DELETE, INSERT, UPDATE, record_change, record_changes
+from ..core.db import execute_returning, get_session
+from ..core.department_stats import (
+    current_reference_month, get_department_stats, move_employee, remove_department
+)
+from ..core.org_chart import refresh_department_closure, refresh_org_closure
+from ..core.row_counts import row_count
+from ..core.response_cache import cached_response
+from ..core.single_flight import coalesced_response
 from ..logs.logger import logger
 
 router = APIRouter(prefix="/departments", tags=["Departamentos"])
@@ -31,7 +40,9 @@ def create_department(department: DepartmentCreate, session=Depends(get_session)
                 raise HTTPException(status_code=404, detail="Manager não encontrado")
             db_department.manager_id = department.manager_id
             # Se necessário, atualize o departamento do gerente
+            move_employee(session, manager.id, manager.department_id, db_department.id)
             manager.department_id = db_department.id
+            record_change(session, manager, UPDATE)
         
         # 3. Se houver employee_ids, associe os employees
         if department.employee_ids:
@@ -41,9 +52,13 @@ def create_department(department: DepartmentCreate, session=Depends(get_session)
                 raise HTTPException(status_code=404, detail="Alguns funcionários não foram encontrados")
             
             for employee in employees:
+                move_employee(session, employee.id, employee.department_id, db_department.id)
                 employee.department_id = db_department.id
+                record_change(session, employee, UPDATE)
         
         # 4. Faça o commit final
+        record_change(session, db_department, INSERT)
+        refresh_department_closure(session, db_department.id)
         session.commit()
         session.refresh(db_department)
         logger.info(f"Departamento criado com sucesso: {db_department}")
@@ -106,12 +121,28 @@ def update_department(department_id: int, department: DepartmentUpdate, session=
             db_department.manager = None
         
         # Atualizar employees se fornecido
+        removed_ids = []
         if department.employee_ids is not None:
             employees = session.query(Employee).filter(Employee.id.in_(department.employee_ids)).all()
             if len(employees) != len(department.employee_ids):
                 raise HTTPException(status_code=404, detail="Alguns funcionários não foram encontrados")
+            new_ids = {employee.id for employee in employees}
+            for employee in db_department.employees:
+                if employee.id not in new_ids:
+                    removed_ids.append(employee.id)
+                    move_employee(session, employee.id, department_id, None)
+                    employee.department_id = None
+                    record_change(session, employee, UPDATE)
+            for employee in employees:
+                if employee.department_id != department_id:
+                    move_employee(session, employee.id, employee.department_id, department_id)
+                    employee.department_id = department_id
+                    record_change(session, employee, UPDATE)
             db_department.employees = employees
         
+        record_change(session, db_department, UPDATE)
+        if "manager_id" in update_data or department.employee_ids is not None:
+            refresh_department_closure(session, department_id, removed_ids)
         session.commit()
         
         # Recarrega o departamento com todas as relações atualizadas
@@ -135,8 +166,25 @@ def delete_department(department_id: int, session=Depends(get_session)):
     """
     logger.debug(f"Tentando deletar departamento com ID {department_id}")
     try:
-        department = get_department(department_id, session)
-        session.delete(department)
+        # Os funcionários do departamento ficam sem departamento
+        employee = Employee.__table__
+        employees = execute_returning(
+            session,
+            employee.update().where(employee.c.department_id == department_id)
+            .values(department_id=None, content_hash=None, version=employee.c.version + 1),
+            list(employee.c),
+        )
+        table = Department.__table__
+        deleted = execute_returning(session, table.delete().where(table.c.id == department_id), [table.c.id])
+        if not deleted:
+            session.rollback()
+            logger.warning(f"Departamento com ID {department_id} não encontrado.")
+            raise HTTPException(status_code=404, detail="Departamento não encontrado")
+
+        remove_department(session, department_id)
+        record_changes(session, Employee.__tablename__, [(row["id"], UPDATE, row) for row in employees])
+        record_changes(session, Department.__tablename__, [(department_id, DELETE, None)])
+        refresh_org_closure(session, [row["id"] for row in employees])
         session.commit()
         logger.info(f"Departamento deletado com sucesso: ID {department_id}")
         return {"message": "Departamento deletado com sucesso"}
@@ -146,18 +194,26 @@ def delete_department(department_id: int, session=Depends(get_session)):
         raise HTTPException(status_code=500, detail="Erro interno ao deletar departamento")
 
 @router.get("/", response_model=list[DepartmentRead])
-def get_all_departments(session=Depends(get_session)):
+def get_all_departments(request: Request, session=Depends(get_session)):
     """
-    Obtém todos os departamentos.
+    Obtém todos os departamentos. A resposta fica em cache até a próxima
+    escrita em departamentos ou funcionários; faltas simultâneas
+    compartilham a mesma consulta.
     """
     logger.debug("Solicitação para listar todos os departamentos")
-    try:
+
+    def load():
         departments = session.query(Department).options(
             joinedload(Department.manager),
             joinedload(Department.employees)
         ).all()
         logger.info(f"{len(departments)} departamentos encontrados.")
         return departments
+
+    try:
+        return cached_response(
+            request, session, list[DepartmentRead], [Department.__tablename__, Employee.__tablename__], load
+        )
     except SQLAlchemyError:
         logger.exception("Erro ao listar departamentos")
         raise HTTPException(status_code=500, detail="Erro interno ao listar departamentos")
@@ -298,15 +354,18 @@ def get_departments_by_manager(
 
 @router.get("/paginated", response_model=List[DepartmentRead])
 def get_departments_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     session=Depends(get_session)
 ):
     """
-    Retorna departamentos paginados com informações de manager e employees
+    Retorna departamentos paginados com informações de manager e employees;
+    o total vai no cabeçalho `X-Total-Count`.
     """
     logger.debug(f"Buscando departamentos página {page} com limite {limit}")
     try:
+        response.headers["X-Total-Count"] = str(row_count(session, Department))
         offset = (page - 1) * limit
         departments = session.query(Department).options(
             joinedload(Department.manager),
@@ -326,13 +385,32 @@ def count_departments(session=Depends(get_session)):
     """
     logger.debug("Solicitação para contar departamentos")
     try:
-        quantidade = session.query(Department).count()
+        quantidade = row_count(session, Department)
         logger.info(f"Quantidade total de departamentos: {quantidade}")
         return {"quantidade": quantidade}
     except SQLAlchemyError:
         logger.exception("Erro ao contar departamentos")
         raise HTTPException(status_code=500, detail="Erro interno ao contar departamentos")
 
+@router.get("/stats", response_model=List[DepartmentStatsRead])
+def get_departments_stats(
+    reference_month: Optional[str] = Query(None, description="Mês de referência (AAAA-MM); padrão: mês atual"),
+    session=Depends(get_session)
+):
+    """
+    Retorna quantidade de funcionários, gerente e totais bruto/líquido da folha
+    de cada departamento a partir dos contadores pré-calculados.
+    """
+    reference_month = reference_month or current_reference_month()
+    logger.debug(f"Buscando estatísticas dos departamentos para {reference_month}")
+    try:
+        stats = get_department_stats(session, reference_month)
+        logger.info(f"Estatísticas de {len(stats)} departamentos recuperadas")
+        return stats
+    except SQLAlchemyError:
+        logger.exception("Erro ao buscar estatísticas dos departamentos")
+        raise HTTPException(status_code=500, detail="Erro interno ao buscar estatísticas dos departamentos")
+
 @router.get("/partial", response_model=List[DepartmentRead])
 def get_departments_partial_name(
     name: str,
@@ -396,23 +474,28 @@ def get_departments_by_employees(
         raise HTTPException(status_code=500, detail="Erro interno ao buscar departamentos")
 
 @router.get("/{department_id}", response_model=DepartmentRead)
-def get_department_by_id(department_id: int, session=Depends(get_session)):
+def get_department_by_id(department_id: int, request: Request, session=Depends(get_session)):
     """
-    Busca um departamento pelo ID com todas as relações carregadas
+    Busca um departamento pelo ID com todas as relações carregadas.
+    Buscas simultâneas pelo mesmo ID compartilham a mesma consulta.
     """
     logger.debug(f"Buscando departamento com ID {department_id}")
-    try:
+
+    def load():
         department = session.query(Department).options(
             joinedload(Department.manager),
             joinedload(Department.employees)
         ).filter(Department.id == department_id).first()
-        
+
         if not department:
             logger.warning(f"Departamento com ID {department_id} não encontrado")
             raise HTTPException(status_code=404, detail="Departamento não encontrado")
-        
+
         logger.info(f"Departamento encontrado por ID: {department_id}")
         return department
+
+    try:
+        return coalesced_response(request, session, DepartmentRead, load)
     except SQLAlchemyError:
         logger.exception(f"Erro ao buscar departamento por ID: {department_id}")
         raise HTTPException(status_code=500, detail="Erro interno ao buscar departamento")
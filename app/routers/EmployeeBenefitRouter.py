@@ -1,11 +1,14 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlmodel import select, and_
 
-from app.core.db import get_session
+from app.core.changes import DELETE, INSERT, UPDATE, record_change, record_changes
+from app.core.db import execute_returning, get_session
+from app.core.locking import ExpectedVersion, compare_and_swap, etag
+from app.core.row_counts import row_count
 from app.logs.logger import logger
 from app.models import EmployeeBenefit, Employee, Benefit
 from app.models.Benefit import BenefitRead
@@ -25,6 +28,7 @@ def create_employee_benefit(
 
         db_employee_benefit = EmployeeBenefit(**employee_benefit.dict())
         session.add(db_employee_benefit)
+        record_change(session, db_employee_benefit, INSERT)
         session.commit()
         session.refresh(db_employee_benefit)
         logger.info(f"Benefício dos Funcionários criada com sucesso: {db_employee_benefit}")
@@ -52,19 +56,28 @@ def get_all_employee_benefits(
 def update_employee_benefit(
     employee_benefit_id: int,
     employee_benefit: EmployeeBenefitUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     session = Depends(get_session)
 ):
     logger.debug(f"Solicitação para atualizar Benefício dos Funcionários: {employee_benefit_id}")
 
-    db_employee_benefit = session.query(EmployeeBenefit).filter(EmployeeBenefit.id == employee_benefit_id).first()
-    validate_employee_benefit(employee_benefit_id, employee_benefit, session)
-    update_data = employee_benefit.dict(exclude_unset=True)
-
-    for key, value in update_data.items():
-        setattr(db_employee_benefit, key, value)
+    expected = ExpectedVersion(if_match, employee_benefit.version)
+    validate_employee_benefit(None, employee_benefit, session)
+    update_data = employee_benefit.dict(exclude_unset=True, exclude={"version"})
+    try:
+        db_employee_benefit = compare_and_swap(
+            session, EmployeeBenefit, employee_benefit_id, update_data, expected,
+            not_found="Benefícios dos Funcionários não encontrado"
+        )
+        record_changes(session, EmployeeBenefit.__tablename__, [(employee_benefit_id, UPDATE, db_employee_benefit)])
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception(f"Erro ao atualizar Benefício dos Funcionários")
+        raise HTTPException(status_code=500, detail="Erro interno ao atualizar Benefício dos Funcionários")
 
-    session.commit()
-    session.refresh(db_employee_benefit)
+    response.headers["ETag"] = etag(db_employee_benefit["version"])
     logger.info(f"FBenefício dos Funcionários atualizado com sucesso: {employee_benefit_id}")
     return db_employee_benefit
 
@@ -76,9 +89,12 @@ def delete_employee_benefit(
     logger.debug(f"Solicitação para deletar Benefício dos Funcionários: {employee_benefit_id}")
 
     try:
-        employee_benefit = session.query(EmployeeBenefit).filter(EmployeeBenefit.id == employee_benefit_id).first()
-        validate_employee_benefit(employee_benefit_id, None, session)
-        session.delete(employee_benefit)
+        table = EmployeeBenefit.__table__
+        deleted = execute_returning(session, table.delete().where(table.c.id == employee_benefit_id), [table.c.id])
+        if not deleted:
+            logger.warning(f"Benefício dos Funcionário com ID {employee_benefit_id} não encontrado")
+            raise HTTPException(status_code=404, detail="Benefícios dos Funcionários não encontrado")
+        record_changes(session, EmployeeBenefit.__tablename__, [(employee_benefit_id, DELETE, None)])
         session.commit()
         logger.info(f"Benefício do Funcionário deletado com sucesso: {employee_benefit_id}")
         return {"message": "Benefício do Funcionário deletado com sucesso"}
@@ -95,7 +111,7 @@ def count_employee_benefits(
     logger.debug("Solicitação para contar os Benefícios dos Funcionários")
 
     try:
-        count = session.query(EmployeeBenefit).count()
+        count = row_count(session, EmployeeBenefit)
         logger.info(f"Quantidade total de Benefícios dos Funcionários: {count}")
         return {"quantidade": count}
     except SQLAlchemyError:
@@ -104,12 +120,14 @@ def count_employee_benefits(
 
 @router.get("/paginated")
 def get_employee_benefits_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     session = Depends(get_session)
 ):
     logger.debug("Solicitação para buscar Benefícios dos Funcionários")
     try:
+        response.headers["X-Total-Count"] = str(row_count(session, EmployeeBenefit))
         offset = (page - 1) * limit
         employee_benefits = session.query(EmployeeBenefit).offset(offset).limit(limit).all()
         logger.info(f"{len(employee_benefits)} Benefícios dos Funcionários recuperados na página {page}")
@@ -174,6 +192,7 @@ def get_employees_by_benefit_id(
 @router.get("/{employee_benefit_id}", response_model=EmployeeBenefitRead)
 def get_employee_benefit(
     employee_benefit_id: int,
+    response: Response,
     session = Depends(get_session)
 ):
     logger.debug(f"Solicitação para recuperar Benefício do Funcionário: {employee_benefit_id}")
@@ -181,6 +200,7 @@ def get_employee_benefit(
         db_employee_benefit = session.query(EmployeeBenefit).filter(EmployeeBenefit.id == employee_benefit_id).first()
         validate_employee_benefit(employee_benefit_id, None, session)
         logger.info(f"Benefícios dos Funcionários recuperado: {db_employee_benefit}")
+        response.headers["ETag"] = etag(db_employee_benefit.version)
         return db_employee_benefit
     except SQLAlchemyError:
         session.rollback()
@@ -1,9 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
-from app.models.Employee import Employee, EmployeeCreate, EmployeeRead, EmployeeUpdate
-from ..core.db import get_session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlmodel import select
+from typing import Dict, List, Optional
+from app.models.Department import Department
+from app.models.Employee import Employee, EmployeeCreate, EmployeeRead, EmployeeUpdate, EmployeeUpsert, OrgChartEntry
+from app.models.EmployeeBenefit import EmployeeBenefit
+from app.models.Payroll import Payroll
+from ..core.changes import DELETE, INSERT, UPDATE, record_change, record_changes
+from ..core.cpf import CPF_LENGTH, is_valid_cpf, normalize_cpf
+from ..core.db import execute_returning, get_session
+from ..core.dedupe import dedupe_report
+from ..core.lean import lean_json_response, read_columns
+from ..core.department_stats import adjust_headcount, move_employee, subtract_payrolls
+from ..core.locking import ExpectedVersion, compare_and_swap, etag, fetch_current
+from ..core.org_chart import ORG_MAX_DEPTH, get_chain, get_reports, refresh_org_closure
+from ..core.payroll_archive import has_archived_payrolls
+from ..core.query_timeouts import QueryBudget, QueryCancelled, QueryTimeout, query_budget
+from ..core.row_counts import row_count
+from ..core.upsert import EMPLOYEE_HASH_COLUMNS, UpsertUnsupported, content_hash, fetch_existing, upsert_rows
 from ..logs.logger import logger
 
 router = APIRouter(prefix="/employees", tags=["Funcionários"])
@@ -11,9 +26,10 @@ router = APIRouter(prefix="/employees", tags=["Funcionários"])
 @router.get("/", response_model=List[EmployeeRead])
 def get_all_employees(session: Session = Depends(get_session)):
     try:
-        employees = session.query(Employee).all()
+        # Caminho enxuto: colunas selecionadas e serializadas em streaming
+        columns = read_columns(Employee, EmployeeRead)
         logger.debug("Recuperando todos os funcionários.")
-        return employees
+        return lean_json_response(session, select(*columns).order_by(Employee.id), [column.name for column in columns])
     except SQLAlchemyError:
         logger.exception("Erro ao obter todos os funcionários.")
         raise HTTPException(status_code=500, detail="Erro ao obter funcionários")
@@ -24,15 +40,140 @@ def create_employee(employee: EmployeeCreate, session: Session = Depends(get_ses
     db_employee = Employee(**employee.dict())
     try:
         session.add(db_employee)
+        adjust_headcount(session, db_employee.department_id, 1)
+        record_change(session, db_employee, INSERT)
+        refresh_org_closure(session, [db_employee.id])
         session.commit()
         session.refresh(db_employee)
         logger.info(f"Funcionário criado com sucesso: {db_employee}")
         return db_employee
+    except IntegrityError:
+        session.rollback()
+        logger.warning(f"Funcionário com CPF {employee.cpf} já cadastrado")
+        raise HTTPException(status_code=409, detail="CPF já cadastrado")
     except SQLAlchemyError:
         session.rollback()
         logger.exception("Erro ao criar funcionário")
         raise HTTPException(status_code=500, detail="Erro ao criar funcionário")
 
+def upsert_employees(session: Session, employees: List[Dict]) -> Dict[str, int]:
+    """
+    Insere ou atualiza funcionários pelo CPF normalizado, ignorando os que não mudaram.
+    """
+    # Se o mesmo CPF vier repetido (mesmo com outra formatação), a última ocorrência vence
+    rows = {}
+    for employee in employees:
+        row = {column: employee.get(column) for column in EMPLOYEE_HASH_COLUMNS}
+        row["content_hash"] = content_hash(row, EMPLOYEE_HASH_COLUMNS)
+        row["cpf_normalized"] = normalize_cpf(row["cpf"])
+        rows[row["cpf_normalized"]] = row
+
+    existing = fetch_existing(session, Employee, ["cpf_normalized"], [(cpf,) for cpf in rows], ["id", "department_id", "content_hash"])
+    changed = [
+        row for cpf, row in rows.items()
+        if existing.get((cpf,), {}).get("content_hash") != row["content_hash"]
+    ]
+    written = upsert_rows(session, Employee, changed, ["cpf_normalized"])
+
+    inserted = 0
+    changes = []
+    reassigned = []
+    for row in written:
+        previous = existing.get((row["cpf_normalized"],))
+        department_id = rows[row["cpf_normalized"]]["department_id"]
+        changes.append((row["id"], INSERT if previous is None else UPDATE, {"id": row["id"], "version": row["version"], **rows[row["cpf_normalized"]]}))
+        if previous is None:
+            inserted += 1
+            adjust_headcount(session, department_id, 1)
+            reassigned.append(row["id"])
+        else:
+            move_employee(session, row["id"], previous["department_id"], department_id)
+            if previous["department_id"] != department_id:
+                reassigned.append(row["id"])
+    record_changes(session, Employee.__tablename__, changes)
+    refresh_org_closure(session, reassigned)
+    return {"inserted": inserted, "updated": len(written) - inserted, "unchanged": len(rows) - len(written)}
+
+@router.put("/by-cpf/{cpf}", response_model=EmployeeRead)
+def upsert_employee_by_cpf(cpf: str, employee: EmployeeUpsert, session: Session = Depends(get_session)):
+    """
+    Cria ou atualiza (idempotente) o funcionário identificado pelo CPF.
+    """
+    logger.debug(f"Upsert de funcionário com CPF {cpf}")
+    if not is_valid_cpf(cpf):
+        raise HTTPException(status_code=422, detail="CPF inválido")
+    try:
+        summary = upsert_employees(session, [{**employee.dict(), "cpf": cpf}])
+        session.commit()
+        logger.info(f"Upsert do funcionário com CPF {cpf} concluído: {summary}")
+        return session.query(Employee).filter(Employee.cpf_normalized == normalize_cpf(cpf)).first()
+    except UpsertUnsupported as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=501, detail=str(e))
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception(f"Erro no upsert do funcionário com CPF {cpf}")
+        raise HTTPException(status_code=500, detail="Erro ao salvar funcionário")
+
+@router.put("/bulk")
+def upsert_employees_bulk(employees: List[EmployeeCreate], session: Session = Depends(get_session)):
+    """
+    Upsert em lote pelo CPF. Retorna quantos foram inseridos, atualizados e
+    quantos já estavam iguais no banco.
+    """
+    logger.debug(f"Upsert em lote de {len(employees)} funcionários")
+    try:
+        summary = upsert_employees(session, [employee.dict() for employee in employees])
+        session.commit()
+        logger.info(f"Upsert em lote de funcionários concluído: {summary}")
+        return summary
+    except UpsertUnsupported as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=501, detail=str(e))
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception("Erro no upsert em lote de funcionários")
+        raise HTTPException(status_code=500, detail="Erro ao salvar funcionários")
+
+@router.get("/by-cpf/{cpf}", response_model=EmployeeRead)
+def read_employee_by_cpf(cpf: str, session: Session = Depends(get_session)):
+    """
+    Busca exata pelo CPF, com ou sem pontuação (consulta pelo índice único
+    do CPF normalizado).
+    """
+    if not is_valid_cpf(cpf):
+        raise HTTPException(status_code=422, detail="CPF inválido")
+    try:
+        columns = read_columns(Employee, EmployeeRead)
+        employee = session.execute(
+            select(*columns).where(Employee.cpf_normalized == normalize_cpf(cpf))
+        ).mappings().first()
+    except SQLAlchemyError:
+        logger.exception(f"Erro ao buscar funcionário com CPF {cpf}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar funcionário")
+    if employee is None:
+        logger.warning(f"Funcionário com CPF {cpf} não encontrado.")
+        raise HTTPException(status_code=404, detail="Funcionário não encontrado")
+    return employee
+
+@router.post("/dedupe-report")
+def report_duplicate_employees(cpfs: List[str], session: Session = Depends(get_session)):
+    """
+    Confere um lote de CPFs antes da carga: inválidos, repetidos no lote e já
+    cadastrados (com o ID), sem gravar nada.
+    """
+    logger.debug(f"Relatório de duplicados para {len(cpfs)} CPFs")
+    try:
+        report = dedupe_report(session, cpfs)
+    except SQLAlchemyError:
+        logger.exception("Erro ao gerar relatório de duplicados")
+        raise HTTPException(status_code=500, detail="Erro ao gerar relatório de duplicados")
+    logger.info(
+        f"Relatório de duplicados: {len(report['invalid'])} inválidos, {len(report['duplicated'])} repetidos, "
+        f"{len(report['existing'])} já cadastrados, {report['new']} novos"
+    )
+    return report
+
 def get_employee(employee_id: int, session: Session) -> Employee:
     employee = session.query(Employee).filter(Employee.id == employee_id).first()
     if not employee:
@@ -41,25 +182,88 @@ def get_employee(employee_id: int, session: Session) -> Employee:
     return employee
 
 @router.put("/{employee_id}", response_model=EmployeeRead)
-def update_employee(employee_id: int, update: EmployeeUpdate, session: Session = Depends(get_session)):
-    db_employee = get_employee(employee_id, session)
-    for key, value in update.dict(exclude_unset=True).items():
-        setattr(db_employee, key, value)
+def update_employee(
+    employee_id: int,
+    update: EmployeeUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    session: Session = Depends(get_session)
+):
+    """
+    Atualiza um funcionário. Envie `If-Match` (ETag) ou `version` no corpo
+    para evitar sobrescrever alterações concorrentes (conflito: 412 / 409).
+    """
+    expected = ExpectedVersion(if_match, update.version)
+    update_data = update.dict(exclude_unset=True, exclude={"version"})
+    if "cpf" in update_data:
+        update_data["cpf_normalized"] = normalize_cpf(update_data["cpf"])
     try:
+        # Os valores antigos só são lidos quando a troca afeta os contadores
+        current = None
+        if "department_id" in update_data:
+            current = fetch_current(session, Employee, employee_id, "department_id", not_found="Funcionário não encontrado")
+        # O content_hash deixa de valer; o próximo upsert o recalcula
+        db_employee = compare_and_swap(
+            session, Employee, employee_id, {**update_data, "content_hash": None}, expected, current,
+            not_found="Funcionário não encontrado"
+        )
+        if current is not None:
+            move_employee(session, employee_id, current["department_id"], db_employee["department_id"])
+            if current["department_id"] != db_employee["department_id"]:
+                refresh_org_closure(session, [employee_id])
+        record_changes(session, Employee.__tablename__, [(employee_id, UPDATE, db_employee)])
         session.commit()
-        session.refresh(db_employee)
-        logger.info(f"Funcionário ID {employee_id} atualizado com sucesso.")
-        return db_employee
+    except IntegrityError:
+        session.rollback()
+        logger.warning(f"CPF {update.cpf} já cadastrado para outro funcionário")
+        raise HTTPException(status_code=409, detail="CPF já cadastrado")
     except SQLAlchemyError:
         session.rollback()
         logger.exception(f"Erro ao atualizar funcionário ID {employee_id}")
         raise HTTPException(status_code=500, detail="Erro ao atualizar funcionário")
 
+    response.headers["ETag"] = etag(db_employee["version"])
+    logger.info(f"Funcionário ID {employee_id} atualizado com sucesso.")
+    return db_employee
+
 @router.delete("/{employee_id}")
 def delete_employee(employee_id: int, session: Session = Depends(get_session)):
-    db_employee = get_employee(employee_id, session)
     try:
-        session.delete(db_employee)
+        # O arquivo da folha é fechado: o histórico do funcionário não pode sumir
+        if has_archived_payrolls(session, employee_id):
+            logger.warning(f"Funcionário ID {employee_id} tem folhas arquivadas e não pode ser removido.")
+            raise HTTPException(status_code=409, detail="Funcionário com folhas de pagamento arquivadas não pode ser removido")
+        # Folhas e concessões de benefício saem junto (employee_id não aceita NULL nessas tabelas)
+        payroll = Payroll.__table__
+        payrolls = execute_returning(
+            session, payroll.delete().where(payroll.c.employee_id == employee_id),
+            [payroll.c.id, payroll.c.reference_month, payroll.c.gross_salary, payroll.c.net_salary]
+        )
+        employee_benefit = EmployeeBenefit.__table__
+        assignments = execute_returning(
+            session, employee_benefit.delete().where(employee_benefit.c.employee_id == employee_id), [employee_benefit.c.id]
+        )
+        # Departamentos gerenciados ficam sem gerente (o ID poderia ser reaproveitado)
+        department = Department.__table__
+        managed = execute_returning(
+            session, department.update().where(department.c.manager_id == employee_id).values(manager_id=None),
+            list(department.c)
+        )
+        table = Employee.__table__
+        deleted = execute_returning(session, table.delete().where(table.c.id == employee_id), [table.c.department_id])
+        if not deleted:
+            session.rollback()
+            logger.warning(f"Funcionário com ID {employee_id} não encontrado.")
+            raise HTTPException(status_code=404, detail="Funcionário não encontrado")
+
+        department_id = deleted[0]["department_id"]
+        adjust_headcount(session, department_id, -1)
+        subtract_payrolls(session, department_id, payrolls)
+        record_changes(session, Payroll.__tablename__, [(row["id"], DELETE, None) for row in payrolls])
+        record_changes(session, EmployeeBenefit.__tablename__, [(row["id"], DELETE, None) for row in assignments])
+        record_changes(session, Department.__tablename__, [(row["id"], UPDATE, row) for row in managed])
+        record_changes(session, Employee.__tablename__, [(employee_id, DELETE, None)])
+        refresh_org_closure(session, [employee_id])
         session.commit()
         logger.info(f"Funcionário ID {employee_id} deletado com sucesso.")
         return {"message": "Funcionário deletado com sucesso"}
@@ -82,7 +286,7 @@ def count_employees(session: Session = Depends(get_session)):
     Retorna a quantidade total de funcionários cadastrados.
     """
     try:
-        total = session.query(Employee).count()
+        total = row_count(session, Employee)
         logger.info(f"Quantidade total de funcionários: {total}")
         return {"quantidade": total}
     except SQLAlchemyError:
@@ -130,15 +334,17 @@ def search_employees(name: Optional[str] = None, position: Optional[str] = None,
 
 @router.get("/paginated", response_model=List[Employee])
 def get_employee_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     session=Depends(get_session)
 ):
     """
-    Retorna departamentos funcionários
+    Retorna funcionários paginados; o total vai no cabeçalho `X-Total-Count`.
     """
     logger.debug(f"Buscando funcionários página {page} com limite {limit}")
     try:
+        response.headers["X-Total-Count"] = str(row_count(session, Employee))
         offset = (page - 1) * limit
         employes = session.query(Employee).offset(offset).limit(limit).all()
         logger.info(f"{len(employes)} funcionários recuperados na página {page}")
@@ -155,15 +361,18 @@ def filter_employees(
     min_admission_date: Optional[str] = Query(None, description="Data mínima de admissão (AAAA-MM-DD)"),
     max_admission_date: Optional[str] = Query(None, description="Data máxima de admissão (AAAA-MM-DD)"),
     department_id: Optional[int] = Query(None, description="ID do departamento"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    budget: QueryBudget = Depends(query_budget(get_session))
 ):
     """
     Filtra funcionários por múltiplos atributos com suporte a intervalo de datas.
+    A consulta é interrompida no tempo limite da rota (504) ou se o cliente
+    desconectar.
     
     Parâmetros:
     - name: Busca parcial no nome
     - position: Busca parcial no cargo
-    - cpf: Busca parcial no CPF
+    - cpf: CPF completo (busca exata pelo índice) ou parcial, com ou sem pontuação
     - min_admission_date: Data mínima de admissão (inclusive)
     - max_admission_date: Data máxima de admissão (inclusive)
     - department_id: ID exato do departamento
@@ -186,7 +395,13 @@ def filter_employees(
         if position:
             query = query.filter(Employee.position.ilike(f"%{position}%"))
         if cpf:
-            query = query.filter(Employee.cpf.ilike(f"%{cpf}%"))
+            digits = normalize_cpf(cpf)
+            if len(digits) == CPF_LENGTH:
+                query = query.filter(Employee.cpf_normalized == digits)
+            elif digits:
+                query = query.filter(Employee.cpf_normalized.contains(digits))
+            else:
+                query = query.filter(Employee.cpf.ilike(f"%{cpf}%"))
         if min_admission_date:
             query = query.filter(Employee.admission_date >= min_admission_date)
         if max_admission_date:
@@ -194,7 +409,8 @@ def filter_employees(
         if department_id is not None:
             query = query.filter(Employee.department_id == department_id)
         
-        employees = query.all()
+        with budget.guard():
+            employees = query.all()
         
         if not employees:
             logger.info("Nenhum funcionário encontrado com os filtros especificados")
@@ -212,6 +428,14 @@ def filter_employees(
             status_code=400,
             detail="Formato de data inválido. Use AAAA-MM-DD"
         )
+    except QueryTimeout:
+        logger.warning(f"Filtro de funcionários excedeu {budget.timeout_ms} ms")
+        raise HTTPException(
+            status_code=504,
+            detail="A consulta excedeu o tempo limite. Refine os filtros"
+        )
+    except QueryCancelled:
+        raise HTTPException(status_code=499, detail="Requisição cancelada pelo cliente")
     except SQLAlchemyError as e:
         logger.exception(f"Erro ao filtrar funcionários: {str(e)}")
         raise HTTPException(
@@ -220,9 +444,41 @@ def filter_employees(
         )
 
 @router.get("/{employee_id}", response_model=EmployeeRead)
-def read_employee(employee_id: int, session: Session = Depends(get_session)):
+def read_employee(employee_id: int, response: Response, session: Session = Depends(get_session)):
     employee = session.query(Employee).filter(Employee.id == employee_id).first()
     if not employee:
         logger.warning(f"Funcionário com ID {employee_id} não encontrado.")
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
-    return employee
\ No newline at end of file
+    response.headers["ETag"] = etag(employee.version)
+    return employee
+
+@router.get("/{employee_id}/reports", response_model=List[OrgChartEntry])
+def get_employee_reports(
+    employee_id: int,
+    depth: Optional[int] = Query(None, ge=1, le=ORG_MAX_DEPTH, description="Níveis abaixo do funcionário (padrão: todos)"),
+    session: Session = Depends(get_session)
+):
+    """
+    Subordinados diretos e indiretos: funcionários dos departamentos que o
+    funcionário gerencia, e assim por diante. `depth` indica o nível de cada um.
+    """
+    get_employee(employee_id, session)
+    try:
+        reports = get_reports(session, employee_id, depth)
+        logger.info(f"{len(reports)} subordinados encontrados para o funcionário ID {employee_id}")
+        return reports
+    except SQLAlchemyError:
+        logger.exception(f"Erro ao buscar subordinados do funcionário ID {employee_id}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar subordinados")
+
+@router.get("/{employee_id}/chain", response_model=List[OrgChartEntry])
+def get_employee_chain(employee_id: int, session: Session = Depends(get_session)):
+    """
+    Cadeia de gerentes acima do funcionário, do gerente imediato ao topo.
+    """
+    get_employee(employee_id, session)
+    try:
+        return get_chain(session, employee_id)
+    except SQLAlchemyError:
+        logger.exception(f"Erro ao buscar a cadeia de gerentes do funcionário ID {employee_id}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar a cadeia de gerentes")
@@ -0,0 +1,103 @@
+import asyncio
+import json
+from typing import Mapping, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.events import EVENTS_KEEPALIVE_SECONDS, Subscriber, TooManySubscribers, broker
+from app.core.tenancy import InvalidTenant, resolve_tenant
+from app.logs.logger import logger
+
+router = APIRouter(prefix="/events", tags=["Eventos"])
+
+def _subscribe(headers: Mapping[str, str], entity: Optional[str]) -> Subscriber:
+    entities = [name.strip() for name in entity.split(",") if name.strip()] if entity else None
+    return broker.subscribe(resolve_tenant(headers), entities)
+
+def _sse_message(message: dict) -> bytes:
+    event_id = f"id: {message['id']}\n" if "id" in message else ""
+    return f"{event_id}event: {message['type']}\ndata: {json.dumps(message, default=str)}\n\n".encode("utf-8")
+
+async def _sse_stream(subscriber: Subscriber):
+    try:
+        while True:
+            message = await subscriber.next(EVENTS_KEEPALIVE_SECONDS)
+            # Comentário SSE: mantém a conexão viva em proxies sem gerar evento
+            yield b": keepalive\n\n" if message is None else _sse_message(message)
+    finally:
+        broker.unsubscribe(subscriber)
+        logger.debug("Conexão SSE de eventos encerrada")
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    entity: Optional[str] = Query(None, description="Tabelas de interesse, separadas por vírgula (ex.: employee,payroll)"),
+):
+    """
+    Stream SSE com os inserts, updates e deletes confirmados, em vez de
+    consultar `/count` e listagens periodicamente. Cada evento traz tabela,
+    ID, operação e horário; `overflow` avisa que eventos foram descartados
+    porque o cliente não acompanhou o ritmo.
+
+    Exemplo:
+    - curl -N "/events?entity=employee,payroll"
+    """
+    try:
+        subscriber = _subscribe(request.headers, entity)
+    except InvalidTenant as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TooManySubscribers:
+        logger.warning("Limite de conexões de eventos atingido")
+        raise HTTPException(status_code=503, detail="Muitas conexões de eventos, tente novamente")
+    logger.debug(f"Nova conexão SSE de eventos (entidades: {entity or 'todas'})")
+    return StreamingResponse(
+        _sse_stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _wait_disconnect(websocket: WebSocket):
+    # Mensagens do cliente são ignoradas; só interessa saber quando ele sai
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, entity: Optional[str] = None):
+    """
+    Os mesmos eventos de `/events`, como mensagens JSON num WebSocket.
+    """
+    try:
+        subscriber = _subscribe(websocket.headers, entity)
+    except InvalidTenant:
+        await websocket.close(code=1008)
+        return
+    except TooManySubscribers:
+        logger.warning("Limite de conexões de eventos atingido")
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+    disconnected = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        while True:
+            message = asyncio.create_task(subscriber.next(EVENTS_KEEPALIVE_SECONDS))
+            await asyncio.wait({disconnected, message}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                message.cancel()
+                break
+            await websocket.send_json(message.result() or {"type": "keepalive"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(subscriber)
+        logger.debug("Conexão WebSocket de eventos encerrada")
+
+@router.get("/stats")
+def get_event_stats():
+    """
+    Conexões abertas e eventos publicados, entregues e descartados (fila cheia).
+    """
+    return broker.stats()
@@ -1,12 +1,27 @@
-from typing import List, Optional
+import csv
+import io
+import json
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.exc import SQLAlchemyError
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlmodel import Session, select, and_
-from app.core.db import get_session
+from app.core.changes import DELETE, INSERT, UPDATE, record_change, record_changes
+from app.core.db import execute_returning, get_session
+from app.core.lean import lean_json_response, read_columns
+from app.core.department_stats import (
+    adjust_payroll_totals, employee_department_id, remove_reference_month, subtract_payrolls
+)
+from app.core.locking import ExpectedVersion, compare_and_swap, etag, fetch_current
+from app.core.payroll_archive import archive_months, history_summary, select_payrolls
+from app.core.payroll_audit import AuditUnavailable, audit_payrolls
+from app.core.row_counts import row_count
+from app.core.upsert import PAYROLL_HASH_COLUMNS, UpsertUnsupported, content_hash, fetch_existing, upsert_rows
 from app.logs.logger import logger
 from app.models import Employee
-from app.models.Payroll import PayrollCreate, PayrollRead, Payroll, PayrollUpdate
+from app.models.Payroll import PayrollCreate, PayrollRead, Payroll, PayrollUpdate, PayrollUpsert
+from app.models.PayrollArchive import PayrollArchiveMonth, PayrollHistoryRead
 
 router = APIRouter(prefix="/pay_rolls", tags=["Folhas de Pagamento"])
 
@@ -21,13 +36,23 @@ def create_payroll(
         if not employee:
             logger.warning(f"Funcionário com ID {payroll.employee_id} não encontrada")
             raise HTTPException(status_code=404, detail="Funcionário não encontrado")
+        reject_closed_months(session, [payroll.reference_month])
 
         db_payroll = Payroll(**payroll.dict())
         session.add(db_payroll)
+        adjust_payroll_totals(
+            session, employee.department_id, db_payroll.reference_month,
+            1, db_payroll.gross_salary, db_payroll.net_salary
+        )
+        record_change(session, db_payroll, INSERT)
         session.commit()
         session.refresh(db_payroll)
         logger.info(f"Folha de Pagamento criada com sucesso: {payroll}")
         return db_payroll
+    except IntegrityError:
+        session.rollback()
+        logger.warning(f"Folha de pagamento de {payroll.reference_month} já existe para o funcionário {payroll.employee_id}")
+        raise HTTPException(status_code=409, detail="Folha de pagamento já cadastrada para este funcionário e mês")
     except SQLAlchemyError:
         session.rollback()
         logger.exception(f"Erro ao criar folha de pagamento")
@@ -37,38 +62,215 @@ def create_payroll(
 def get_all_payrolls(
     session: Session = Depends(get_session)
 ):
+    """
+    Lista todas as folhas pelo caminho enxuto: colunas selecionadas e
+    serializadas em streaming, sem objetos do ORM.
+    """
     logger.debug("Solicitação para listar todas as folhas de pagamento")
     try:
-        payrolls = session.exec(select(Payroll)).all()
-        logger.info(f"Folhas de pagamento listadas com sucesso: {payrolls}")
-        return payrolls
+        columns = read_columns(Payroll, PayrollRead)
+        logger.info("Listando folhas de pagamento")
+        return lean_json_response(session, select(*columns).order_by(Payroll.id), [column.name for column in columns])
     except SQLAlchemyError:
         session.rollback()
         logger.exception(f"Erro ao listar todas as folhas de pagamento")
         raise HTTPException(status_code=500, detail="Erro interno ao listar todas as folhas de pagamento")
 
+def reject_closed_months(session: Session, months):
+    """
+    Meses já arquivados são fechados: novas folhas nesses meses não entram na
+    partição quente (409).
+    """
+    closed_months = sorted(session.execute(
+        select(PayrollArchiveMonth.reference_month)
+        .where(PayrollArchiveMonth.reference_month.in_(set(months)))
+    ).scalars().all())
+    if closed_months:
+        logger.warning(f"Meses de referência já arquivados: {closed_months}")
+        raise HTTPException(status_code=409, detail=f"Meses de referência já arquivados: {closed_months}")
+
+def upsert_payrolls(session: Session, payrolls: List[Dict]) -> Dict[str, int]:
+    """
+    Insere ou atualiza folhas por (funcionário, mês), ignorando as que não mudaram.
+    """
+    # Se o mesmo par funcionário/mês vier repetido, a última ocorrência vence
+    rows = {}
+    for payroll in payrolls:
+        row = {column: payroll.get(column) for column in PAYROLL_HASH_COLUMNS}
+        row["content_hash"] = content_hash(row, PAYROLL_HASH_COLUMNS)
+        rows[(row["employee_id"], row["reference_month"])] = row
+
+    reject_closed_months(session, {month for _, month in rows})
+
+    employee_ids = sorted({employee_id for employee_id, _ in rows})
+    employees = fetch_existing(session, Employee, ["id"], [(employee_id,) for employee_id in employee_ids], ["department_id"])
+    missing = [employee_id for employee_id in employee_ids if (employee_id,) not in employees]
+    if missing:
+        logger.warning(f"Funcionários não encontrados: {missing}")
+        raise HTTPException(status_code=404, detail=f"Funcionários não encontrados: {missing}")
+
+    existing = fetch_existing(
+        session, Payroll, ["employee_id", "reference_month"], list(rows),
+        ["id", "gross_salary", "net_salary", "content_hash"]
+    )
+    changed = [
+        row for key, row in rows.items()
+        if existing.get(key, {}).get("content_hash") != row["content_hash"]
+    ]
+    written = upsert_rows(session, Payroll, changed, ["employee_id", "reference_month"])
+
+    inserted = 0
+    changes = []
+    for row in written:
+        key = (row["employee_id"], row["reference_month"])
+        new, previous = rows[key], existing.get(key)
+        department_id = employees[(row["employee_id"],)]["department_id"]
+        changes.append((row["id"], INSERT if previous is None else UPDATE, {"id": row["id"], "version": row["version"], **new}))
+        if previous is None:
+            inserted += 1
+            adjust_payroll_totals(session, department_id, row["reference_month"], 1, new["gross_salary"], new["net_salary"])
+        else:
+            adjust_payroll_totals(
+                session, department_id, row["reference_month"], 0,
+                new["gross_salary"] - previous["gross_salary"], new["net_salary"] - previous["net_salary"]
+            )
+    record_changes(session, Payroll.__tablename__, changes)
+    return {
+        "inserted": inserted,
+        "updated": len(written) - inserted,
+        "unchanged": len(rows) - len(written),
+    }
+
+@router.put("/bulk")
+def upsert_payrolls_bulk(
+    payrolls: List[PayrollCreate],
+    session = Depends(get_session)
+):
+    """
+    Upsert em lote por (funcionário, mês de referência). Retorna quantas folhas
+    foram inseridas, atualizadas e quantas já estavam iguais no banco. Um lote
+    com mês arquivado é recusado inteiro (409).
+    """
+    logger.debug(f"Upsert em lote de {len(payrolls)} folhas de pagamento")
+    try:
+        summary = upsert_payrolls(session, [payroll.dict() for payroll in payrolls])
+        session.commit()
+        logger.info(f"Upsert em lote de folhas de pagamento concluído: {summary}")
+        return summary
+    except UpsertUnsupported as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=501, detail=str(e))
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception("Erro no upsert em lote de folhas de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao salvar folhas de pagamento")
+
+@router.put("/{employee_id}/{reference_month}", response_model=PayrollRead)
+def upsert_payroll(
+    employee_id: int,
+    reference_month: str,
+    payroll: PayrollUpsert,
+    session = Depends(get_session)
+):
+    """
+    Cria ou atualiza (idempotente) a folha do funcionário no mês de referência.
+    """
+    logger.debug(f"Upsert da folha de pagamento do funcionário {employee_id} em {reference_month}")
+    try:
+        summary = upsert_payrolls(session, [{**payroll.dict(), "employee_id": employee_id, "reference_month": reference_month}])
+        session.commit()
+        logger.info(f"Upsert da folha de pagamento concluído: {summary}")
+        return session.query(Payroll).filter(
+            Payroll.employee_id == employee_id,
+            Payroll.reference_month == reference_month
+        ).first()
+    except UpsertUnsupported as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=501, detail=str(e))
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception("Erro no upsert da folha de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao salvar folha de pagamento")
+
 @router.put("/{payroll_id}", response_model=PayrollRead)
 def update_payroll(
     payroll_id: int,
     payroll: PayrollUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     session = Depends(get_session)
 ):
+    """
+    Atualiza uma folha de pagamento. Envie `If-Match` (ETag) ou `version` no
+    corpo para evitar sobrescrever alterações concorrentes (conflito: 412 / 409).
+    """
     logger.debug(f"Solicitação para atualizar folha de pagamento: {payroll_id}")
+    expected = ExpectedVersion(if_match, payroll.version)
+    update_data = payroll.dict(exclude_unset=True, exclude={"version"})
+    try:
+        if "reference_month" in update_data:
+            reject_closed_months(session, [update_data["reference_month"]])
+        # Os valores antigos só são lidos quando a alteração afeta os contadores
+        current = None
+        if update_data.keys() & {"employee_id", "reference_month", "gross_salary", "net_salary"}:
+            current = fetch_current(
+                session, Payroll, payroll_id, "employee_id", "reference_month", "gross_salary", "net_salary",
+                not_found="Folha de pagamento não encontrada"
+            )
+        # O content_hash deixa de valer; o próximo upsert o recalcula
+        db_payroll = compare_and_swap(
+            session, Payroll, payroll_id, {**update_data, "content_hash": None}, expected, current,
+            not_found="Folha de pagamento não encontrada"
+        )
+        if current is not None:
+            # Retira os valores antigos dos contadores e soma os novos
+            adjust_payroll_totals(
+                session, employee_department_id(session, current["employee_id"]), current["reference_month"],
+                -1, -current["gross_salary"], -current["net_salary"]
+            )
+            adjust_payroll_totals(
+                session, employee_department_id(session, db_payroll["employee_id"]), db_payroll["reference_month"],
+                1, db_payroll["gross_salary"], db_payroll["net_salary"]
+            )
+        record_changes(session, Payroll.__tablename__, [(payroll_id, UPDATE, db_payroll)])
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        logger.warning(f"Já existe folha de pagamento para este funcionário e mês: {update_data}")
+        raise HTTPException(status_code=409, detail="Folha de pagamento já cadastrada para este funcionário e mês")
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception(f"Erro ao atualizar folha de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao atualizar folha de pagamento")
 
-    db_payroll = session.query(Payroll).filter(Payroll.id == payroll_id).first()
-    if not db_payroll:
-        logger.warning(f"Folha de pagamento com ID {payroll_id} não encontrada")
-        raise HTTPException(status_code=404, detail="Folha de pagamento não encontrada")
-
-    update_data = payroll.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_payroll, key, value)
-
-    session.commit()
-    session.refresh(db_payroll)
+    response.headers["ETag"] = etag(db_payroll["version"])
     logger.info(f"Folha de pagamento atualizada com sucesso: {payroll_id}")
     return db_payroll
 
+@router.delete("/", summary="Remove todas as folhas de um mês")
+def delete_payrolls_by_month(
+    reference_month: str = Query(..., pattern=r"^\d{4}-\d{2}$", description="Mês de referência (AAAA-MM)"),
+    session = Depends(get_session)
+):
+    """
+    Remove num único comando todas as folhas do mês de referência.
+    """
+    logger.debug(f"Solicitação para deletar as folhas de pagamento do mês {reference_month}")
+    try:
+        table = Payroll.__table__
+        deleted = execute_returning(session, table.delete().where(table.c.reference_month == reference_month), [table.c.id])
+        # Todas as folhas do mês saíram: os totais do mês deixam de existir
+        remove_reference_month(session, reference_month)
+        record_changes(session, Payroll.__tablename__, [(row["id"], DELETE, None) for row in deleted])
+        session.commit()
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception(f"Erro ao deletar folhas de pagamento do mês {reference_month}")
+        raise HTTPException(status_code=500, detail="Erro interno ao deletar folhas de pagamento")
+
+    logger.info(f"{len(deleted)} folhas de pagamento do mês {reference_month} deletadas")
+    return {"message": "Folhas de pagamento deletadas com sucesso", "deleted": len(deleted)}
+
 @router.delete("/{payroll_id}")
 def delete_payroll(
     payroll_id: int,
@@ -77,12 +279,18 @@ def delete_payroll(
     logger.debug(f"Solicitação para deletar folha de pagamento: {payroll_id}")
 
     try:
-        payroll = session.query(Payroll).filter(Payroll.id == payroll_id).first()
-        if not payroll:
+        table = Payroll.__table__
+        deleted = execute_returning(
+            session, table.delete().where(table.c.id == payroll_id),
+            [table.c.employee_id, table.c.reference_month, table.c.gross_salary, table.c.net_salary]
+        )
+        if not deleted:
             logger.warning(f"Folha de pagamento com ID {payroll_id} não encontrada")
             raise HTTPException(status_code=404, detail="Folha de pagamento não encontrada")
 
-        session.delete(payroll)
+        payroll = deleted[0]
+        subtract_payrolls(session, employee_department_id(session, payroll["employee_id"]), deleted)
+        record_changes(session, Payroll.__tablename__, [(payroll_id, DELETE, None)])
         session.commit()
         logger.info(f"Folha de pagamento deletada com sucesso: {payroll_id}")
         return {"message": "Folha de pagamento deletada com sucesso"}
@@ -99,7 +307,7 @@ def count_payrolls(
     logger.debug("Solicitação para contar as folhas de pagamento")
 
     try:
-        count = session.query(Payroll).count()
+        count = row_count(session, Payroll)
         logger.info(f"Quantidade total de Folhas de Pagamentos: {count}")
         return {"quantidade": count}
     except SQLAlchemyError:
@@ -108,12 +316,14 @@ def count_payrolls(
 
 @router.get("/paginated")
 def get_payrolls_paginated(
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
     session = Depends(get_session)
 ):
     logger.debug("Solicitação para buscar folhas de pagamento")
     try:
+        response.headers["X-Total-Count"] = str(row_count(session, Payroll))
         offset = (page - 1) * limit
         payrolls = session.query(Payroll).offset(offset).limit(limit).all()
         logger.info(f"{len(payrolls)} Folhas de pagamentos recuperadas na página {page}")
@@ -122,14 +332,24 @@ def get_payrolls_paginated(
         logger.exception(f"Erro ao recuperar folhas de pagamento")
         raise HTTPException(status_code=500, detail="Erro interno ao recuperar folhas de pagamento")
 
-@router.get("/filter/{employee_id}", response_model=List[PayrollRead])
-def get_payrolls_by_employee_id(
-    employee_id: int,
+@router.get("/filter/net_salary_interval", response_model=List[PayrollRead])
+def get_payrolls_by_net_salary(
+    floor: float,
+    limit: float,
+    from_month: Optional[str] = Query(None, description="Mês inicial (AAAA-MM); inclui meses arquivados"),
+    to_month: Optional[str] = Query(None, description="Mês final (AAAA-MM)"),
     session = Depends(get_session)
 ):
-    logger.debug(f"Solicitação para buscar payrolls pelo ID do funcionário: {employee_id}")
+    if (limit - floor) < 0:
+        logger.warning("Intervalo menor que 0")
+        raise HTTPException(status_code=404, detail="Intervalo menor que 0, utilize outro intervalo")
+    logger.debug(f"Solicitação para buscar payrolls pelo intervalo: {limit - floor}")
     try:
-        payrolls = session.query(Payroll).filter(Payroll.employee_id == employee_id).all()
+        payrolls = select_payrolls(
+            session,
+            lambda table: [table.c.net_salary >= floor, table.c.net_salary <= limit],
+            from_month, to_month
+        )
         if not payrolls:
             logger.warning(f"Folhas de pagamentos não encontradas")
             raise HTTPException(status_code=404, detail="Folhas de pagamentos não encontradas")
@@ -137,20 +357,18 @@ def get_payrolls_by_employee_id(
         return payrolls
     except SQLAlchemyError:
         logger.exception(f"Erro ao recuperar folhas de pagamento")
-        raise HTTPException(status_code=500, detail="Erro interno ao recuperar folhas de pagamento")
+        raise HTTPException (status_code=500, detail="Erro interno ao recuperar folhas de pagamento")
 
-@router.get("/filter/net_salary_interval", response_model=List[PayrollRead])
-def get_payrolls_by_net_salary(
-    floor: float,
-    limit: float,
+@router.get("/filter/{employee_id}", response_model=List[PayrollRead])
+def get_payrolls_by_employee_id(
+    employee_id: int,
+    from_month: Optional[str] = Query(None, description="Mês inicial (AAAA-MM); inclui meses arquivados"),
+    to_month: Optional[str] = Query(None, description="Mês final (AAAA-MM)"),
     session = Depends(get_session)
 ):
-    if (limit - floor) < 0:
-        logger.warning("Intervalo menor que 0")
-        raise HTTPException(status_code=404, detail="Intervalo menor que 0, utilize outro intervalo")
-    logger.debug(f"Solicitação para buscar payrolls pelo intervalo: {limit - floor}")
+    logger.debug(f"Solicitação para buscar payrolls pelo ID do funcionário: {employee_id}")
     try:
-        payrolls = session.query(Payroll).filter(and_(Payroll.net_salary >= floor, Payroll.net_salary <= limit)).all()
+        payrolls = select_payrolls(session, lambda table: [table.c.employee_id == employee_id], from_month, to_month)
         if not payrolls:
             logger.warning(f"Folhas de pagamentos não encontradas")
             raise HTTPException(status_code=404, detail="Folhas de pagamentos não encontradas")
@@ -158,11 +376,126 @@ def get_payrolls_by_net_salary(
         return payrolls
     except SQLAlchemyError:
         logger.exception(f"Erro ao recuperar folhas de pagamento")
-        raise HTTPException (status_code=500, detail="Erro interno ao recuperar folhas de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao recuperar folhas de pagamento")
+
+@router.post("/archive")
+def archive_payrolls(
+    before: str = Query(..., pattern=r"^\d{4}-\d{2}$", description="Arquiva os meses anteriores a este (AAAA-MM)"),
+    session = Depends(get_session)
+):
+    """
+    Move os meses fechados para as tabelas anuais de arquivo e atualiza
+    os snapshots colunares dos anos afetados.
+    """
+    logger.debug(f"Solicitação para arquivar folhas de pagamento anteriores a {before}")
+    try:
+        result = archive_months(session, before)
+        logger.info(f"{result['rows']} folhas de pagamento arquivadas: {result['months']}")
+        return result
+    except SQLAlchemyError:
+        session.rollback()
+        logger.exception("Erro ao arquivar folhas de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao arquivar folhas de pagamento")
+
+@router.get("/history/summary", response_model=List[PayrollHistoryRead])
+def get_payrolls_history_summary(
+    from_month: Optional[str] = Query(None, description="Mês inicial (AAAA-MM)"),
+    to_month: Optional[str] = Query(None, description="Mês final (AAAA-MM)"),
+    employee_id: Optional[int] = Query(None),
+    session = Depends(get_session)
+):
+    """
+    Totais mensais de folha (quantidade, bruto e líquido), incluindo os meses
+    arquivados, lidos dos snapshots colunares.
+    """
+    logger.debug(f"Solicitação de histórico de folhas de {from_month} a {to_month}, funcionário {employee_id}")
+    try:
+        return history_summary(session, from_month, to_month, employee_id)
+    except SQLAlchemyError:
+        logger.exception("Erro ao montar histórico de folhas de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao montar histórico de folhas de pagamento")
+
+@router.get("/audit", summary="Auditoria de consistência e outliers das folhas")
+def audit_payroll_period(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mês auditado (AAAA-MM)"),
+    year: Optional[int] = Query(None, ge=1900, le=9999, description="Ano auditado"),
+    tolerance: float = Query(0.01, ge=0, description="Diferença aceita entre líquido e bruto - descontos"),
+    z_threshold: float = Query(3.0, gt=0, description="Z-score a partir do qual o líquido é outlier"),
+    change_threshold: float = Query(0.5, gt=0, description="Variação relativa máxima em relação ao mês anterior"),
+    limit: int = Query(1000, ge=1, le=100000, description="Quantidade máxima de ocorrências listadas"),
+    session = Depends(get_session)
+):
+    """
+    Verifica as folhas de um mês ou de um ano: líquido inconsistente,
+    valores negativos, duplicidades e outliers por funcionário.
+
+    Exemplos:
+    - /pay_rolls/audit?month=2025-05
+    - /pay_rolls/audit?year=2024&z_threshold=2.5
+    """
+    if (month is None) == (year is None):
+        raise HTTPException(status_code=400, detail="Informe month ou year")
+    from_month, to_month = (month, month) if month else (f"{year:04d}-01", f"{year:04d}-12")
+    logger.debug(f"Solicitação de auditoria das folhas de {from_month} a {to_month}")
+    try:
+        report = audit_payrolls(
+            session, from_month, to_month,
+            tolerance=tolerance, z_threshold=z_threshold, change_threshold=change_threshold, limit=limit
+        )
+    except AuditUnavailable as exc:
+        logger.warning(f"Auditoria indisponível: {exc}")
+        raise HTTPException(status_code=503, detail=str(exc))
+    except SQLAlchemyError:
+        logger.exception("Erro ao auditar folhas de pagamento")
+        raise HTTPException(status_code=500, detail="Erro interno ao auditar folhas de pagamento")
+
+    logger.info(f"Auditoria de {from_month} a {to_month}: {report['rows_scanned']} folhas, ocorrências {report['counts']}")
+    return report
+
+EXPORT_COLUMNS = ["id", "employee_id", "reference_month", "gross_salary", "deductions", "net_salary"]
+EXPORT_CHUNK_SIZE = 1000
+
+@router.get("/export")
+def export_payrolls(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    session = Depends(get_session)
+):
+    """
+    Exporta todas as folhas de pagamento em streaming (NDJSON ou CSV),
+    lendo o banco em blocos para não carregar a tabela inteira na memória.
+    """
+    logger.debug(f"Solicitação para exportar folhas de pagamento em {format}")
+    # Sessão própria: o streaming continua depois que a rota retorna
+    bind = session.get_bind()
+    columns = [getattr(Payroll, name) for name in EXPORT_COLUMNS]
+
+    def generate():
+        with Session(bind) as stream_session:
+            result = stream_session.execute(
+                select(*columns).order_by(Payroll.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+            )
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(EXPORT_COLUMNS)
+                for rows in result.partitions():
+                    writer.writerows(rows)
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue()
+            else:
+                for rows in result.partitions():
+                    yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
 
 @router.get("/{payroll_id}", response_model=PayrollRead)
 def get_payroll(
     payroll_id: int,
+    response: Response,
     session = Depends(get_session)
 ):
     logger.debug(f"Solicitação para recuperar folha de pagamento: {payroll_id}")
@@ -172,6 +505,7 @@ def get_payroll(
             logger.warning(f"Folha de pagamento com ID {payroll_id} não encontrada")
             raise HTTPException(status_code=404, detail="Folha de pagamento não encontrada")
         logger.info(f"Folha de pagamento recuperada: {payroll}")
+        response.headers["ETag"] = etag(payroll.version)
         return payroll
     except SQLAlchemyError:
         session.rollback()
@@ -4,5 +4,8 @@ from .EmployeeRouter import router as employee_router
 from .BenefitRouter import router as benefit_router
 from .EmployeeBenefitRouter import router as employee_benefit_router
 from .PayrollRouter import router as payroll_router
+from .ChangeRouter import router as change_router
+from .DebugRouter import router as debug_router
+from .AnalyticsRouter import router as analytics_router
 
-__all__ = ["department_router", "employee_router", "benefit_router", "employee_benefit_router", "payroll_router"]
+__all__ = ["department_router", "employee_router", "benefit_router", "employee_benefit_router", "payroll_router", "change_router", "debug_router", "analytics_router"]
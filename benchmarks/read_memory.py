@@ -0,0 +1,108 @@
+"""
+Compara o pico de memória (RSS) de listar todas as folhas de pagamento:
+
+- orm: session.exec(select(Payroll)).all() + validação em PayrollRead,
+  como a rota fazia antes;
+- lean: colunas via select(...) em blocos, serializadas em JSON direto
+  (app.core.lean), como a rota faz agora.
+
+Cada variante roda num processo novo sobre um SQLite temporário, para que
+os picos não se misturem.
+
+Uso:
+    python -m benchmarks.read_memory --rows 100000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def seed(database_url: str, rows: int):
+    from sqlalchemy import insert
+    from sqlmodel import Session, SQLModel, create_engine
+
+    from app.models import Employee, Payroll
+
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        employees = max(rows // 12, 1)
+        session.execute(insert(Employee), [
+            {"id": index + 1, "name": f"Funcionário {index}", "cpf": f"{index:011d}", "cpf_normalized": f"{index:011d}",
+             "position": "Analista", "admission_date": "2020-01-01", "version": 1}
+            for index in range(employees)
+        ])
+        session.execute(insert(Payroll), [
+            {"employee_id": index % employees + 1, "reference_month": f"{2000 + index // (employees * 12)}-{index // employees % 12 + 1:02d}",
+             "gross_salary": 5000.0, "deductions": 500.0, "net_salary": 4500.0, "version": 1}
+            for index in range(rows)
+        ])
+        session.commit()
+
+
+def run_variant(variant: str, database_url: str) -> dict:
+    from sqlmodel import Session, create_engine, select
+
+    from app.core.lean import _json_rows, read_columns
+    from app.models.Payroll import Payroll, PayrollRead
+
+    engine = create_engine(database_url)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = 0
+    if variant == "orm":
+        with Session(engine) as session:
+            payrolls = session.exec(select(Payroll)).all()
+            body = json.dumps([PayrollRead.model_validate(payroll).model_dump() for payroll in payrolls])
+            size = len(body)
+    else:
+        columns = read_columns(Payroll, PayrollRead)
+        for chunk in _json_rows(engine, select(*columns).order_by(Payroll.id), [column.name for column in columns]):
+            size += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "variant": variant,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak * scale / 2**20, 1),
+        "growth_mb": round((peak - baseline) * scale / 2**20, 1),
+        "body_bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--variant", choices=["orm", "lean"], help=argparse.SUPPRESS)
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.database_url)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        seed(database_url, args.rows)
+        print(f"{args.rows} folhas de pagamento")
+        for variant in ("orm", "lean"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.read_memory", "--variant", variant, "--database-url", database_url],
+                check=True, capture_output=True, text=True, env={**os.environ, "DATABASE_URL": database_url},
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{result['variant']:>5}: pico RSS {result['peak_rss_mb']} MB "
+                f"(+{result['growth_mb']} MB), {result['seconds']} s, {result['body_bytes']} bytes"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+"""
+Teste de carga que reproduz tráfego real registrado.
+
+Fontes aceitas (detectadas pela extensão):
+
+- logs da aplicação (`api.log`, `app.log`): cada mensagem conhecida das
+  rotas vira a requisição que a gerou ("3 departamentos encontrados." →
+  `GET /departments/`; "Departamento criado com sucesso: name='RH' ..." →
+  `POST /departments/` com o mesmo corpo). Linhas de acesso do uvicorn
+  (`"GET /employees/ HTTP/1.1" 200`) também são lidas;
+- capturas HAR (`.har`) do navegador;
+- NDJSON (`.ndjson`/`.jsonl`): uma requisição por linha, com `method`,
+  `path` (ou `url`) e, opcionalmente, `body`.
+
+Escritas sem corpo conhecido (PUT de um log, POST de um log de acesso) são
+ignoradas e contadas no resumo da leitura.
+
+A mistura de requisições é repetida na ordem original (ou embaralhada com
+--shuffle) por --concurrency clientes simultâneos, limitada a --rate
+requisições por segundo (0 = sem limite). Com taxa fixa, a latência conta a
+partir do horário agendado, incluindo a espera por um cliente livre, para
+que um servidor lento não reduza a carga que o mede.
+
+Alvos:
+- asgi (padrão): o app no próprio processo, via httpx.ASGITransport;
+- uvicorn: sobe `uvicorn app.main:app` numa porta local (--workers);
+- --url: um servidor já em execução.
+
+O relatório traz, por rota (`MÉTODO /caminho/{parametro}`), contagem, erros
+(5xx e falhas de conexão/timeout), respostas 4xx, percentis e o histograma
+de latências. --json grava o relatório e --compare mostra a diferença para
+um relatório anterior (antes/depois de uma otimização).
+
+As escritas são reproduzidas de verdade: aponte --database-url para uma
+cópia do banco (ou use --read-only). O limite de requisições por cliente
+também vale aqui; desligue-o com RATE_LIMIT_ENABLED=false para medir só o
+app.
+
+Uso:
+    RATE_LIMIT_ENABLED=false python -m benchmarks.replay api.log app.log \\
+        --database-url sqlite:///./rh-carga.db --concurrency 20 --requests 5000 --json antes.json
+    python -m benchmarks.replay captura.har --target uvicorn --workers 4 --rate 200 --duration 30
+    python -m benchmarks.replay api.log --compare antes.json --json depois.json
+"""
+import argparse
+import ast
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Limites superiores (ms) das faixas do histograma; a última é aberta
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+PERCENTILES = (50, 90, 99)
+WRITE_METHODS = {"POST", "PUT", "PATCH"}
+# Campos gerados pelo banco, removidos dos corpos recuperados dos logs
+GENERATED_FIELDS = {"id", "version", "cpf_normalized"}
+
+TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d+ - \w+ - (?P<message>.*)$")
+ACCESS_LINE = re.compile(r'"(?P<method>GET|POST|PUT|PATCH|DELETE) (?P<path>/\S*) HTTP/[\d.]+"')
+REPR_FIELD = re.compile(r"(\w+)=('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|[^\s]+)")
+
+# Mensagem de log → (método, caminho, corpo vem da mensagem). Letras
+# acentuadas são `.`: os logs antigos misturam UTF-8 e Latin-1.
+LOG_MESSAGES = [
+    (r"\d+ departamentos encontrados\.$", "GET", "/departments/", False),
+    (r"Quantidade total de departamentos:", "GET", "/departments/count", False),
+    (r"Departamento encontrado por ID: (\d+)", "GET", "/departments/{0}", False),
+    (r"Departamento encontrado por nome: .*\bname='([^']*)'", "GET", "/departments/name/{0}", False),
+    (r"\d+ departamentos recuperados na p.gina (\d+)", "GET", "/departments/paginated?page={0}", False),
+    (r"Estat.sticas de \d+ departamentos", "GET", "/departments/stats", False),
+    (r"Departamento criado com sucesso: (.*)", "POST", "/departments/", True),
+    (r"Departamento deletado com sucesso: ID (\d+)", "DELETE", "/departments/{0}", False),
+    (r"Quantidade total de benef.cios:", "GET", "/benefits/count", False),
+    (r"\d+ benef.cios recuperados na p.gina (\d+)", "GET", "/benefits/paginated?page={0}", False),
+    (r"\d+ benef.cios ordenados por amount", "GET", "/benefits/sorted-by-amount", False),
+    (r"Benef.cio criado com sucesso: (.*)", "POST", "/benefits/", True),
+    (r"Benef.cio deletado com sucesso: ID (\d+)", "DELETE", "/benefits/{0}", False),
+    (r"Quantidade total de funcion.rios:", "GET", "/employees/count", False),
+    (r"\d+ funcion.rios recuperados na p.gina (\d+)", "GET", "/employees/paginated?page={0}", False),
+    (r"Funcion.rio criado com sucesso: (.*)", "POST", "/employees/", True),
+    (r"Funcion.rio ID (\d+) deletado com sucesso", "DELETE", "/employees/{0}", False),
+    (r"(?:Listando folhas de pagamento|Folhas de pagamento listadas com sucesso)", "GET", "/pay_rolls/", False),
+    (r"Quantidade total de Folhas de Pagamentos:", "GET", "/pay_rolls/count", False),
+    (r"\d+ Folhas de pagamentos recuperadas na p.gina (\d+)", "GET", "/pay_rolls/paginated?page={0}", False),
+    (r"Folha de pagamento recuperada: .*\bid=(\d+)", "GET", "/pay_rolls/{0}", False),
+    (r"Folha de Pagamento criada com sucesso: (.*)", "POST", "/pay_rolls/", True),
+    (r"Folha de pagamento deletada com sucesso: (\d+)", "DELETE", "/pay_rolls/{0}", False),
+    (r"Benef.cios dos Funcion.rios listados com sucesso", "GET", "/employee-benefits/", False),
+    (r"Quantidade total de Benef.cios dos Funcion.rios:", "GET", "/employee-benefits/count", False),
+    (r"\d+ Benef.cios dos Funcion.rios recuperados na p.gina (\d+)", "GET", "/employee-benefits/paginated?page={0}", False),
+    (r"Benef.cio dos Funcion.rios criada com sucesso: (.*)", "POST", "/employee-benefits/", True),
+    (r"Benef.cio do Funcion.rio deletado com sucesso: (\d+)", "DELETE", "/employee-benefits/{0}", False),
+]
+LOG_MESSAGES = [(re.compile(pattern), method, path, has_body) for pattern, method, path, has_body in LOG_MESSAGES]
+
+
+def _body_from_repr(text: str) -> Optional[Dict]:
+    """
+    Corpo JSON a partir do repr do modelo no log (`name='RH' amount=10.0`).
+    """
+    body = {}
+    for key, raw in REPR_FIELD.findall(text):
+        if key in GENERATED_FIELDS:
+            continue
+        try:
+            value = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            return None
+        if value is not None:
+            body[key] = value
+    return body or None
+
+
+def parse_log(path: str, stats: Counter) -> List[Dict]:
+    requests = []
+    with open(path, encoding="utf-8", errors="replace") as file:
+        for line in file:
+            access = ACCESS_LINE.search(line)
+            if access:
+                requests.append({"method": access["method"], "path": access["path"], "body": None})
+                continue
+            match = TIMESTAMP.match(line.rstrip("\n"))
+            if not match:
+                continue
+            message = match["message"]
+            for pattern, method, template, has_body in LOG_MESSAGES:
+                found = pattern.match(message)
+                if not found:
+                    continue
+                if has_body:
+                    body = _body_from_repr(found[1])
+                    if body is None:
+                        stats["corpo ilegível"] += 1
+                        break
+                    requests.append({"method": method, "path": template, "body": body})
+                else:
+                    requests.append({"method": method, "path": template.format(*found.groups()), "body": None})
+                break
+    return requests
+
+
+def _path_of(url: str) -> str:
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+def _json_body(text: Optional[str]):
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def parse_har(path: str, stats: Counter) -> List[Dict]:
+    with open(path, encoding="utf-8") as file:
+        entries = json.load(file)["log"]["entries"]
+    return [
+        {
+            "method": entry["request"]["method"].upper(),
+            "path": _path_of(entry["request"]["url"]),
+            "body": _json_body((entry["request"].get("postData") or {}).get("text")),
+        }
+        for entry in entries
+    ]
+
+
+def parse_ndjson(path: str, stats: Counter) -> List[Dict]:
+    requests = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                stats["linha inválida"] += 1
+                continue
+            body = item.get("body")
+            requests.append({
+                "method": str(item.get("method", "GET")).upper(),
+                "path": item.get("path") or _path_of(item["url"]),
+                "body": _json_body(body) if isinstance(body, str) else body,
+            })
+    return requests
+
+
+def load_requests(paths: List[str], read_only: bool = False) -> Tuple[List[Dict], Counter]:
+    """
+    Mistura de requisições de todos os arquivos, na ordem em que aparecem.
+    """
+    stats = Counter()
+    requests = []
+    for path in paths:
+        if path.endswith(".har"):
+            parsed = parse_har(path, stats)
+        elif path.endswith((".ndjson", ".jsonl")):
+            parsed = parse_ndjson(path, stats)
+        else:
+            parsed = parse_log(path, stats)
+        for request in parsed:
+            if read_only and request["method"] != "GET":
+                stats["escrita ignorada (--read-only)"] += 1
+            elif request["method"] in WRITE_METHODS and request["body"] is None:
+                stats["escrita sem corpo"] += 1
+            else:
+                requests.append(request)
+    stats["requisições"] = len(requests)
+    return requests, stats
+
+
+def route_templates():
+    """
+    (método, regex, modelo) das rotas do app, na ordem de roteamento.
+    """
+    from app.main import app
+
+    templates = []
+
+    def walk(routes):
+        for route in routes:
+            # include_router do FastAPI recente guarda o roteador original
+            original = getattr(route, "original_router", None)
+            if original is not None:
+                walk(original.routes)
+            elif hasattr(route, "path_regex"):
+                for method in getattr(route, "methods", None) or ():
+                    templates.append((method, route.path_regex, route.path))
+
+    walk(app.routes)
+    return templates
+
+
+def route_of(templates, method: str, path: str) -> str:
+    path = path.split("?", 1)[0]
+    for template_method, regex, template in templates:
+        if template_method == method and regex.match(path):
+            return f"{method} {template}"
+    return f"{method} {path}"
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.client_errors = 0
+        self.statuses = Counter()
+
+    def add(self, latency_ms: float, status: Optional[int]):
+        self.latencies.append(latency_ms)
+        self.statuses[str(status) if status else "falha"] += 1
+        if status is None or status >= 500:
+            self.errors += 1
+        elif status >= 400:
+            self.client_errors += 1
+
+    def report(self) -> Dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        histogram = Counter()
+        for latency in latencies:
+            bucket = next((f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS if latency <= bound), f">{HISTOGRAM_BOUNDS_MS[-1]}")
+            histogram[bucket] += 1
+        result = {
+            "count": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "client_errors": self.client_errors,
+            "statuses": dict(self.statuses),
+            "mean_ms": round(sum(latencies) / count, 3) if count else None,
+            "max_ms": round(latencies[-1], 3) if count else None,
+            "histogram_ms": {
+                bucket: histogram[bucket]
+                for bucket in [f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+                if histogram[bucket]
+            },
+        }
+        for percentile in PERCENTILES:
+            index = min(count - 1, int(count * percentile / 100)) if count else None
+            result[f"p{percentile}_ms"] = round(latencies[index], 3) if count else None
+        return result
+
+
+async def replay(client, requests: List[Dict], templates, concurrency: int, rate: float,
+                 total: Optional[int], duration: Optional[float]) -> Dict:
+    """
+    Dispara a mistura em ciclo até `total` requisições ou `duration`
+    segundos, com `concurrency` clientes e até `rate` requisições/s.
+    """
+    routes: Dict[str, RouteStats] = {}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.perf_counter()
+
+    async def produce():
+        sent = 0
+        while total is None or sent < total:
+            scheduled = started + sent / rate if rate else time.perf_counter()
+            if duration is not None and scheduled - started >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await queue.put((requests[sent % len(requests)], scheduled))
+            sent += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            request, scheduled = item
+            status = None
+            try:
+                response = await client.request(request["method"], request["path"], json=request["body"])
+                await response.aread()
+                status = response.status_code
+            except Exception:
+                pass
+            latency_ms = (time.perf_counter() - scheduled) * 1000
+            route = route_of(templates, request["method"], request["path"])
+            routes.setdefault(route, RouteStats()).add(latency_ms, status)
+
+    await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    overall = RouteStats()
+    for stats in routes.values():
+        overall.latencies.extend(stats.latencies)
+        overall.errors += stats.errors
+        overall.client_errors += stats.client_errors
+        overall.statuses.update(stats.statuses)
+    summary = overall.report()
+    summary["seconds"] = round(elapsed, 3)
+    summary["requests_per_s"] = round(summary["count"] / elapsed, 1) if elapsed else None
+    return {"summary": summary, "routes": {route: stats.report() for route, stats in sorted(routes.items())}}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(workers: int, timeout: float = 30.0):
+    """
+    Sobe o app num uvicorn local e espera ele responder.
+    """
+    import httpx
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn terminou com código {process.returncode}")
+        try:
+            httpx.get(f"{url}/openapi.json", timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn não respondeu a tempo")
+
+
+async def run_target(args, requests: List[Dict], templates) -> Dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    total = args.requests if args.requests or args.duration else len(requests)
+    process = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+    elif args.target == "uvicorn":
+        process, url = start_uvicorn(args.workers)
+        client = httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits)
+    else:
+        from app.core.db import create_db_and_tables
+        from app.main import app
+
+        # O ASGITransport não dispara o startup do app
+        create_db_and_tables()
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=args.timeout)
+    try:
+        async with client:
+            return await replay(client, requests, templates, args.concurrency, args.rate, total, args.duration)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+def _format_ms(value) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    summary = report["summary"]
+    print(
+        f"{summary['count']} requisições em {summary['seconds']} s ({summary['requests_per_s']}/s), "
+        f"{summary['errors']} erros ({summary['error_rate']:.2%}), {summary['client_errors']} respostas 4xx"
+    )
+    header = f"{'rota':<52} {'n':>6} {'erro%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"
+    if baseline:
+        header += f" {'Δp50':>8} {'Δp99':>8}"
+    print(header)
+    rows = list(report["routes"].items()) + [("TOTAL", summary)]
+    for route, stats in rows:
+        line = (
+            f"{route[:52]:<52} {stats['count']:>6} {stats['error_rate'] * 100:>6.1f} "
+            f"{_format_ms(stats['p50_ms']):>8} {_format_ms(stats['p90_ms']):>8} "
+            f"{_format_ms(stats['p99_ms']):>8} {_format_ms(stats['max_ms']):>8}"
+        )
+        if baseline:
+            before = baseline["summary"] if route == "TOTAL" else baseline["routes"].get(route)
+            for key in ("p50_ms", "p99_ms"):
+                if before and before.get(key) and stats.get(key) is not None:
+                    line += f" {(stats[key] - before[key]) / before[key]:>+8.0%}"
+                else:
+                    line += f" {'-':>8}"
+        print(line)
+    print("histograma (ms): " + ", ".join(f"{bucket}: {count}" for bucket, count in summary["histogram_ms"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="api.log, app.log, .har ou .ndjson")
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--url", help="Servidor já em execução (ex.: http://127.0.0.1:8000)")
+    parser.add_argument("--workers", type=int, default=1, help="Processos do uvicorn (--target uvicorn)")
+    parser.add_argument("--database-url", help="Banco usado pelo app (asgi/uvicorn); use uma cópia")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0, help="Requisições por segundo (0 = sem limite)")
+    parser.add_argument("--requests", type=int, help="Total de requisições (padrão: a mistura uma vez)")
+    parser.add_argument("--duration", type=float, help="Duração em segundos")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout de cada requisição (s)")
+    parser.add_argument("--shuffle", action="store_true", help="Embaralha a mistura")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--read-only", action="store_true", help="Reproduz só os GET")
+    parser.add_argument("--json", help="Grava o relatório neste arquivo")
+    parser.add_argument("--compare", help="Relatório anterior (--json) para comparar")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    requests, stats = load_requests(args.sources, args.read_only)
+    print("leitura: " + ", ".join(f"{key} {value}" for key, value in stats.items()))
+    if not requests:
+        sys.exit("Nenhuma requisição reconhecida nas fontes")
+    if args.shuffle:
+        random.Random(args.seed).shuffle(requests)
+
+    templates = route_templates()
+    report = asyncio.run(run_target(args, requests, templates))
+    report["config"] = {
+        "sources": args.sources, "target": args.url or args.target, "workers": args.workers,
+        "concurrency": args.concurrency, "rate": args.rate, "shuffle": args.shuffle,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+A aplicação lê a configuração do ambiente na importação: o banco de testes e
+as variáveis abaixo precisam estar definidos antes do primeiro `import app`.
+"""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="rh-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["PAYROLL_ARCHIVE_DIR"] = os.path.join(_workdir, "archive")
+os.environ["SNAPSHOT_DIR"] = os.path.join(_workdir, "snapshots")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+
+from app.core import analytics, benefit_projection, payroll_archive
+from app.core.db import engine
+from app.core.response_cache import response_cache
+from app.main import app
+from app.routers.AdminRouter import router as AdminRouter
+
+# O logger da aplicação grava em api.log no diretório atual; nos testes o
+# arquivo fica no diretório temporário
+_root_logger = logging.getLogger()
+for _handler in list(_root_logger.handlers):
+    if isinstance(_handler, logging.FileHandler):
+        _root_logger.removeHandler(_handler)
+        _handler.close()
+        _test_handler = logging.FileHandler(os.path.join(_workdir, "api.log"))
+        _test_handler.setFormatter(_handler.formatter)
+        _root_logger.addHandler(_test_handler)
+
+
+def _reset_database():
+    with engine.begin() as connection:
+        for table in inspect(connection).get_table_names():
+            connection.execute(text(f'DROP TABLE "{table}"'))
+    # Caches em memória que dependem do conteúdo do banco
+    analytics._snapshots.clear()
+    benefit_projection._matrices.clear()
+    payroll_archive._snapshot_cache.clear()
+    response_cache.clear()
+
+
+@pytest.fixture
+def client():
+    _reset_database()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def admin_client(client):
+    """
+    Rotas /admin (desligadas por padrão no app) sobre o mesmo banco de `client`.
+    """
+    admin_app = FastAPI()
+    admin_app.include_router(AdminRouter)
+    with TestClient(admin_app) as test_client:
+        yield test_client
+
+
+def valid_cpf(number: int) -> str:
+    digits = [int(char) for char in f"{number:09d}"]
+    for weight in (10, 11):
+        digits.append(sum(a * b for a, b in zip(digits, range(weight, 1, -1))) * 10 % 11 % 10)
+    return "".join(map(str, digits))
+
+
+@pytest.fixture
+def create_employee(client):
+    counter = iter(range(100000000, 999999999))
+
+    def create(**fields):
+        body = {"name": "Funcionário", "cpf": valid_cpf(next(counter)), "position": "Analista", "admission_date": "2020-01-01"}
+        body.update(fields)
+        response = client.post("/employees/", json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return create
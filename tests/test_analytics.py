@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def payrolls(client, create_employee):
+    employee = create_employee(position="Dev")
+    for month, net in (("2024-01", 1000), ("2024-02", 2000)):
+        client.post("/pay_rolls/", json={
+            "employee_id": employee["id"], "gross_salary": net, "deductions": 0,
+            "net_salary": net, "reference_month": month,
+        })
+
+
+def _query(client, body):
+    return client.post("/analytics/query", json=body)
+
+
+def test_grouped_aggregates(client, payrolls):
+    response = _query(client, {
+        "dataset": "payroll",
+        "filters": [{"column": "net_salary", "op": ">=", "value": "1500"}],
+        "group_by": ["position"],
+        "aggregates": [{"func": "count"}, {"func": "sum", "column": "net_salary"}],
+    })
+
+    assert response.status_code == 200
+    assert response.json()["rows"] == [{"position": "Dev", "count": 1, "sum_net_salary": 2000.0}]
+
+
+@pytest.mark.parametrize("body", [
+    {"aggregates": [{"func": "sum"}]},
+    {"aggregates": [{"func": "avg", "column": "position"}]},
+    {"aggregates": [{"func": "median", "column": "net_salary"}]},
+    {"filters": [{"column": "net_salary", "op": ">", "value": "abc"}]},
+    {"filters": [{"column": "employee_id", "op": "==", "value": 1.5}]},
+    {"filters": [{"column": "employee_id", "op": "in", "value": [1, "x"]}]},
+    {"filters": [{"column": "reference_month", "op": ">=", "value": 202401}]},
+    {"filters": [{"column": "position", "op": "==", "value": ["Dev"]}]},
+    {"filters": [{"column": "position", "op": "<", "value": "Dev"}]},
+    {"filters": [{"column": "unknown", "op": "==", "value": 1}]},
+    {"dataset": "unknown"},
+])
+def test_invalid_queries_are_400(client, payrolls, body):
+    response = _query(client, body)
+
+    assert response.status_code == 400, response.text
+
+
+def test_rebuild_is_admin_only(client, admin_client, payrolls):
+    assert client.post("/analytics/snapshot/rebuild").status_code in (404, 405)
+
+    stats = admin_client.post("/admin/analytics/rebuild").json()
+
+    assert stats["datasets"]["payroll"]["rows"] == 2
@@ -0,0 +1,68 @@
+import pytest
+
+from app.core import benefit_projection
+
+
+def _link(client, employee, benefit, start, end="", custom=0.0):
+    response = client.post("/employee-benefits/", json={
+        "employee_id": employee["id"], "benefit_id": benefit["id"],
+        "start_date": start, "end_date": end, "custom_amount": custom,
+    })
+    assert response.status_code == 200, response.text
+
+
+@pytest.fixture
+def scenario(client, create_employee):
+    member, outsider = create_employee(), create_employee()
+    department = client.post("/departments/", json={"name": "TI", "location": "SP", "employee_ids": [member["id"]]}).json()
+    health = client.post("/benefits/", json={"name": "Saúde", "type": "health", "amount": 100}).json()
+    food = client.post("/benefits/", json={"name": "Vale", "type": "food", "amount": 50}).json()
+    _link(client, member, health, "2025-01-01", "2025-02-28")
+    # Valor personalizado e vigência em aberto
+    _link(client, member, food, "2025-01-01", custom=80)
+    _link(client, outsider, food, "2025-02-01")
+    return {"department": department, "health": health, "food": food}
+
+
+def _project(client, changes=(), **months):
+    body = {"from_month": "2025-01", "to_month": "2025-03", "changes": list(changes), **months}
+    return client.post("/benefits/projection", json=body)
+
+
+def test_projection_applies_scenario_per_department_and_month(client, scenario):
+    response = _project(client, [
+        {"benefit_id": scenario["health"]["id"], "factor": 1.5},
+        {"benefit_id": scenario["food"]["id"], "active": False},
+    ])
+
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["months"] == ["2025-01", "2025-02", "2025-03"]
+    departments = {row["department_id"]: row for row in result["departments"]}
+    assert departments[scenario["department"]["id"]]["baseline"] == [180.0, 180.0, 80.0]
+    assert departments[scenario["department"]["id"]]["projected"] == [150.0, 150.0, 0.0]
+    assert departments[None]["baseline"] == [0.0, 50.0, 50.0]
+    assert result["totals"] == {"baseline": [180.0, 230.0, 130.0], "projected": [150.0, 150.0, 0.0], "delta": -240.0}
+    assert result["links"] == 3
+
+
+def test_matrix_reloads_after_writes(client, scenario, create_employee):
+    assert _project(client).json()["links"] == 3
+
+    _link(client, create_employee(), scenario["health"], "2025-03-01")
+
+    result = _project(client).json()
+    assert result["links"] == 4
+    assert result["totals"]["baseline"] == [180.0, 230.0, 230.0]
+
+
+def test_invalid_scenarios_are_rejected(client, scenario):
+    assert _project(client, [{"benefit_id": 999, "factor": 2}]).status_code == 400
+    assert _project(client, from_month="2025-13").status_code == 400
+    assert _project(client, to_month="2024-12").status_code == 400
+
+
+def test_projection_unavailable_without_numpy(client, monkeypatch):
+    monkeypatch.setattr(benefit_projection, "np", None)
+
+    assert _project(client).status_code == 503
@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.fixture
+def employees(client, create_employee):
+    return [create_employee(name=f"Funcionário {index}") for index in range(20)]
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", "br"),
+])
+def test_encoding_follows_q_values(client, employees, accept_encoding, expected):
+    response = client.get("/employees/", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.headers["content-encoding"] == expected
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == employees
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip;q=0", "br;q=0, gzip;q=0", "*;q=0", "identity"])
+def test_refused_encodings_are_not_used(client, employees, accept_encoding):
+    response = client.get("/employees/", headers={"Accept-Encoding": accept_encoding})
+
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == employees
+
+
+def test_small_response_is_not_compressed_but_varies(client):
+    response = client.get("/employees/count", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_streamed_export_is_compressed(client, employees):
+    for employee in employees:
+        client.post("/pay_rolls/", json={
+            "employee_id": employee["id"], "gross_salary": 100, "deductions": 10,
+            "net_salary": 90, "reference_month": "2024-01",
+        })
+
+    response = client.get("/pay_rolls/export", params={"format": "ndjson"}, headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 20
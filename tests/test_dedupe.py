@@ -0,0 +1,43 @@
+from sqlalchemy import inspect
+
+from app.core.db import engine
+from conftest import valid_cpf
+
+
+def _formatted(cpf: str) -> str:
+    return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+
+
+def test_cpf_differing_only_in_formatting_is_the_same_employee(client, create_employee):
+    employee = create_employee(cpf=valid_cpf(123456001))
+
+    duplicate = client.post("/employees/", json={
+        "name": "Outro", "cpf": _formatted(employee["cpf"]), "position": "Analista", "admission_date": "2021-01-01",
+    })
+    assert duplicate.status_code == 409
+
+    upserted = client.put("/employees/bulk", json=[{
+        "name": "Renomeado", "cpf": _formatted(employee["cpf"]), "position": "Analista", "admission_date": "2020-01-01",
+    }])
+    assert upserted.json() == {"inserted": 0, "updated": 1, "unchanged": 0}
+    assert client.get(f"/employees/by-cpf/{employee['cpf']}").json()["name"] == "Renomeado"
+
+
+def test_dedupe_report(client, create_employee):
+    employee = create_employee(cpf=valid_cpf(123456001))
+    new_cpf = valid_cpf(123456002)
+
+    report = client.post("/employees/dedupe-report", json=[
+        _formatted(employee["cpf"]), new_cpf, _formatted(new_cpf), "123",
+    ]).json()
+
+    assert report["invalid"] == [{"position": 3, "cpf": "123"}]
+    assert report["duplicated"] == [{"cpf": new_cpf, "positions": [1, 2]}]
+    assert report["existing"] == [{"cpf": employee["cpf"], "employee_id": employee["id"], "positions": [0]}]
+    assert report["new"] == 1
+
+
+def test_raw_cpf_index_is_not_kept(client):
+    names = {index["name"] for index in inspect(engine).get_indexes("employee")}
+    assert "ux_employee_cpf_normalized" in names
+    assert "ux_employee_cpf" not in names
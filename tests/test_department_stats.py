@@ -0,0 +1,40 @@
+def _stats(client, reference_month):
+    return [
+        (item["headcount"], item["payroll_count"], item["gross_total"])
+        for item in client.get("/departments/stats", params={"reference_month": reference_month}).json()
+    ]
+
+
+def test_counters_follow_writes(client, create_employee):
+    department = client.post("/departments/", json={"name": "RH", "location": "Sede"}).json()
+    employee = create_employee(department_id=department["id"])
+    client.post("/pay_rolls/", json={
+        "employee_id": employee["id"], "gross_salary": 100, "deductions": 10, "net_salary": 90, "reference_month": "2024-01",
+    })
+
+    assert _stats(client, "2024-01") == [(1, 1, 100.0)]
+
+    client.delete(f"/employees/{employee['id']}")
+    assert _stats(client, "2024-01") == [(0, 0, 0.0)]
+
+
+def test_rebuild_keeps_archived_months(client, admin_client, create_employee):
+    department = client.post("/departments/", json={"name": "RH", "location": "Sede"}).json()
+    employee = create_employee(department_id=department["id"])
+    for month in ("2023-01", "2024-01"):
+        client.post("/pay_rolls/", json={
+            "employee_id": employee["id"], "gross_salary": 100, "deductions": 10, "net_salary": 90, "reference_month": month,
+        })
+    client.post("/pay_rolls/archive", params={"before": "2024-01"})
+    incremental = _stats(client, "2023-01")
+
+    assert admin_client.post("/admin/department-stats/rebuild").status_code == 200
+
+    assert incremental == [(1, 1, 100.0)]
+    assert _stats(client, "2023-01") == incremental
+    assert _stats(client, "2024-01") == [(1, 1, 100.0)]
+
+
+def test_rebuild_is_not_public(client):
+    assert client.post("/departments/stats/rebuild").status_code in (404, 405)
+    assert client.post("/admin/department-stats/rebuild").status_code == 404
@@ -0,0 +1,60 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core import events
+from app.core.changes import DELETE, INSERT
+from app.core.db import engine
+from app.core.events import EventBroker, queue_event
+from app.routers.EventRouter import _sse_message
+
+
+def test_websocket_receives_committed_changes_for_its_entities(client, create_employee):
+    with client.websocket_connect("/events/ws?entity=employee") as websocket:
+        # Outra tabela: filtrada
+        client.post("/benefits/", json={"name": "Vale", "type": "food", "amount": 10})
+        employee = create_employee()
+
+        message = websocket.receive_json()
+
+    assert message["type"] == "change"
+    assert (message["entity"], message["entity_id"], message["operation"]) == ("employee", employee["id"], INSERT)
+
+
+def test_rollback_discards_pending_events(client, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.broker, "publish", lambda tenant, items: published.append(items))
+
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        queue_event(session, "employee", 1, INSERT, "2024-01-01T00:00:00")
+        session.rollback()
+        queue_event(session, "employee", 2, DELETE, "2024-01-01T00:00:00")
+        session.commit()
+
+    assert [[item["entity_id"] for item in items] for items in published] == [[2]]
+
+
+def test_slow_subscriber_gets_overflow_notice(monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_QUEUE_SIZE", 2)
+
+    async def scenario():
+        broker = EventBroker()
+        subscriber = broker.subscribe(None)
+        broker.publish(None, [{"type": "change", "entity": "employee", "entity_id": n} for n in range(3)])
+        await asyncio.sleep(0)
+        return [await subscriber.next(0.1) for _ in range(4)], broker.stats()
+
+    messages, stats = asyncio.run(scenario())
+
+    assert messages[0] == {"type": "overflow", "dropped": 1}
+    assert [message["entity_id"] for message in messages[1:3]] == [0, 1]
+    assert messages[3] is None
+    assert (stats["delivered"], stats["dropped"]) == (2, 1)
+
+
+def test_sse_message_format():
+    message = {"id": 7, "type": "change", "entity": "payroll"}
+
+    assert _sse_message(message) == b'id: 7\nevent: change\ndata: {"id": 7, "type": "change", "entity": "payroll"}\n\n'
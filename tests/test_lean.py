@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+from app.core import lean
+from app.core.db import engine
+
+
+def test_listing_streams_every_chunk(client, create_employee, monkeypatch):
+    monkeypatch.setattr(lean, "LEAN_CHUNK_SIZE", 2)
+    created = [create_employee(name=f"Funcionário {index}") for index in range(5)]
+
+    response = client.get("/employees/")
+
+    assert response.status_code == 200
+    assert response.json() == created
+
+
+def test_empty_listing(client):
+    response = client.get("/pay_rolls/")
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_database_error_is_500_not_truncated_200(client, create_employee):
+    create_employee()
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE employee RENAME TO employee_moved"))
+
+    response = client.get("/employees/")
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Erro ao obter funcionários"}
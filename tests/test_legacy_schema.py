@@ -0,0 +1,46 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlmodel import Session, select
+
+from app.core.db import create_db_and_tables
+from app.models.Benefit import Benefit
+from app.models.Employee import Employee
+from app.models.EmployeeBenefit import EmployeeBenefit
+from app.models.Payroll import Payroll
+
+LEGACY_DATABASE = Path(__file__).resolve().parent.parent / "rh.db"
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    if not LEGACY_DATABASE.exists():
+        pytest.skip("rh.db não encontrado")
+    path = tmp_path / "rh.db"
+    shutil.copy(LEGACY_DATABASE, path)
+    legacy = create_engine(f"sqlite:///{path}")
+    yield legacy
+    legacy.dispose()
+
+
+def test_startup_migrates_legacy_schema(legacy_engine):
+    before = {column["name"] for column in inspect(legacy_engine).get_columns("employee")}
+    assert "version" not in before
+
+    create_db_and_tables(legacy_engine)
+    # Uma segunda inicialização não altera nada
+    create_db_and_tables(legacy_engine)
+
+    columns = inspect(legacy_engine)
+    for model in (Benefit, Employee, EmployeeBenefit, Payroll):
+        assert "version" in {column["name"] for column in columns.get_columns(model.__tablename__)}
+    for model in (Employee, Payroll):
+        assert "content_hash" in {column["name"] for column in columns.get_columns(model.__tablename__)}
+
+    with Session(legacy_engine) as session:
+        employees = session.exec(select(Employee)).all()
+        payrolls = session.exec(select(Payroll)).all()
+    assert employees and all(employee.version == 1 for employee in employees)
+    assert all(payroll.version == 1 for payroll in payrolls)
@@ -0,0 +1,17 @@
+def test_if_match_and_version_conflicts(client, create_employee):
+    employee = create_employee()
+    url = f"/employees/{employee['id']}"
+
+    updated = client.put(url, json={"position": "Coordenador"}, headers={"If-Match": '"1"'})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] == '"2"'
+
+    stale_header = client.put(url, json={"position": "Diretor"}, headers={"If-Match": '"1"'})
+    assert stale_header.status_code == 412
+
+    stale_body = client.put(url, json={"position": "Diretor", "version": 1})
+    assert stale_body.status_code == 409
+
+    current = client.get(url).json()
+    assert current["position"] == "Coordenador"
+    assert current["version"] == 2
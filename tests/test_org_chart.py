@@ -0,0 +1,31 @@
+import pytest
+
+from app.core import org_chart
+
+
+@pytest.fixture(params=[False, True], ids=["cte", "closure"])
+def closure(request, monkeypatch):
+    monkeypatch.setattr(org_chart, "ORG_CLOSURE_ENABLED", request.param)
+    return request.param
+
+
+def _ids(entries):
+    return [(entry["id"], entry["depth"]) for entry in entries]
+
+
+def test_reports_and_chain_follow_department_managers(client, create_employee, closure):
+    ceo, head, worker = create_employee(), create_employee(), create_employee()
+    board = client.post("/departments/", json={"name": "Diretoria", "location": "SP", "manager_id": ceo["id"]}).json()
+    client.post("/departments/", json={"name": "TI", "location": "SP", "manager_id": head["id"], "employee_ids": [worker["id"]]})
+    # O gerente de TI responde à diretoria
+    response = client.put(f"/employees/{head['id']}", json={"department_id": board["id"]})
+    assert response.status_code == 200, response.text
+
+    assert _ids(client.get(f"/employees/{worker['id']}/chain").json()) == [(head["id"], 1), (ceo["id"], 2)]
+    assert _ids(client.get(f"/employees/{ceo['id']}/reports").json()) == [(head["id"], 1), (worker["id"], 2)]
+    assert _ids(client.get(f"/employees/{ceo['id']}/reports", params={"depth": 1}).json()) == [(head["id"], 1)]
+
+    # Trocar o departamento do gerente de TI tira ele e seus subordinados da diretoria
+    client.put(f"/employees/{head['id']}", json={"department_id": None})
+    assert client.get(f"/employees/{ceo['id']}/reports").json() == []
+    assert _ids(client.get(f"/employees/{worker['id']}/chain").json()) == [(head["id"], 1)]
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def employee_with_payrolls(client, create_employee):
+    employee = create_employee()
+    for month in ("2023-11", "2023-12", "2024-01"):
+        response = client.post("/pay_rolls/", json={
+            "employee_id": employee["id"], "gross_salary": 1100, "deductions": 100,
+            "net_salary": 1000, "reference_month": month,
+        })
+        assert response.status_code == 200
+    return employee
+
+
+def test_archive_moves_closed_months(client, employee_with_payrolls):
+    result = client.post("/pay_rolls/archive", params={"before": "2024-01"}).json()
+
+    assert result == {"months": ["2023-11", "2023-12"], "years": [2023], "rows": 2}
+    assert client.get("/pay_rolls/count").json() == {"quantidade": 1}
+    # A partição quente não tem mais os meses arquivados; o intervalo que os alcança lê o arquivo
+    employee_id = employee_with_payrolls["id"]
+    assert len(client.get(f"/pay_rolls/filter/{employee_id}").json()) == 1
+    assert len(client.get(f"/pay_rolls/filter/{employee_id}", params={"from_month": "2023-01"}).json()) == 3
+
+
+def test_history_summary_includes_archived_months(client, employee_with_payrolls):
+    client.post("/pay_rolls/archive", params={"before": "2024-01"})
+
+    summary = client.get("/pay_rolls/history/summary").json()
+
+    assert [(item["reference_month"], item["payroll_count"], item["net_total"]) for item in summary] == [
+        ("2023-11", 1, 1000.0), ("2023-12", 1, 1000.0), ("2024-01", 1, 1000.0),
+    ]
+
+
+def test_archive_is_a_tagged_delete_in_the_feed(client, employee_with_payrolls):
+    client.post("/pay_rolls/archive", params={"before": "2024-01"})
+
+    changes = [json.loads(line) for line in client.get("/changes/", params={"entity": "payroll"}).text.splitlines()]
+    deletes = [change for change in changes if change["operation"] == "delete"]
+
+    assert len(deletes) == 2
+    assert all(change["data"]["archived"] for change in deletes)
+
+
+def test_analytics_keeps_archived_rows_after_archive(client, employee_with_payrolls):
+    # Poucas linhas arquivadas: o snapshot é atualizado no lugar, sem reconstrução
+    for month in range(2, 9):
+        client.post("/pay_rolls/", json={
+            "employee_id": employee_with_payrolls["id"], "gross_salary": 1100, "deductions": 100,
+            "net_salary": 1000, "reference_month": f"2024-{month:02d}",
+        })
+    count = {"dataset": "payroll", "aggregates": [{"func": "count"}]}
+    assert client.post("/analytics/query", json=count).json()["rows"] == [{"count": 10}]
+
+    client.post("/pay_rolls/archive", params={"before": "2024-01"})
+
+    assert client.post("/analytics/query", json=count).json()["rows"] == [{"count": 10}]
+
+
+def test_archived_month_rejects_new_payrolls(client, employee_with_payrolls):
+    client.post("/pay_rolls/archive", params={"before": "2024-01"})
+    payroll = {
+        "employee_id": employee_with_payrolls["id"], "gross_salary": 1, "deductions": 0,
+        "net_salary": 1, "reference_month": "2023-12",
+    }
+
+    assert client.post("/pay_rolls/", json=payroll).status_code == 409
+    assert client.put("/pay_rolls/bulk", json=[payroll]).status_code == 409
+    assert client.get("/pay_rolls/count").json() == {"quantidade": 1}
+
+
+def test_employee_with_archived_payrolls_cannot_be_deleted(client, employee_with_payrolls, create_employee):
+    client.post("/pay_rolls/archive", params={"before": "2024-01"})
+
+    response = client.delete(f"/employees/{employee_with_payrolls['id']}")
+
+    assert response.status_code == 409
+    assert client.get(f"/employees/{employee_with_payrolls['id']}").status_code == 200
+    assert len(client.get("/pay_rolls/history/summary").json()) == 3
+    # Sem folhas arquivadas a remoção segue normal
+    other = create_employee()
+    assert client.delete(f"/employees/{other['id']}").status_code == 200
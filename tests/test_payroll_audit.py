@@ -0,0 +1,53 @@
+import pytest
+
+
+def _months(year: int):
+    return [f"{year}-{month:02d}" for month in range(1, 13)]
+
+
+def _create_payrolls(client, employee_id, salaries):
+    for month, salary in salaries:
+        response = client.post("/pay_rolls/", json={
+            "employee_id": employee_id, "gross_salary": salary, "deductions": 0,
+            "net_salary": salary, "reference_month": month,
+        })
+        assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("salary", [4321.37, 2789.33])
+def test_constant_salary_is_not_outlier(client, create_employee, salary):
+    employee = create_employee()
+    _create_payrolls(client, employee["id"], [(month, salary) for month in _months(2024)])
+
+    report = client.get("/pay_rolls/audit", params={"year": 2024}).json()
+
+    assert report["rows_scanned"] == 12
+    assert report["counts"]["outlier"] == 0
+    assert report["issues"] == []
+
+
+def test_salary_spike_is_outlier(client, create_employee):
+    employee = create_employee()
+    salaries = [(month, 3000.0 + index % 3) for index, month in enumerate(_months(2024))]
+    salaries[6] = ("2024-07", 9000.0)
+    _create_payrolls(client, employee["id"], salaries)
+
+    report = client.get("/pay_rolls/audit", params={"month": "2024-07"}).json()
+
+    outliers = [item for item in report["issues"] if item["issue"] == "outlier"]
+    assert [item["reference_month"] for item in outliers] == ["2024-07"]
+    assert outliers[0]["z_score"] > 3
+
+
+def test_constant_history_with_different_month(client, create_employee):
+    employee = create_employee()
+    salaries = [(month, 2789.33) for month in _months(2024)]
+    salaries[-1] = ("2024-12", 2790.00)
+    _create_payrolls(client, employee["id"], salaries)
+
+    report = client.get("/pay_rolls/audit", params={"year": 2024}).json()
+
+    # Histórico sem variação: qualquer diferença é outlier (z infinito, sem valor)
+    outliers = [item for item in report["issues"] if item["issue"] == "outlier"]
+    assert [item["reference_month"] for item in outliers] == ["2024-12"]
+    assert outliers[0]["z_score"] is None
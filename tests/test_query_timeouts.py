@@ -0,0 +1,32 @@
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.core import query_timeouts
+from app.core.db import engine
+from app.models.Employee import Employee
+
+
+def test_filter_over_budget_is_504(client, monkeypatch):
+    with Session(engine) as session:
+        session.execute(insert(Employee), [
+            {"name": f"Funcionário {index}", "cpf": str(index), "cpf_normalized": str(index),
+             "position": "Analista", "admission_date": "2020-01-01", "version": 1}
+            for index in range(20000)
+        ])
+        session.commit()
+    # Prazo que já expirou quando a consulta começa
+    monkeypatch.setattr(query_timeouts, "route_timeout_ms", lambda route: 1e-6)
+
+    response = client.get("/employees/filtered", params={"name": "a"})
+
+    assert response.status_code == 504
+    assert query_timeouts.query_timeout_stats()["routes"]["/employees/filtered"]["timeouts"] >= 1
+
+
+def test_filter_within_budget(client, create_employee):
+    employee = create_employee(name="Maria")
+
+    response = client.get("/employees/filtered", params={"name": "mar"})
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [employee["id"]]
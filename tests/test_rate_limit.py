@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import db, tenancy
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.replicas import ReplicaSet
+
+
+def _limited_client(**kwargs):
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.post("/ping")
+    def ping_write():
+        return {"ok": True}
+
+    options = {"route_classes": {}, "budgets": {}, "concurrency": {}, "enabled": True}
+    options.update(kwargs)
+    app.add_middleware(RateLimitMiddleware, **options)
+    return TestClient(app)
+
+
+def _pool_engine(tmp_path, name):
+    return create_engine(f"sqlite:///{tmp_path / name}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+
+
+def test_burst_above_budget_gets_429():
+    client = _limited_client(budgets={"default": (0.001, 2)})
+
+    assert client.get("/ping").status_code == 200
+    assert client.get("/ping").status_code == 200
+    response = client.get("/ping")
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+@pytest.fixture
+def pools(tmp_path, monkeypatch):
+    primary = _pool_engine(tmp_path, "primary.db")
+    replica = _pool_engine(tmp_path, "replica.db")
+    tenant = _pool_engine(tmp_path, "acme.db")
+    monkeypatch.setattr(db, "engine", primary)
+    monkeypatch.setattr(db, "replicas", ReplicaSet(primary, [replica]))
+    monkeypatch.setattr(db, "_tenant_engines", OrderedDict(acme=tenant))
+    monkeypatch.setattr(tenancy, "TENANT_DATABASE_URL", f"sqlite:///{tmp_path}/{{tenant}}.db")
+    yield primary, replica, tenant
+    for bind in (primary, replica, tenant):
+        bind.dispose()
+
+
+def test_saturated_tenant_pool_sheds_only_that_tenant(pools):
+    _, _, tenant = pools
+    client = _limited_client()
+
+    with tenant.connect():
+        assert client.get("/ping", headers={"X-Tenant-ID": "acme"}).status_code == 503
+        assert client.get("/ping", headers={"X-Tenant-ID": "outro"}).status_code == 200
+        assert client.post("/ping").status_code == 200
+
+
+def test_reads_check_replica_pools_and_writes_check_the_primary(pools):
+    primary, replica, _ = pools
+    client = _limited_client()
+
+    with replica.connect():
+        assert client.get("/ping").status_code == 503
+        assert client.post("/ping").status_code == 200
+        with primary.connect():
+            assert client.post("/ping").status_code == 503
+    with primary.connect():
+        # A réplica livre ainda atende leituras
+        assert client.get("/ping").status_code == 200
@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.core import db, replicas as replicas_module
+from app.core.replicas import ReplicaSet, sync_sqlite_replicas
+from conftest import valid_cpf
+
+
+@pytest.fixture
+def replica_engine(tmp_path):
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    yield replica
+    replica.dispose()
+
+
+def test_reads_stick_to_primary_after_a_write(tmp_path, replica_engine):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica_set = ReplicaSet(primary, [replica_engine])
+    # Verificada "agora": o rodízio não consulta o banco (vazio) da réplica
+    replica_set.replicas[0].checked_at = float("inf")
+
+    assert replica_set.read_engine("a") is replica_engine
+    replica_set.record_write("a")
+    assert replica_set.read_engine("a") is primary
+    assert replica_set.read_engine("b") is replica_engine
+    primary.dispose()
+
+
+def test_unhealthy_replica_leaves_rotation(client, replica_engine):
+    # Réplica sem o esquema: a verificação de saúde falha
+    replica_set = ReplicaSet(db.engine, [replica_engine])
+
+    assert replica_set.read_engine("a") is db.engine
+    assert not replica_set.replicas[0].healthy
+
+
+def test_get_routes_read_from_replica(client, replica_engine, monkeypatch):
+    sync_sqlite_replicas(db.engine, [replica_engine])
+    monkeypatch.setattr(db, "replicas", ReplicaSet(db.engine, [replica_engine]))
+    monkeypatch.setattr(replicas_module, "REPLICA_CLIENT_HEADER", "X-Client")
+    employee = {"name": "Funcionário", "cpf": valid_cpf(100000001), "position": "Analista", "admission_date": "2020-01-01"}
+
+    assert client.post("/employees/", json=employee, headers={"X-Client": "a"}).status_code == 200
+
+    # Quem escreveu lê do primário; os demais, da réplica ainda desatualizada
+    assert len(client.get("/employees/", headers={"X-Client": "a"}).json()) == 1
+    assert client.get("/employees/", headers={"X-Client": "b"}).json() == []
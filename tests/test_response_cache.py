@@ -0,0 +1,46 @@
+from app.core import response_cache as cache_module
+from app.core.response_cache import ResponseCache
+
+EMPLOYEE = (None, "employee")
+PAYROLL = (None, "payroll")
+
+
+def test_write_invalidates_cached_listing(client):
+    client.post("/departments/", json={"name": "RH", "location": "Sede"})
+
+    first = client.get("/departments/")
+    second = client.get("/departments/")
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+
+    client.post("/departments/", json={"name": "TI", "location": "Sede"})
+    third = client.get("/departments/")
+
+    assert third.headers["X-Cache"] == "MISS"
+    assert [department["name"] for department in third.json()] == ["RH", "TI"]
+
+
+def test_invalidation_only_drops_loads_of_the_written_tables():
+    cache = ResponseCache()
+    employees = cache.generation({EMPLOYEE})
+    payrolls = cache.generation({PAYROLL})
+
+    cache.invalidate(None, {"payroll"})
+    cache.put("employees", b"[]", {EMPLOYEE}, employees)
+    cache.put("payrolls", b"[]", {PAYROLL}, payrolls)
+
+    assert cache.get("employees") == b"[]"
+    assert cache.get("payrolls") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=30)
+    cache.put("employees", b"[]", {EMPLOYEE}, cache.generation({EMPLOYEE}))
+
+    now[0] += 29
+    assert cache.get("employees") == b"[]"
+    now[0] += 1
+    assert cache.get("employees") is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,59 @@
+from sqlalchemy import create_engine, delete, func, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.core.row_counts import adjust_row_count, grouped_row_counts, row_count
+from app.models.Benefit import Benefit
+from app.models.Employee import Employee
+from app.models.RowCount import RowCount
+
+
+def _counters(session: Session) -> int:
+    return session.execute(select(func.count()).select_from(RowCount)).scalar_one()
+
+
+def test_replica_read_counts_without_writing(client, create_employee):
+    create_employee()
+    create_employee()
+    client.post("/benefits/", json={"name": "Vale", "type": "food", "amount": 10})
+    with Session(engine) as session:
+        session.execute(delete(RowCount))
+        session.commit()
+
+    with Session(engine, info={"tenant": None, "replica": True}) as replica:
+        assert row_count(replica, Employee) == 2
+        assert grouped_row_counts(replica, Benefit, "type") == {"food": 1}
+        assert not replica.dirty and not replica.new
+        assert _counters(replica) == 0
+
+
+def test_primary_read_persists_missing_counter(client, create_employee):
+    create_employee()
+    with Session(engine) as session:
+        session.execute(delete(RowCount))
+        session.commit()
+
+    with Session(engine, info={"tenant": None, "replica": False}) as primary:
+        assert row_count(primary, Employee) == 1
+        assert _counters(primary) > 0
+
+
+def test_null_group_value_is_counted_as_null():
+    # Bancos antigos podem ter benefícios sem tipo; o esquema atual exige a coluna
+    nullable = create_engine("sqlite://", poolclass=StaticPool)
+    RowCount.__table__.create(nullable)
+    with nullable.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE benefit (id INTEGER PRIMARY KEY, name VARCHAR, description VARCHAR,"
+            " amount FLOAT, type VARCHAR, active BOOLEAN, version INTEGER)"
+        ))
+        connection.execute(text("INSERT INTO benefit (name, amount, type, active) VALUES ('A', 1, NULL, 1), ('B', 1, 'food', 1)"))
+
+    with Session(nullable, info={"tenant": None, "replica": True}) as replica:
+        assert grouped_row_counts(replica, Benefit, "type") == {None: 1, "food": 1}
+    with Session(nullable, info={"tenant": None, "replica": False}) as primary:
+        assert grouped_row_counts(primary, Benefit, "type") == {None: 1, "food": 1}
+        adjust_row_count(primary, Benefit.__tablename__, -1, "type", None)
+        assert grouped_row_counts(primary, Benefit, "type") == {"food": 1}
+    nullable.dispose()
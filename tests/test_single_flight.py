@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+KEY = ("/departments/{department_id}", (("department_id", 1),), (), None, "sqlite://")
+
+
+def _wait_followers(flight: SingleFlight, count: int):
+    deadline = time.monotonic() + 5
+    while flight.stats()["routes"]["rota"]["followers"] < count:
+        assert time.monotonic() < deadline, "seguidoras não chegaram"
+        time.sleep(0.01)
+
+
+def _slow_load(release: threading.Event, calls: list, result):
+    def load():
+        calls.append(1)
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return load
+
+
+def test_concurrent_identical_requests_share_one_load():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+    load = _slow_load(release, calls, b"[]")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, KEY, "rota", load)
+        while not calls:
+            time.sleep(0.01)
+        followers = [pool.submit(flight.do, KEY, "rota", load) for _ in range(3)]
+        _wait_followers(flight, 3)
+        release.set()
+        bodies = [leader.result()] + [future.result() for future in followers]
+
+    assert bodies == [b"[]"] * 4
+    assert len(calls) == 1
+    assert flight.stats()["routes"]["rota"]["coalescing_ratio"] == 0.75
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_leader_error_reaches_followers():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+    load = _slow_load(release, calls, LookupError("não encontrado"))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, KEY, "rota", load)
+        while not calls:
+            time.sleep(0.01)
+        follower = pool.submit(flight.do, KEY, "rota", load)
+        _wait_followers(flight, 1)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(LookupError):
+                future.result()
+
+    assert len(calls) == 1
+
+
+def test_request_after_commit_does_not_join_older_flight():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        stale = pool.submit(flight.do, KEY, "rota", _slow_load(release, calls, b"antes"))
+        while not calls:
+            time.sleep(0.01)
+        flight.invalidate()
+        fresh = flight.do(KEY, "rota", lambda: b"depois")
+        release.set()
+
+        assert (stale.result(), fresh) == (b"antes", b"depois")
+    assert flight.stats()["routes"]["rota"] == {"leaders": 2, "followers": 0, "coalescing_ratio": 0.0}
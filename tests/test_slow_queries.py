@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import slow_queries
+
+
+class _FakeCursor:
+    """
+    Cursor DBAPI que registra os comandos e falha no EXPLAIN, como um
+    PostgreSQL diante de um comando que não aceita plano.
+    """
+
+    def __init__(self, executed):
+        self.executed = executed
+        self.connection = self
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement)
+        if statement.startswith("EXPLAIN"):
+            raise RuntimeError("syntax error")
+
+    def close(self):
+        pass
+
+
+def test_failed_explain_rolls_back_to_savepoint_outside_sqlite():
+    executed = []
+
+    plan = slow_queries._explain(_FakeCursor(executed), "postgresql", "VACUUM", None)
+
+    assert plan == ["EXPLAIN indisponível: syntax error"]
+    assert executed == [
+        "SAVEPOINT slow_query_explain",
+        "EXPLAIN VACUUM",
+        "ROLLBACK TO SAVEPOINT slow_query_explain",
+    ]
+
+
+def test_executemany_is_not_explained():
+    executed = []
+
+    assert slow_queries._explain(_FakeCursor(executed), "postgresql", "INSERT INTO t VALUES (%s)", [(1,), (2,)], True) is None
+    assert executed == []
+
+
+@pytest.fixture
+def slow_engine(monkeypatch):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_THRESHOLD_MS", -1)
+    slow_queries.clear_slow_queries()
+    bind = create_engine("sqlite://")
+    slow_queries.install_slow_query_log(bind)
+    yield bind
+    bind.dispose()
+    slow_queries.clear_slow_queries()
+
+
+def test_sqlite_query_is_recorded_with_plan_and_masked_parameters(slow_engine):
+    with slow_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, cpf TEXT)"))
+        slow_queries.clear_slow_queries()
+        connection.execute(text("SELECT * FROM t WHERE cpf = :cpf"), {"cpf": "12345678909"})
+
+    [query] = slow_queries.get_slow_queries()
+    assert query["parameters"] == ["str"]
+    assert query["plan"] and "t" in query["plan"][0]
@@ -0,0 +1,20 @@
+import time
+
+from app.core.db import engine
+from app.core.snapshots import get_job, start_snapshot
+
+
+def test_job_is_only_visible_to_its_tenant(client):
+    job = start_snapshot(engine, "acme")
+    deadline = time.monotonic() + 10
+    while job.status == "running" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert job.status == "done"
+    assert get_job(job.id, "acme") is job
+    assert get_job(job.id) is None
+    assert get_job(job.id, "other") is None
+
+
+def test_admin_routes_are_disabled_by_default(client):
+    assert client.post("/admin/snapshot").status_code == 404
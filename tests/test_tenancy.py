@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import pytest
+
+from app.core import db, tenancy
+from app.core.tenancy import InvalidTenant, UnknownTenant, resolve_tenant
+from conftest import valid_cpf
+
+
+@pytest.fixture
+def tenants(tmp_path, monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANT_DATABASE_URL", f"sqlite:///{tmp_path}/{{tenant}}.db")
+    monkeypatch.setattr(db, "_tenant_engines", OrderedDict())
+    monkeypatch.setattr(db, "_prepared_tenants", set())
+    yield
+    for tenant_engine in db._tenant_engines.values():
+        tenant_engine.dispose()
+
+
+def _employee(number: int) -> dict:
+    return {"name": "Funcionário", "cpf": valid_cpf(number), "position": "Analista", "admission_date": "2020-01-01"}
+
+
+def test_resolve_tenant_from_header_and_host(tenants, monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANT_HOST_SUFFIX", "rh.exemplo.com")
+
+    assert resolve_tenant({"X-Tenant-ID": " ACME "}) == "acme"
+    assert resolve_tenant({"host": "beta.rh.exemplo.com:8000"}) == "beta"
+    assert resolve_tenant({}) is None
+    with pytest.raises(InvalidTenant):
+        resolve_tenant({"X-Tenant-ID": "../outro"})
+
+
+def test_requests_are_isolated_per_tenant(client, tenants):
+    db.create_tenant_database("acme")
+    db.create_tenant_database("beta")
+
+    response = client.post("/employees/", json=_employee(100000001), headers={"X-Tenant-ID": "acme"})
+    assert response.status_code == 200, response.text
+
+    assert len(client.get("/employees/", headers={"X-Tenant-ID": "acme"}).json()) == 1
+    assert client.get("/employees/", headers={"X-Tenant-ID": "beta"}).json() == []
+    assert client.get("/employees/").json() == []
+
+
+def test_unknown_and_invalid_tenants_are_rejected(client, tenants):
+    with pytest.raises(UnknownTenant):
+        db.tenant_engine("ninguem")
+
+    assert client.get("/employees/", headers={"X-Tenant-ID": "ninguem"}).status_code == 404
+    assert client.get("/employees/", headers={"X-Tenant-ID": "acme;drop"}).status_code == 400
+
+
+def test_least_recently_used_engine_is_evicted(tenants, monkeypatch):
+    monkeypatch.setattr(db, "TENANT_MAX_ENGINES", 2)
+    for tenant in ("a", "b", "c"):
+        db.create_tenant_database(tenant)
+
+    first = db.tenant_engine("a")
+    db.tenant_engine("b")
+    assert db.tenant_engine("a") is first
+    db.tenant_engine("c")
+
+    assert list(db._tenant_engines) == ["a", "c"]
@@ -0,0 +1,33 @@
+from conftest import valid_cpf
+
+
+def _employee(number: int, position: str = "Analista"):
+    return {"name": f"Funcionário {number}", "cpf": valid_cpf(number), "position": position, "admission_date": "2020-01-01"}
+
+
+def test_employee_bulk_counts_inserted_updated_and_unchanged(client):
+    first = client.put("/employees/bulk", json=[_employee(123456001), _employee(123456002)])
+    assert first.json() == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+    again = client.put("/employees/bulk", json=[_employee(123456001), _employee(123456002)])
+    assert again.json() == {"inserted": 0, "updated": 0, "unchanged": 2}
+
+    mixed = client.put("/employees/bulk", json=[
+        _employee(123456001), _employee(123456002, "Gerente"), _employee(123456003),
+    ])
+    assert mixed.json() == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert client.get("/employees/count").json() == {"quantidade": 3}
+
+
+def test_payroll_bulk_counts_inserted_updated_and_unchanged(client, create_employee):
+    employee = create_employee()
+
+    def payroll(month: str, net: float):
+        return {"employee_id": employee["id"], "gross_salary": net + 100, "deductions": 100, "net_salary": net, "reference_month": month}
+
+    first = client.put("/pay_rolls/bulk", json=[payroll("2024-01", 1000), payroll("2024-02", 1000)])
+    assert first.json() == {"inserted": 2, "updated": 0, "unchanged": 0}
+
+    mixed = client.put("/pay_rolls/bulk", json=[payroll("2024-01", 1000), payroll("2024-02", 1200), payroll("2024-03", 1000)])
+    assert mixed.json() == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert client.get("/pay_rolls/count").json() == {"quantidade": 3}